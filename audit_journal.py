@@ -0,0 +1,331 @@
+"""输入审计日志：记录每个输入任务的时间、内容、来源、时序参数、耗时与结果
+
+只追加写入；由后台线程写为gzip压缩的JSON Lines分段文件，单段超过大小上限时切换到新段：
+    audit/audit-20261019-093000-0001.jsonl.gz
+输入线程只把记录放入队列（微秒级），序列化、压缩与写文件都在写入线程中完成，不影响输入时序。
+写入线程每秒同步刷新一次压缩流，程序异常退出时最多丢失最近一秒的记录，已写出的部分仍可读取。
+
+每行一条记录：
+    {"ts":开始时刻(epoch秒),"station":本机标识,"source":来源,"label":名称,"payload":内容,
+     "profile":时序参数名称,"duration_s":耗时,"outcome":done/preempted/error,"keystrokes":按键数,"records":记录数}
+流式文件任务的payload为文件名（内容不重复保存），各片段任务的按键以{enter}、{tab}等表示。
+
+记录在任务结束时写出，ts却是任务开始时刻，因此分段中的记录可以早于分段文件名中的时间。
+每个分段关闭时把其中记录的ts范围追加到索引文件audit-index.jsonl：
+    {"segment":分段文件名,"min_ts":最早ts,"max_ts":最晚ts}
+
+查询（按索引中的ts范围跳过无关分段，按原始行做子串预筛后再解析）：
+    python audit_journal.py --since "2026-10-19 08:00" --source manual --contains 6901234
+    python audit_journal.py --outcome error --count
+"""
+import argparse
+import atexit
+import glob
+import gzip
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import zlib
+
+DEFAULT_DIRECTORY = 'audit'
+DEFAULT_SEGMENT_BYTES = 4 * 1024 * 1024  # 单段压缩后大小上限
+SEGMENT_PATTERN = 'audit-*.jsonl.gz'
+INDEX_FILE = 'audit-index.jsonl'
+FLUSH_INTERVAL_S = 1.0
+TIME_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d')
+
+
+def segments_text(segments):
+    """把片段列表还原为可读文本：按键写作{按键名}，等待与记录标记省略"""
+    parts = []
+    for kind, value in segments:
+        if kind == 'text':
+            parts.append(value)
+        elif kind == 'key':
+            parts.append('{' + str(value) + '}')
+    return ''.join(parts)
+
+
+class AuditJournal:
+    """后台线程写入的压缩审计日志"""
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_segment_bytes=DEFAULT_SEGMENT_BYTES):
+        self.directory = directory
+        self.max_segment_bytes = max(64 * 1024, int(max_segment_bytes))
+        self.enabled = True
+        self.written = 0  # 已写入的记录数
+        self.errors = 0  # 写入失败次数
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._file = None  # 当前分段的原始文件
+        self._gzip = None
+        self._path = None
+        self._ts_range = None  # 当前分段中记录的 [最早ts, 最晚ts]
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """启动写入线程（退出程序时自动写完队列中的记录并关闭分段）"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, entry):
+        """放入一条记录（dict），由写入线程写出"""
+        if self.enabled and not self._closed:
+            self._queue.put(entry)
+
+    def close(self, timeout=5.0):
+        """写完队列中的记录并关闭当前分段"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # ---- 写入线程 ----
+
+    def _open_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        number = 1
+        while True:
+            path = os.path.join(self.directory, f'audit-{stamp}-{number:04d}.jsonl.gz')
+            if not os.path.exists(path):
+                break
+            number += 1
+        # 每个分段都是新文件，不追加到上次异常退出时未正常结束的分段
+        self._file = open(path, 'xb')
+        self._gzip = gzip.GzipFile(fileobj=self._file, mode='wb', compresslevel=6)
+        self._path = path
+        self._ts_range = None
+
+    def _close_segment(self):
+        if self._gzip is not None:
+            try:
+                self._gzip.close()
+                self._file.close()
+            finally:
+                self._gzip = None
+                self._file = None
+                self._write_index()
+
+    def _write_index(self):
+        """把刚关闭分段的ts范围追加到索引（没有记录的分段不写）"""
+        if self._ts_range is None:
+            return
+        line = json.dumps({'segment': os.path.basename(self._path), 'min_ts': self._ts_range[0],
+                           'max_ts': self._ts_range[1]}, separators=(',', ':'))
+        self._ts_range = None
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+        except OSError as e:
+            self.errors += 1
+            print(f"写入审计日志索引失败: {e}")
+
+    def _run(self):
+        next_flush = time.monotonic() + FLUSH_INTERVAL_S
+        while True:
+            try:
+                entry = self._queue.get(timeout=max(0.0, next_flush - time.monotonic()))
+            except queue.Empty:
+                entry = False
+            if entry is None:
+                break
+            try:
+                if entry is not False:
+                    self._write(entry)
+                    # 高峰时连续写出队列中已有的记录
+                    while True:
+                        try:
+                            entry = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if entry is None:
+                            self._close_segment()
+                            return
+                        self._write(entry)
+                if time.monotonic() >= next_flush:
+                    next_flush = time.monotonic() + FLUSH_INTERVAL_S
+                    if self._gzip is not None:
+                        self._gzip.flush(zlib.Z_SYNC_FLUSH)
+                        self._file.flush()
+            except Exception as e:
+                self.errors += 1
+                print(f"写入审计日志失败: {e}")
+                self._close_segment()
+        self._close_segment()
+
+    def _write(self, entry):
+        if self._gzip is None:
+            self._open_segment()
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+        self._gzip.write(line.encode('utf-8'))
+        self.written += 1
+        ts = entry.get('ts')
+        if isinstance(ts, (int, float)):
+            if self._ts_range is None:
+                self._ts_range = [ts, ts]
+            else:
+                self._ts_range[0] = min(self._ts_range[0], ts)
+                self._ts_range[1] = max(self._ts_range[1], ts)
+        if self._file.tell() >= self.max_segment_bytes:
+            self._close_segment()
+
+
+# ---------------------------------------------------------------------------
+# 查询
+# ---------------------------------------------------------------------------
+
+def _segment_start(path):
+    """从文件名解析分段开始时间（epoch秒）；无法解析时返回None"""
+    name = os.path.basename(path)
+    try:
+        return time.mktime(time.strptime(name[6:21], '%Y%m%d-%H%M%S'))
+    except ValueError:
+        return None
+
+
+def read_index(directory=DEFAULT_DIRECTORY):
+    """读取分段索引，返回 {分段文件名: (最早ts, 最晚ts)}"""
+    ranges = {}
+    try:
+        with open(os.path.join(directory, INDEX_FILE), 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                    ranges[item['segment']] = (float(item['min_ts']), float(item['max_ts']))
+                except (ValueError, KeyError, TypeError):
+                    continue
+    except OSError:
+        pass
+    return ranges
+
+
+def list_segments(directory=DEFAULT_DIRECTORY, since=None, until=None):
+    """按时间顺序列出可能包含[since, until]内记录的分段
+
+    有索引的分段按其中记录的ts范围判断。没有索引的分段（正在写入或异常结束）：
+    记录都在下一段开始之前写出，ts不晚于下一段开始（文件名截断到秒，放宽1秒）；
+    ts可以早于本段开始（长任务），因此不按until跳过。
+    """
+    paths = sorted(glob.glob(os.path.join(directory, SEGMENT_PATTERN)))
+    starts = [_segment_start(path) for path in paths]
+    ranges = read_index(directory)
+    selected = []
+    for i, path in enumerate(paths):
+        indexed = ranges.get(os.path.basename(path))
+        if indexed is not None:
+            if (until is not None and indexed[0] > until) or (since is not None and indexed[1] < since):
+                continue
+        else:
+            end = starts[i + 1] if i + 1 < len(paths) else None
+            if since is not None and end is not None and end + 1 < since:
+                continue
+        selected.append(path)
+    return selected
+
+
+def _read_lines(path):
+    """逐行读取分段；正在写入或异常结束的分段读到可用部分为止"""
+    try:
+        with gzip.open(path, 'rb') as f:
+            for line in f:
+                yield line
+    except (EOFError, OSError, zlib.error):
+        return
+
+
+def query(directory=DEFAULT_DIRECTORY, since=None, until=None, source=None, outcome=None,
+          contains=None, station=None):
+    """按条件筛选记录，逐条返回dict（按写入顺序）"""
+    # 原始行预筛：只在子串无需JSON转义时使用，保证不会漏掉记录
+    needles = []
+    for key, value in (('source', source), ('outcome', outcome), ('station', station)):
+        if value is not None:
+            needles.append(f'"{key}":{json.dumps(value, ensure_ascii=False)}'.encode('utf-8'))
+    if contains and json.dumps(contains, ensure_ascii=False)[1:-1] == contains:
+        needles.append(contains.encode('utf-8'))
+    for path in list_segments(directory, since, until):
+        for line in _read_lines(path):
+            if any(needle not in line for needle in needles):
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            ts = entry.get('ts', 0)
+            if (since is not None and ts < since) or (until is not None and ts > until):
+                continue
+            if source is not None and entry.get('source') != source:
+                continue
+            if outcome is not None and entry.get('outcome') != outcome:
+                continue
+            if station is not None and entry.get('station') != station:
+                continue
+            if contains and contains not in str(entry.get('payload', '')) and contains not in str(entry.get('label', '')):
+                continue
+            yield entry
+
+
+def parse_time(text):
+    """解析本地时间（YYYY-MM-DD[ HH:MM[:SS]]）为epoch秒"""
+    for fmt in TIME_FORMATS:
+        try:
+            return time.mktime(time.strptime(text, fmt))
+        except ValueError:
+            continue
+    raise ValueError(f"无法解析时间: {text}")
+
+
+def format_entry(entry):
+    ts = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry.get('ts', 0)))
+    return (f"{ts}  {entry.get('station', '')}  {entry.get('source', '')}  {entry.get('outcome', '')}  "
+            f"{entry.get('duration_s', 0):.3f}s  {entry.get('keystrokes', 0)}键  {entry.get('payload', '')}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="查询输入审计日志")
+    parser.add_argument('directory', nargs='?', default=DEFAULT_DIRECTORY, help="审计日志目录")
+    parser.add_argument('--since', help="开始时间（本地时间，如 2026-10-19 08:00）")
+    parser.add_argument('--until', help="结束时间")
+    parser.add_argument('--source', help="来源，如 manual/record/schedule")
+    parser.add_argument('--outcome', help="结果：done/preempted/error")
+    parser.add_argument('--station', help="工作站标识")
+    parser.add_argument('--contains', help="内容或名称包含的文本")
+    parser.add_argument('--count', action='store_true', help="只输出条数")
+    parser.add_argument('--json', action='store_true', help="按JSON Lines输出原始记录")
+    parser.add_argument('--limit', type=int, help="最多输出条数")
+    args = parser.parse_args(argv)
+
+    try:
+        since = parse_time(args.since) if args.since else None
+        until = parse_time(args.until) if args.until else None
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    began = time.perf_counter()
+    matched = 0
+    for entry in query(args.directory, since, until, args.source, args.outcome, args.contains, args.station):
+        matched += 1
+        if not args.count:
+            print(json.dumps(entry, ensure_ascii=False) if args.json else format_entry(entry))
+            if args.limit is not None and matched >= args.limit:
+                break
+    elapsed = time.perf_counter() - began
+    if args.count:
+        print(matched)
+    print(f"共 {matched} 条，用时 {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,332 @@
+"""批量条码生成与校验（EAN-13 / UPC-A / Code128 / GS1-128）
+
+既可在界面中使用，也可无界面运行：
+    python barcode_generator.py gen ean13 1000000 -o codes.txt --prefix 690
+    python barcode_generator.py check ean13 codes.txt
+
+安装了NumPy时按块向量化计算校验位，否则退回纯Python实现。
+"""
+import argparse
+import random
+import string
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:  # 没有NumPy时使用纯Python实现
+    np = None
+
+# 各码制的数据位数（不含校验位）
+GS1_DATA_LENGTH = {'ean13': 12, 'upca': 11}
+SYMBOLOGIES = ('ean13', 'upca', 'code128', 'gs1-128')
+SYMBOLOGY_NAMES = {'ean13': 'EAN-13', 'upca': 'UPC-A', 'code128': 'Code128', 'gs1-128': 'GS1-128'}
+
+CODE128_CHARSET = string.digits + string.ascii_uppercase  # 默认生成的Code128字符集
+CODE128_VALID = bytes(range(32, 127))  # Code128 B字符集可直接键入的字符
+GS1_128_SERIAL_LENGTH = 8  # GS1-128中AI(21)序列号位数
+
+DEFAULT_BLOCK_SIZE = 100000
+
+
+def gs1_check_digit(digits):
+    """计算GS1（EAN/UPC/SSCC等）校验位：自右向左权重3,1交替"""
+    total = 0
+    weight = 3
+    for ch in reversed(digits):
+        total += (ord(ch) - 48) * weight
+        weight = 4 - weight
+    return str((10 - total % 10) % 10)
+
+
+def code128_checksum(data):
+    """计算Code128（B字符集）模103校验值，仅用于报告，扫码枪输出中不包含该值"""
+    total = 104  # Start B
+    for position, ch in enumerate(data, 1):
+        total += (ord(ch) - 32) * position
+    return total % 103
+
+
+def _gs1_weights(length):
+    """长度为length的数据位的GS1权重（最右一位权重为3）"""
+    return np.where((length - 1 - np.arange(length)) % 2 == 0, 3, 1).astype(np.int64)
+
+
+def gs1_check_digits(matrix):
+    """向量化计算校验位：matrix为(n, 位数)的0-9整数数组，返回(n,)数组"""
+    totals = matrix.astype(np.int64) @ _gs1_weights(matrix.shape[1])
+    return (10 - totals % 10) % 10
+
+
+def check_options(symbology, prefix='', start=None, count=1):
+    """检查生成参数，返回前缀之后可变的数字位数（Code128返回None），参数非法时抛出ValueError"""
+    if symbology not in SYMBOLOGIES:
+        raise ValueError(f"不支持的码制: {symbology}")
+    if prefix and not prefix.isdigit() and symbology != 'code128':
+        raise ValueError("前缀只能包含数字")
+    if symbology in GS1_DATA_LENGTH:
+        free = GS1_DATA_LENGTH[symbology] - len(prefix)
+    elif symbology == 'gs1-128':
+        free = 13 - len(prefix)
+    else:
+        free = None
+    if free is not None and free < 1:
+        raise ValueError("前缀过长")
+    if start is not None and free is not None:
+        # GS1-128的顺序号用于AI(21)序列号，EAN/UPC的顺序号用于前缀后的数据位
+        width = GS1_128_SERIAL_LENGTH if symbology == 'gs1-128' else free
+        if start < 0 or start + count > 10 ** width:
+            raise ValueError("顺序号超出可用位数")
+    return free
+
+
+# ---------------------------------------------------------------------------
+# NumPy 实现
+# ---------------------------------------------------------------------------
+
+def _np_digits(count, free, start, rng):
+    """生成(count, free)的数字矩阵：start为None时随机，否则从start开始顺序编号"""
+    if start is None:
+        return rng.integers(0, 10, size=(count, free), dtype=np.uint8)
+    numbers = np.arange(start, start + count, dtype=np.int64)
+    digits = np.empty((count, free), dtype=np.uint8)
+    for column in range(free - 1, -1, -1):
+        digits[:, column] = numbers % 10
+        numbers //= 10
+    if count and numbers.any():
+        raise ValueError(f"顺序号超过{free}位")
+    return digits
+
+
+def _np_const(text, count):
+    """把固定文本扩展为(count, len)的数字矩阵"""
+    row = np.frombuffer(text.encode('ascii'), dtype=np.uint8) - 48
+    return np.broadcast_to(row, (count, len(text)))
+
+
+def _np_block(symbology, count, prefix, start, rng, length, expiry):
+    if symbology == 'code128':
+        table = np.frombuffer(CODE128_CHARSET.encode('ascii'), dtype=np.uint8)
+        body = table[rng.integers(0, len(table), size=(count, length - len(prefix)))]
+        head = np.broadcast_to(np.frombuffer(prefix.encode('ascii'), dtype=np.uint8), (count, len(prefix)))
+        rows = np.hstack([head, body])
+    elif symbology == 'gs1-128':
+        free = 13 - len(prefix)
+        gtin = np.hstack([_np_const(prefix, count), _np_digits(count, free, None, rng)])
+        serial = _np_digits(count, GS1_128_SERIAL_LENGTH, start, rng)
+        rows = np.hstack([
+            _np_const('01', count), gtin, gs1_check_digits(gtin)[:, None],
+            _np_const('17' + expiry + '21', count), serial,
+        ]).astype(np.uint8) + 48
+    else:
+        free = GS1_DATA_LENGTH[symbology] - len(prefix)
+        data = np.hstack([_np_const(prefix, count), _np_digits(count, free, start, rng)])
+        rows = np.hstack([data, gs1_check_digits(data)[:, None]]).astype(np.uint8) + 48
+    newline = np.full((count, 1), 10, dtype=np.uint8)
+    return np.hstack([rows.astype(np.uint8), newline]).tobytes()
+
+
+# ---------------------------------------------------------------------------
+# 纯Python实现
+# ---------------------------------------------------------------------------
+
+def _py_digits(free, number, rng):
+    if number is None:
+        return ''.join(rng.choice(string.digits) for _ in range(free))
+    text = str(number).zfill(free)
+    if len(text) > free:
+        raise ValueError(f"顺序号超过{free}位")
+    return text
+
+
+def _py_block(symbology, count, prefix, start, rng, length, expiry):
+    lines = []
+    for i in range(count):
+        number = None if start is None else start + i
+        if symbology == 'code128':
+            lines.append(prefix + ''.join(rng.choice(CODE128_CHARSET) for _ in range(length - len(prefix))))
+        elif symbology == 'gs1-128':
+            gtin = prefix + _py_digits(13 - len(prefix), None, rng)
+            serial = _py_digits(GS1_128_SERIAL_LENGTH, number, rng)
+            lines.append('01' + gtin + gs1_check_digit(gtin) + '17' + expiry + '21' + serial)
+        else:
+            data = prefix + _py_digits(GS1_DATA_LENGTH[symbology] - len(prefix), number, rng)
+            lines.append(data + gs1_check_digit(data))
+    return ''.join(line + '\n' for line in lines).encode('ascii')
+
+
+# ---------------------------------------------------------------------------
+# 生成
+# ---------------------------------------------------------------------------
+
+def iter_blocks(symbology, total, prefix='', start=None, seed=None, length=12,
+                expiry=None, block_size=DEFAULT_BLOCK_SIZE):
+    """分块生成条码，每块为以换行分隔的ASCII字节串
+
+    start为None时随机生成（EAN/UPC的数据位、GS1-128的序列号），否则顺序编号；
+    length为Code128的总长度；expiry为GS1-128的AI(17)有效期（YYMMDD，默认一年后）。
+    """
+    check_options(symbology, prefix, start, total)
+    if symbology == 'code128' and length <= len(prefix):
+        raise ValueError("Code128长度必须大于前缀长度")
+    if expiry is None:
+        expiry = time.strftime('%y%m%d', time.localtime(time.time() + 365 * 86400))
+    if np is not None:
+        rng = np.random.default_rng(seed)
+        make_block = _np_block
+    else:
+        rng = random.Random(seed)
+        make_block = _py_block
+    produced = 0
+    while produced < total:
+        count = min(block_size, total - produced)
+        block_start = None if start is None else start + produced
+        yield make_block(symbology, count, prefix, block_start, rng, length, expiry)
+        produced += count
+
+
+def iter_codes(symbology, total, **options):
+    """逐条生成条码字符串（用于放入输入队列，内存占用只有一个块）"""
+    for block in iter_blocks(symbology, total, **options):
+        for line in block.decode('ascii').splitlines():
+            yield line
+
+
+def generate_codes(symbology, count, **options):
+    """一次性生成count条条码，返回字符串列表"""
+    return list(iter_codes(symbology, count, **options))
+
+
+def write_codes(path, symbology, total, **options):
+    """将条码以流的方式写入文件，返回写入条数"""
+    written = 0
+    with open(path, 'wb') as f:
+        for block in iter_blocks(symbology, total, **options):
+            f.write(block)
+            written += block.count(b'\n')
+    return written
+
+
+# ---------------------------------------------------------------------------
+# 校验
+# ---------------------------------------------------------------------------
+
+def _valid_gs1_py(line, data_length):
+    return (len(line) == data_length + 1 and line.isdigit()
+            and gs1_check_digit(line[:-1].decode('ascii')) == chr(line[-1]))
+
+
+def _validate_gs1_block(lines, data_length):
+    """校验一批EAN/UPC（bytes），返回每行是否有效的列表"""
+    width = data_length + 1
+    shaped = [len(line) == width and line.isdigit() for line in lines]
+    if np is None:
+        return [ok and _valid_gs1_py(line, data_length) for ok, line in zip(shaped, lines)]
+    candidates = [line for ok, line in zip(shaped, lines) if ok]
+    if not candidates:
+        return shaped
+    matrix = (np.frombuffer(b''.join(candidates), dtype=np.uint8).reshape(-1, width) - 48)
+    good = iter((gs1_check_digits(matrix[:, :-1]) == matrix[:, -1]).tolist())
+    return [ok and next(good) for ok in shaped]
+
+
+def _validate_gs1_128(line):
+    """校验GS1-128：以AI(01)开头时校验GTIN-14，其余部分要求为可键入字符"""
+    if line.translate(None, CODE128_VALID + b'\x1d'):
+        return False
+    if line.startswith(b'01'):
+        gtin = line[2:16]
+        return len(gtin) == 14 and gtin.isdigit() and gs1_check_digit(gtin[:13].decode()) == chr(gtin[13])
+    if line.startswith(b'00'):
+        sscc = line[2:20]
+        return len(sscc) == 18 and sscc.isdigit() and gs1_check_digit(sscc[:17].decode()) == chr(sscc[17])
+    return len(line) > 2 and line[:2].isdigit()
+
+
+def validate_lines(lines, symbology):
+    """校验一批条码（str或bytes），返回每行是否有效的列表"""
+    if symbology not in SYMBOLOGIES:
+        raise ValueError(f"不支持的码制: {symbology}")
+    lines = [line.encode('utf-8') if isinstance(line, str) else line for line in lines]
+    if symbology in GS1_DATA_LENGTH:
+        return _validate_gs1_block(lines, GS1_DATA_LENGTH[symbology])
+    if symbology == 'gs1-128':
+        return [_validate_gs1_128(line) for line in lines]
+    # Code128：非空且全部为B字符集字符（translate删除合法字符后应为空）
+    return [bool(line) and not line.translate(None, CODE128_VALID) for line in lines]
+
+
+def validate_file(path, symbology, block_lines=DEFAULT_BLOCK_SIZE, max_samples=100):
+    """分块校验文件中的条码，返回 (总行数, 无效行数, [(行号, 内容)] 无效样例)"""
+    total = 0
+    invalid = 0
+    samples = []
+
+    def _check(batch, first_line):
+        nonlocal invalid
+        for offset, ok in enumerate(validate_lines(batch, symbology)):
+            if not ok:
+                invalid += 1
+                if len(samples) < max_samples:
+                    samples.append((first_line + offset, batch[offset].decode('utf-8', 'replace')))
+
+    batch = []
+    with open(path, 'rb') as f:
+        for raw in f:
+            batch.append(raw.rstrip(b'\r\n'))
+            if len(batch) >= block_lines:
+                _check(batch, total + 1)
+                total += len(batch)
+                batch = []
+    if batch:
+        _check(batch, total + 1)
+        total += len(batch)
+    return total, invalid, samples
+
+
+# ---------------------------------------------------------------------------
+# 命令行
+# ---------------------------------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量条码生成与校验")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    gen = sub.add_parser('gen', help="生成条码")
+    gen.add_argument('symbology', choices=SYMBOLOGIES)
+    gen.add_argument('count', type=int)
+    gen.add_argument('-o', '--output', help="输出文件，默认输出到标准输出")
+    gen.add_argument('--prefix', default='', help="固定前缀（如厂商代码）")
+    gen.add_argument('--start', type=int, help="顺序编号起始值，默认随机")
+    gen.add_argument('--seed', type=int, help="随机种子")
+    gen.add_argument('--length', type=int, default=12, help="Code128总长度")
+
+    check = sub.add_parser('check', help="校验文件中的条码")
+    check.add_argument('symbology', choices=SYMBOLOGIES)
+    check.add_argument('path')
+
+    args = parser.parse_args(argv)
+    began = time.perf_counter()
+    if args.command == 'gen':
+        options = dict(prefix=args.prefix, start=args.start, seed=args.seed, length=args.length)
+        if args.output:
+            count = write_codes(args.output, args.symbology, args.count, **options)
+        else:
+            count = 0
+            for block in iter_blocks(args.symbology, args.count, **options):
+                sys.stdout.buffer.write(block)
+                count += block.count(b'\n')
+        elapsed = time.perf_counter() - began
+        print(f"已生成 {count} 条 {SYMBOLOGY_NAMES[args.symbology]}，用时 {elapsed:.2f}s", file=sys.stderr)
+        return 0
+
+    total, invalid, samples = validate_file(args.path, args.symbology)
+    elapsed = time.perf_counter() - began
+    for line_no, text in samples:
+        print(f"{line_no}: {text}")
+    print(f"共 {total} 行，无效 {invalid} 行，用时 {elapsed:.2f}s", file=sys.stderr)
+    return 1 if invalid else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
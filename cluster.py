@@ -0,0 +1,726 @@
+"""控制端/代理模式：把一大批输入任务分发到多台扫码枪模拟工作站
+
+代理（Agent）通过TCP连接控制端（Controller）并注册，接收任务后在本机输入，完成后回报耗时与按键数。
+控制端按各代理实测的输入速率分配任务：每个代理最多预取lookahead_s秒的工作量，
+新任务交给预计最早完成的代理，因此快的工作站分得更多；同时跟踪每个代理的进度与失败，
+代理断开或超过dead_after_s没有心跳时，其未完成的任务放回队列由其他代理重新执行。
+
+协议为每行一个JSON对象（UTF-8）：
+    代理 -> 控制端  {"type":"hello","name":名称,"rate":预估按键/秒,"nonce":随机串,"proof":HMAC}
+                    {"type":"heartbeat","queued":本地排队数}
+                    {"type":"done","task":任务号,"outcome":"done"/"error"/"rejected","duration_s":耗时,"keystrokes":按键数}
+    控制端 -> 代理  {"type":"welcome","proof":HMAC}
+                    {"type":"job","task":任务号,"segments":[[类型,值],...]}
+
+安全：
+    - 双方用共享令牌（--token或环境变量SCANGUN_CLUSTER_TOKEN）互相验证：代理在hello中给出
+      HMAC-SHA256(令牌, "agent:"+nonce)，控制端在welcome中给出HMAC-SHA256(令牌, "controller:"+nonce)，
+      令牌本身不在网络上传输；控制端默认只监听127.0.0.1，监听其他地址时必须设置令牌。
+    - 代理只执行白名单内的片段：text（可打印字符）、key（ALLOWED_KEYS中的单个按键，不含组合键）、
+      sleep（不超过MAX_SLEEP_MS）与record，其余任务回报为rejected，不会向焦点窗口发送热键。
+    - 消息不加密，只应在可信的局域网内使用。
+
+重新分配的任务可能已在断开的代理上输入了一部分（至少一次语义），late_results统计此类情况。
+
+本机测试（代理使用内存输出端，不发送真实按键）：
+    python cluster.py demo --agents 4 --lines 400 --kill 1
+多进程运行：
+    python cluster.py controller batch.txt --host 0.0.0.0 --port 8765 --min-agents 3 --token 共享令牌
+    python cluster.py agent 192.168.1.10:8765 --memory --delay 2 --token 共享令牌
+"""
+import argparse
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import queue
+import secrets
+import socket
+import sys
+import threading
+import time
+from collections import deque
+
+from typing_engine import MemorySink, TimingProfile, TypingEngine, text_segments
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+TOKEN_ENV = 'SCANGUN_CLUSTER_TOKEN'
+SEGMENT_KINDS = ('text', 'key', 'sleep', 'record')
+# 代理允许执行的特殊按键：模板与记录模式用到的单个按键及光标/编辑键，不含修饰键与组合键
+ALLOWED_KEYS = frozenset({
+    'enter', 'tab', 'esc', 'space', 'backspace', 'delete',
+    'up', 'down', 'left', 'right', 'home', 'end', 'page up', 'page down',
+})
+MAX_SLEEP_MS = 10000
+PENDING = 'pending'
+ASSIGNED = 'assigned'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def _send(sock, lock, message):
+    data = (json.dumps(message, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+    with lock:
+        sock.sendall(data)
+
+
+def _iter_messages(sock):
+    """逐条读取对端消息（JSON对象），连接关闭时结束；无法解析或不是对象的行被忽略"""
+    with sock.makefile('rb') as stream:
+        for line in stream:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(message, dict):
+                yield message
+
+
+def parse_segments(segments, allowed_keys=ALLOWED_KEYS, max_sleep_ms=MAX_SLEEP_MS):
+    """检查控制端发来的片段列表（白名单），返回[(类型, 值)]；格式不符或不允许时抛出ValueError"""
+    if not isinstance(segments, list):
+        raise ValueError("segments不是列表")
+    parsed = []
+    for segment in segments:
+        if not isinstance(segment, (list, tuple)) or len(segment) != 2:
+            raise ValueError(f"无效的片段: {segment!r}")
+        kind, value = segment
+        if kind == 'text':
+            if not isinstance(value, str) or not value.isprintable():
+                raise ValueError("文本片段含有控制字符")
+        elif kind == 'key':
+            if value not in allowed_keys:
+                raise ValueError(f"不允许的按键: {value!r}")
+        elif kind == 'sleep':
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= max_sleep_ms:
+                raise ValueError(f"等待时间超出范围: {value!r}")
+        elif kind == 'record':
+            value = None
+        else:
+            raise ValueError(f"不允许的片段类型: {kind!r}")
+        parsed.append((kind, value))
+    return parsed
+
+
+def line_segments(line, with_enter=True):
+    """一行文本的片段：制表符分隔的各字段之间按Tab键"""
+    segments = []
+    for i, field in enumerate(line.split('\t')):
+        if i:
+            segments.append(('key', 'tab'))
+        segments.extend(text_segments(field))
+    if with_enter:
+        segments.append(('key', 'enter'))
+    return segments
+
+
+def _proof(token, role, nonce):
+    """共享令牌对(角色, nonce)的HMAC，证明对端持有同一令牌"""
+    return hmac.new(token.encode('utf-8'), f'{role}:{nonce}'.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def _is_loopback(host):
+    return host in ('127.0.0.1', 'localhost', '::1')
+
+
+def segments_cost(segments):
+    """任务的工作量：按键数（字符数加特殊按键数）"""
+    return sum(len(value) if kind == 'text' else 1 for kind, value in segments if kind in ('text', 'key')) or 1
+
+
+def estimate_rate(profile):
+    """按时序参数粗略估计输入速率（按键/秒），用作代理实测之前的初值"""
+    per_key_ms = profile.char_delay_ms + profile.key_hold_ms + profile.modifier_gap_ms
+    return 1000.0 / max(1, per_key_ms)
+
+
+# ---------------------------------------------------------------------------
+# 控制端
+# ---------------------------------------------------------------------------
+
+class Task:
+    def __init__(self, task_id, segments):
+        self.id = task_id
+        self.segments = segments
+        self.cost = segments_cost(segments)
+        self.status = PENDING
+        self.agent = None
+        self.attempts = 0  # 代理回报失败的次数
+
+
+class AgentState:
+    """控制端记录的一个代理"""
+
+    def __init__(self, name, sock, rate):
+        self.name = name
+        self.sock = sock
+        self.send_lock = threading.Lock()
+        self.rate = max(1.0, float(rate))  # 实测输入速率（按键/秒，指数滑动平均）
+        self.outstanding = {}  # 任务号 -> Task
+        self.outstanding_cost = 0
+        self.done = 0
+        self.failed = 0
+        self.keystrokes = 0
+        self.reassigned = 0  # 断开时被收回的任务数
+        self.last_seen = time.monotonic()
+        self.alive = True
+
+    def eta(self, extra_cost=0):
+        """完成已分配的任务及extra_cost工作量的预计耗时（秒）"""
+        return (self.outstanding_cost + extra_cost) / self.rate
+
+    def to_dict(self):
+        return {'name': self.name, 'alive': self.alive, 'rate': round(self.rate, 1), 'done': self.done,
+                'failed': self.failed, 'outstanding': len(self.outstanding), 'keystrokes': self.keystrokes,
+                'reassigned': self.reassigned}
+
+
+class Controller:
+    """接受代理注册并按吞吐量分发任务"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, lookahead_s=0.5, dead_after_s=5.0,
+                 max_attempts=3, rate_smoothing=0.3, token=None):
+        if not token and not _is_loopback(host):
+            raise ValueError("控制端监听非本机地址时必须设置共享令牌")
+        self.host = host
+        self.token = token or None
+        self.port = port
+        self.lookahead_s = lookahead_s
+        self.dead_after_s = dead_after_s
+        self.max_attempts = max(1, int(max_attempts))
+        self.rate_smoothing = rate_smoothing
+        self.agents = {}  # 名称 -> AgentState
+        self.tasks = {}  # 任务号 -> Task
+        self.late_results = 0  # 任务已重新分配后才收到的原代理回报
+        self._unfinished = 0  # 尚未完成或失败的任务数
+        self._pending = deque()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._server = None
+        self._stopped = threading.Event()
+
+    # ---- 生命周期 ----
+
+    def start(self):
+        """开始监听；port为0时自动选择端口（见self.port）"""
+        self._server = socket.create_server((self.host, self.port))
+        self.port = self._server.getsockname()[1]
+        threading.Thread(target=self._accept_loop, name='cluster-accept', daemon=True).start()
+        threading.Thread(target=self._monitor_loop, name='cluster-monitor', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._server is not None:
+            self._server.close()
+        with self._lock:
+            agents = list(self.agents.values())
+        for agent in agents:
+            self._close(agent.sock)
+
+    # ---- 任务 ----
+
+    def submit(self, segment_lists):
+        """加入一批任务（每项为片段列表），返回任务号列表；含代理不会执行的片段时抛出ValueError"""
+        # 提交时按代理的白名单检查，避免任务分发后被各代理反复拒绝
+        checked = [parse_segments([list(segment) for segment in segments]) for segments in segment_lists]
+        with self._lock:
+            ids = []
+            for segments in checked:
+                task = Task(next(self._ids), [list(segment) for segment in segments])
+                self.tasks[task.id] = task
+                self._pending.append(task)
+                ids.append(task.id)
+            self._unfinished += len(ids)
+        self.dispatch()
+        return ids
+
+    def submit_lines(self, lines, with_enter=True):
+        """按行提交任务；行内的制表符输入为Tab键"""
+        return self.submit(line_segments(line, with_enter) for line in lines if line)
+
+    def dispatch(self):
+        """把待执行的任务分配给预计最早完成的代理，每个代理最多预取lookahead_s秒的工作量"""
+        sends = []
+        with self._lock:
+            while self._pending:
+                task = self._pending[0]
+                candidates = [agent for agent in self.agents.values()
+                              if agent.alive and (not agent.outstanding or agent.eta() < self.lookahead_s)]
+                if not candidates:
+                    break
+                agent = min(candidates, key=lambda a: a.eta(task.cost))
+                self._pending.popleft()
+                task.status = ASSIGNED
+                task.agent = agent.name
+                agent.outstanding[task.id] = task
+                agent.outstanding_cost += task.cost
+                sends.append((agent, {'type': 'job', 'task': task.id, 'segments': task.segments}))
+        for agent, message in sends:
+            try:
+                _send(agent.sock, agent.send_lock, message)
+            except OSError:
+                self._mark_dead(agent)
+
+    def finished(self):
+        return self._unfinished == 0
+
+    def wait(self, timeout=None):
+        """等待所有任务完成或失败，返回是否全部结束"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._unfinished:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._changed.wait(remaining if remaining is not None else 1.0)
+            return True
+
+    def progress(self):
+        """整体与各代理的进度"""
+        with self._lock:
+            counts = {PENDING: 0, ASSIGNED: 0, DONE: 0, FAILED: 0}
+            for task in self.tasks.values():
+                counts[task.status] += 1
+            return {'tasks': counts, 'late_results': self.late_results,
+                    'agents': [agent.to_dict() for agent in self.agents.values()]}
+
+    # ---- 连接处理 ----
+
+    def _accept_loop(self):
+        while not self._stopped.is_set():
+            try:
+                sock, address = self._server.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._serve_agent, args=(sock, address), name='cluster-agent',
+                             daemon=True).start()
+
+    def _serve_agent(self, sock, address):
+        agent = None
+        try:
+            for message in _iter_messages(sock):
+                kind = message.get('type')
+                if agent is None:
+                    if kind != 'hello' or not self._authenticate(sock, message, address):
+                        break
+                    agent = self._register(sock, message, address)
+                    continue
+                agent.last_seen = time.monotonic()
+                if kind == 'done':
+                    try:
+                        self._complete(agent, message)
+                    except (TypeError, ValueError) as e:
+                        print(f"忽略代理{agent.name}的无效回报: {e}")
+        except OSError:
+            pass
+        finally:
+            if agent is not None:
+                self._mark_dead(agent)
+            self._close(sock)
+
+    def _authenticate(self, sock, message, address):
+        """校验代理的令牌证明并回复welcome（附控制端的证明）；未设置令牌时只回复welcome"""
+        nonce = message.get('nonce')
+        if self.token is not None:
+            proof = message.get('proof')
+            if not isinstance(nonce, str) or not isinstance(proof, str) \
+                    or not hmac.compare_digest(proof, _proof(self.token, 'agent', nonce)):
+                print(f"拒绝未通过验证的代理: {address[0]}")
+                return False
+        reply = _proof(self.token, 'controller', nonce) if self.token is not None else None
+        _send(sock, threading.Lock(), {'type': 'welcome', 'proof': reply})
+        return True
+
+    def _register(self, sock, message, address):
+        try:
+            rate = float(message.get('rate', 10.0))
+        except (TypeError, ValueError):
+            rate = 10.0
+        with self._lock:
+            name = str(message.get('name') or f'{address[0]}:{address[1]}')
+            base = name
+            for number in itertools.count(2):
+                existing = self.agents.get(name)
+                if existing is None or not existing.alive:
+                    break
+                name = f'{base}#{number}'
+            agent = AgentState(name, sock, rate)
+            self.agents[name] = agent
+        print(f"代理已连接: {name}（{address[0]}）")
+        self.dispatch()
+        return agent
+
+    def _complete(self, agent, message):
+        with self._lock:
+            task = self.tasks.get(message.get('task'))
+            if task is None:
+                return
+            if task.agent != agent.name or task.status != ASSIGNED:
+                # 任务已被收回并重新分配：原代理迟到的回报只做统计
+                self.late_results += 1
+                return
+            # 先解析数值，格式错误时任务保持原状态
+            duration = float(message.get('duration_s') or 0)
+            keystrokes = int(message.get('keystrokes') or 0)
+            del agent.outstanding[task.id]
+            agent.outstanding_cost -= task.cost
+            if message.get('outcome') == 'done':
+                task.status = DONE
+                self._unfinished -= 1
+                agent.done += 1
+                agent.keystrokes += keystrokes
+                if duration > 0 and keystrokes > 0:
+                    agent.rate += self.rate_smoothing * (keystrokes / duration - agent.rate)
+            else:
+                agent.failed += 1
+                task.attempts += 1
+                task.agent = None
+                if task.attempts >= self.max_attempts:
+                    task.status = FAILED
+                    self._unfinished -= 1
+                else:
+                    task.status = PENDING
+                    self._pending.appendleft(task)
+            self._changed.notify_all()
+        self.dispatch()
+
+    def _mark_dead(self, agent):
+        """代理断开或超时：收回其未完成的任务，按原顺序放回队列最前面"""
+        with self._lock:
+            if not agent.alive:
+                return
+            agent.alive = False
+            tasks = sorted(agent.outstanding.values(), key=lambda t: t.id)
+            for task in reversed(tasks):
+                task.status = PENDING
+                task.agent = None
+                self._pending.appendleft(task)
+            agent.reassigned += len(tasks)
+            agent.outstanding.clear()
+            agent.outstanding_cost = 0
+            self._changed.notify_all()
+        print(f"代理已断开: {agent.name}，收回{len(tasks)}个任务")
+        self._close(agent.sock)
+        self.dispatch()
+
+    def _monitor_loop(self):
+        while not self._stopped.wait(0.5):
+            now = time.monotonic()
+            with self._lock:
+                stale = [agent for agent in self.agents.values()
+                         if agent.alive and now - agent.last_seen > self.dead_after_s]
+            for agent in stale:
+                self._mark_dead(agent)
+            self.dispatch()
+
+    @staticmethod
+    def _close(sock):
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+
+
+# ---------------------------------------------------------------------------
+# 代理
+# ---------------------------------------------------------------------------
+
+class LocalExecutor:
+    """无界面代理的执行器：单个线程按顺序输入任务"""
+
+    def __init__(self, sink=None, profile=None):
+        self.engine = TypingEngine(sink)
+        self.profile = profile or TimingProfile()
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        threading.Thread(target=self._run, name='agent-typing', daemon=True).start()
+
+    def __call__(self, segments, on_done):
+        self._queue.put((segments, on_done))
+
+    def queued(self):
+        return self._queue.qsize()
+
+    def cancel_pending(self):
+        """丢弃尚未开始的任务（与控制端断开后，这些任务会被重新分配）"""
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def stop(self):
+        """停止输入：当前任务在下一个字符处中断"""
+        self._stop.set()
+        self.cancel_pending()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                segments, on_done = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            began = time.perf_counter()
+            before = self.engine.keystrokes
+            try:
+                completed = self.engine.type_segments(segments, self.profile, stop_event=self._stop)
+                outcome = 'done' if completed is not False else 'stopped'
+            except Exception as e:
+                print(f"代理输入失败: {e}")
+                outcome = 'error'
+            if outcome != 'stopped':
+                on_done(outcome, time.perf_counter() - began, self.engine.keystrokes - before)
+
+
+class Agent:
+    """连接控制端并执行收到的任务；连接断开后按间隔重连
+
+    executor(segments, on_done) 负责执行任务并在结束后调用 on_done(outcome, duration_s, keystrokes)；
+    默认为LocalExecutor。在界面程序中可传入把任务放进输入队列的函数。
+    每次与控制端断开（含stop）后调用on_disconnect()：控制端会把未完成的任务重新分配，
+    执行方应丢弃尚未开始的任务，否则同一条记录会被输入两次。
+    """
+
+    def __init__(self, host, port=DEFAULT_PORT, name=None, executor=None, profile=None, sink=None,
+                 heartbeat_s=1.0, reconnect_s=2.0, token=None, on_disconnect=None):
+        self.host = host
+        self.token = token or None
+        self.port = int(port)
+        self.name = name or socket.gethostname()
+        self.profile = profile or TimingProfile()
+        self.executor = executor if executor is not None else LocalExecutor(sink, self.profile)
+        self.heartbeat_s = heartbeat_s
+        self.reconnect_s = reconnect_s
+        self.on_disconnect = on_disconnect
+        self.completed = 0
+        self.connected = False
+        self._sock = None
+        self._send_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name='cluster-agent', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止代理并断开连接（未完成的任务由控制端重新分配）"""
+        self._stopped.set()
+        if isinstance(self.executor, LocalExecutor):
+            self.executor.stop()
+        sock = self._sock
+        if sock is not None:
+            Controller._close(sock)
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                self._session()
+            except OSError as e:
+                if not self._stopped.is_set():
+                    print(f"代理连接失败: {e}，{self.reconnect_s:.0f}秒后重试")
+            except Exception as e:
+                # 任何异常都只结束本次连接，代理线程继续重连
+                print(f"代理连接异常: {e}，{self.reconnect_s:.0f}秒后重试")
+            self.connected = False
+            self._drop_pending()
+            self._stopped.wait(self.reconnect_s)
+
+    def _drop_pending(self):
+        """断开后丢弃执行方尚未开始的任务（控制端会重新分配）"""
+        if isinstance(self.executor, LocalExecutor):
+            self.executor.cancel_pending()
+        if self.on_disconnect is not None:
+            try:
+                self.on_disconnect()
+            except Exception as e:
+                print(f"丢弃代理任务失败: {e}")
+
+    def _session(self):
+        sock = socket.create_connection((self.host, self.port), timeout=10)
+        sock.settimeout(None)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock = sock
+        try:
+            nonce = secrets.token_hex(16)
+            _send(sock, self._send_lock, {'type': 'hello', 'name': self.name, 'rate': estimate_rate(self.profile),
+                                          'nonce': nonce,
+                                          'proof': _proof(self.token, 'agent', nonce) if self.token else None})
+            messages = _iter_messages(sock)
+            welcome = next(messages, None)
+            if welcome is None or welcome.get('type') != 'welcome':
+                raise ConnectionError("控制端拒绝连接（令牌不符？）")
+            if self.token is not None:
+                # 设置了令牌时同时验证控制端，防止冒充的控制端下发任务
+                proof = welcome.get('proof')
+                if not isinstance(proof, str) or not hmac.compare_digest(proof, _proof(self.token, 'controller', nonce)):
+                    raise ConnectionError("控制端未通过令牌验证")
+            self.connected = True
+            threading.Thread(target=self._heartbeat_loop, args=(sock,), name='agent-heartbeat', daemon=True).start()
+            for message in messages:
+                if message.get('type') != 'job':
+                    continue
+                task_id = message.get('task')
+                if not isinstance(task_id, int) or isinstance(task_id, bool):
+                    print(f"忽略无效的任务消息: {str(message)[:80]}")
+                    continue
+                reporter = self._reporter(sock, task_id)
+                try:
+                    segments = parse_segments(message.get('segments'))
+                except ValueError as e:
+                    print(f"拒绝任务{task_id}: {e}")
+                    reporter('rejected', 0.0, 0)
+                    continue
+                self.executor(segments, reporter)
+        finally:
+            self._sock = None
+            Controller._close(sock)
+
+    def _reporter(self, sock, task_id):
+        def _on_done(outcome, duration, keystrokes):
+            if outcome == 'done':
+                self.completed += 1
+            try:
+                _send(sock, self._send_lock, {'type': 'done', 'task': task_id, 'outcome': outcome,
+                                              'duration_s': round(duration, 4), 'keystrokes': keystrokes})
+            except OSError:
+                pass
+        return _on_done
+
+    def _heartbeat_loop(self, sock):
+        while not self._stopped.wait(self.heartbeat_s) and self._sock is sock:
+            queued = self.executor.queued() if hasattr(self.executor, 'queued') else 0
+            try:
+                _send(sock, self._send_lock, {'type': 'heartbeat', 'queued': queued})
+            except OSError:
+                return
+
+
+# ---------------------------------------------------------------------------
+# 命令行
+# ---------------------------------------------------------------------------
+
+def _print_progress(controller):
+    progress = controller.progress()
+    tasks = progress['tasks']
+    print(f"完成{tasks[DONE]} 失败{tasks[FAILED]} 执行中{tasks[ASSIGNED]} 待分配{tasks[PENDING]}")
+    for agent in progress['agents']:
+        state = '在线' if agent['alive'] else '离线'
+        print(f"  {agent['name']}: {state} 完成{agent['done']} 失败{agent['failed']} "
+              f"速率{agent['rate']}键/秒 收回{agent['reassigned']}")
+
+
+def run_demo(agent_count=4, lines=400, kill=1, base_delay_ms=1):
+    """本机演示：启动控制端与若干内存输出端代理（速度各不相同），中途断开kill个代理
+
+    返回是否每一行都被某个代理完整输入。
+    """
+    token = secrets.token_hex(8)
+    controller = Controller('127.0.0.1', 0, dead_after_s=2.0, token=token).start()
+    sinks = [MemorySink() for _ in range(agent_count)]
+    agents = [Agent('127.0.0.1', controller.port, name=f'agent{i + 1}', sink=sink, heartbeat_s=0.5, token=token,
+                    profile=TimingProfile(char_delay_ms=base_delay_ms * (i + 1), name=f'delay{i + 1}'))
+              for i, sink in enumerate(sinks)]
+    for agent in agents:
+        agent.start()
+    while len(controller.progress()['agents']) < agent_count:
+        time.sleep(0.05)
+
+    batch = [f'SN-{number:06d}' for number in range(1, lines + 1)]
+    began = time.perf_counter()
+    controller.submit_lines(batch)
+    if kill:
+        # 完成约三分之一后断开前kill个代理
+        while controller.progress()['tasks'][DONE] < lines // 3:
+            time.sleep(0.02)
+        for agent in agents[:kill]:
+            agent.stop()
+    controller.wait()
+    elapsed = time.perf_counter() - began
+    _print_progress(controller)
+
+    typed = set()
+    for sink in sinks:
+        typed.update(line for line in sink.text().split('\n'))
+    missing = [line for line in batch if line not in typed]
+    print(f"用时{elapsed:.2f}s，重复回报{controller.progress()['late_results']}，缺失{len(missing)}行")
+    for agent in agents:
+        agent.stop()
+    controller.stop()
+    return not missing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="控制端/代理模式")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    demo = sub.add_parser('demo', help="本机演示（内存输出端）")
+    demo.add_argument('--agents', type=int, default=4)
+    demo.add_argument('--lines', type=int, default=400)
+    demo.add_argument('--kill', type=int, default=1, help="中途断开的代理数")
+
+    ctl = sub.add_parser('controller', help="启动控制端并分发文件中的各行")
+    ctl.add_argument('path', help="每行一条的输入文件")
+    ctl.add_argument('--host', default=DEFAULT_HOST, help="监听地址，默认只接受本机连接")
+    ctl.add_argument('--port', type=int, default=DEFAULT_PORT)
+    ctl.add_argument('--token', default=os.environ.get(TOKEN_ENV), help=f"共享令牌，默认取环境变量{TOKEN_ENV}")
+    ctl.add_argument('--min-agents', type=int, default=1, help="至少连接多少个代理后开始分发")
+    ctl.add_argument('--no-enter', action='store_true', help="每行之后不按回车")
+
+    agent_parser = sub.add_parser('agent', help="启动代理")
+    agent_parser.add_argument('address', help="控制端地址 host:port")
+    agent_parser.add_argument('--name', help="代理名称，默认为主机名")
+    agent_parser.add_argument('--delay', type=int, default=20, help="字符间隔（毫秒）")
+    agent_parser.add_argument('--memory', action='store_true', help="使用内存输出端（不发送真实按键）")
+    agent_parser.add_argument('--token', default=os.environ.get(TOKEN_ENV), help=f"共享令牌，默认取环境变量{TOKEN_ENV}")
+
+    args = parser.parse_args(argv)
+    if args.command == 'demo':
+        return 0 if run_demo(args.agents, args.lines, args.kill) else 1
+
+    if args.command == 'controller':
+        with open(args.path, 'r', encoding='utf-8-sig') as f:
+            lines = [line.rstrip('\r\n') for line in f]
+        try:
+            controller = Controller(args.host, args.port, token=args.token).start()
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+        print(f"控制端已启动: {args.host}:{controller.port}，等待{args.min_agents}个代理")
+        while len([a for a in controller.progress()['agents'] if a['alive']]) < args.min_agents:
+            time.sleep(0.2)
+        try:
+            controller.submit_lines(lines, with_enter=not args.no_enter)
+        except ValueError as e:
+            print(f"输入文件中有代理不会执行的内容: {e}", file=sys.stderr)
+            controller.stop()
+            return 2
+        try:
+            while not controller.wait(timeout=5):
+                _print_progress(controller)
+        except KeyboardInterrupt:
+            pass
+        _print_progress(controller)
+        controller.stop()
+        return 0 if controller.progress()['tasks'][FAILED] == 0 else 1
+
+    host, _, port = args.address.rpartition(':')
+    sink = MemorySink() if args.memory else None
+    agent = Agent(host or DEFAULT_HOST, int(port or DEFAULT_PORT), name=args.name, sink=sink,
+                  profile=TimingProfile(char_delay_ms=args.delay), token=args.token)
+    try:
+        agent.run()
+    except KeyboardInterrupt:
+        agent.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
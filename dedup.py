@@ -0,0 +1,156 @@
+"""重复任务抑制：同一内容的任务在时间窗口内只输入一次
+
+双击历史卡片、连按回车、外部重试都可能让同一条码被输入两次（库存重复计数）。
+DedupWindow按任务内容的哈希值记录最近输入过的任务，窗口内再次提交的相同任务被丢弃；
+窗口长度可按来源单独设置（如定时任务本就需要重复，设为0即不去重）。
+
+哈希值保存在按时间分桶的过期集合（时间轮）中：
+    - 每个桶覆盖bucket_ms毫秒，到期的桶整桶清空，每次操作只推进经过的桶，均摊O(1)；
+    - 只保存64位哈希值，不保存任务内容；总数超过max_keys时提前清空最早到期的桶，
+      持续高频提交时内存保持有界。
+"""
+import threading
+import time
+
+DEFAULT_WINDOW_MS = 500
+# 定时任务按计划重复执行，模板每次展开内容不同，默认不去重
+DEFAULT_SOURCE_WINDOWS = {'schedule': 0, 'template': 0}
+
+
+class ExpiringSet:
+    """按到期时间分桶的集合：元素在加入ttl_ms毫秒后自动过期
+
+    ttl_ms不超过max_ttl_ms；桶数为max_ttl_ms / bucket_ms + 1，到期时间的误差不超过一个桶宽，
+    且只会提前、不会推后。
+    """
+
+    def __init__(self, max_ttl_ms=60000, bucket_ms=50, max_keys=100000, clock=time.monotonic):
+        self.bucket_ms = max(1, int(bucket_ms))
+        self.max_ttl_ms = max(self.bucket_ms, int(max_ttl_ms))
+        self.max_keys = max(1, int(max_keys))
+        self._clock = clock
+        self._slots = [set() for _ in range(self.max_ttl_ms // self.bucket_ms + 1)]
+        self._expiry = {}  # 元素 -> 到期桶序号
+        self._cursor = self._bucket(self._clock())  # 已清理到的桶序号
+        self.evicted = 0  # 因超过max_keys被提前清除的元素数
+
+    def _bucket(self, now):
+        return int(now * 1000) // self.bucket_ms
+
+    def _advance(self, now):
+        """清空已到期的桶（最多转一圈）"""
+        current = self._bucket(now)
+        steps = min(current - self._cursor, len(self._slots))
+        for offset in range(1, steps + 1):
+            self._drop_slot((self._cursor + offset) % len(self._slots))
+        if current > self._cursor:
+            self._cursor = current
+
+    def _drop_slot(self, index):
+        slot = self._slots[index]
+        for key in slot:
+            del self._expiry[key]
+        slot.clear()
+
+    def __len__(self):
+        return len(self._expiry)
+
+    def __contains__(self, key):
+        self._advance(self._clock())
+        return key in self._expiry
+
+    def add(self, key, ttl_ms):
+        """加入（或续期）元素；ttl_ms<=0时不加入"""
+        if ttl_ms <= 0:
+            return
+        self._advance(self._clock())
+        # 到期桶向下取整：元素在第bucket个桶被清空时过期
+        bucket = self._cursor + max(1, min(int(ttl_ms), self.max_ttl_ms) // self.bucket_ms)
+        old = self._expiry.get(key)
+        if old is not None:
+            self._slots[old % len(self._slots)].discard(key)
+        self._slots[bucket % len(self._slots)].add(key)
+        self._expiry[key] = bucket
+        # 超过容量时从最早到期的桶开始清除
+        offset = 1
+        while len(self._expiry) > self.max_keys and offset < len(self._slots):
+            index = (self._cursor + offset) % len(self._slots)
+            self.evicted += len(self._slots[index])
+            self._drop_slot(index)
+            offset += 1
+
+    def discard(self, key):
+        """移除元素（不存在时忽略）"""
+        bucket = self._expiry.pop(key, None)
+        if bucket is not None:
+            self._slots[bucket % len(self._slots)].discard(key)
+
+    def clear(self):
+        for slot in self._slots:
+            slot.clear()
+        self._expiry.clear()
+
+
+class DedupWindow:
+    """按任务内容哈希抑制时间窗口内的重复任务（线程安全）"""
+
+    def __init__(self, window_ms=DEFAULT_WINDOW_MS, source_windows=None, max_keys=100000,
+                 clock=time.monotonic):
+        self.window_ms = max(0, int(window_ms))
+        self.source_windows = {}
+        self._seen = ExpiringSet(max_ttl_ms=60000, bucket_ms=10, max_keys=max_keys, clock=clock)
+        self._lock = threading.Lock()
+        # 统计
+        self.passed = 0
+        self.suppressed = {}  # 来源 -> 被抑制的任务数
+        self.configure(source_windows=DEFAULT_SOURCE_WINDOWS if source_windows is None else source_windows)
+
+    def configure(self, window_ms=None, source_windows=None):
+        """运行中调整窗口长度与各来源的窗口"""
+        with self._lock:
+            if window_ms is not None:
+                self.window_ms = max(0, int(window_ms))
+            if source_windows is not None:
+                self.source_windows = {str(k): max(0, int(v)) for k, v in source_windows.items()}
+
+    def window_for(self, source):
+        return self.source_windows.get(source, self.window_ms)
+
+    def admit(self, job):
+        """任务是否应当输入；接受的任务开始计时窗口（流式任务无法比较内容，总是接受）"""
+        window = self.window_for(job.source)
+        key = job.payload_key()
+        if window <= 0 or key is None:
+            return True
+        digest = hash(key)
+        with self._lock:
+            if digest in self._seen:
+                self.suppressed[job.source] = self.suppressed.get(job.source, 0) + 1
+                return False
+            self._seen.add(digest, window)
+            self.passed += 1
+            return True
+
+    def release(self, job):
+        """撤销admit：已接受但未能放入输入队列的任务不占用窗口，重试时不会被当作重复"""
+        if self.window_for(job.source) <= 0:
+            return
+        key = job.payload_key()
+        if key is None:
+            return
+        with self._lock:
+            self._seen.discard(hash(key))
+            self.passed = max(0, self.passed - 1)
+
+    def stats(self):
+        with self._lock:
+            return {'passed': self.passed, 'suppressed': dict(self.suppressed), 'tracked': len(self._seen),
+                    'evicted': self._seen.evicted}
+
+    def to_dict(self):
+        return {'window_ms': self.window_ms, 'source_windows': dict(self.source_windows)}
+
+    @classmethod
+    def from_dict(cls, data):
+        data = data or {}
+        return cls(window_ms=data.get('window_ms', DEFAULT_WINDOW_MS), source_windows=data.get('source_windows'))
@@ -0,0 +1,174 @@
+"""输入耗时预估：不注入按键，按时序参数“空跑”片段流，并用实测结果校准
+
+名义耗时只包含时序参数规定的等待（字符间隔、回车前等待、sleep片段），
+按键级时序（按下保持、Shift间隔）也计入名义耗时。
+实际输入还有每次按键的系统开销，非ASCII字符（需走Unicode注入的慢路径）开销更大。
+CostModel用最近若干次实测的（按键数, 慢路径字符数, 实测-名义）做最小二乘，
+估计这两项单位开销。
+"""
+import re
+import threading
+from collections import deque
+
+from typing_engine import US_SHIFTED_SYMBOLS
+
+COUNTDOWN_S = 2.0  # 开始输入前的倒计时
+
+# 用正则在C层面统计，空跑大文件时不逐字符调用Python函数
+_SLOW_RE = re.compile(r'[^ -~]')
+_SHIFTED_CLASS = '[A-Z' + ''.join(re.escape(c) for c in US_SHIFTED_SYMBOLS) + ']'
+_SHIFTED_RE = re.compile(_SHIFTED_CLASS)
+_SHIFT_RUN_RE = re.compile(_SHIFTED_CLASS + '+')
+
+
+def is_slow_char(char):
+    """非可打印ASCII字符需要通过Unicode方式注入，比普通按键慢"""
+    return not (' ' <= char <= '~')
+
+
+class SegmentTally:
+    """包装片段流，在片段经过时累计空跑统计（用于实测校准，不额外遍历片段）"""
+
+    def __init__(self, segments):
+        self._segments = segments
+        self.chars = 0
+        self.slow_chars = 0
+        self.shifted_chars = 0  # 需要Shift的字符数
+        self.shift_runs = 0  # 连续需要Shift的字符段数（保持Shift时每段只按一次）
+        self.enters = 0
+        self.other_keys = 0
+        self.sleep_ms = 0
+        self.records = 0
+
+    def __iter__(self):
+        for segment in self._segments:
+            self.add(segment)
+            yield segment
+
+    def add(self, segment):
+        kind, value = segment
+        if kind == 'text':
+            self.chars += len(value)
+            self.slow_chars += len(_SLOW_RE.findall(value))
+            self.shifted_chars += len(_SHIFTED_RE.findall(value))
+            self.shift_runs += len(_SHIFT_RUN_RE.findall(value))
+        elif kind == 'key':
+            if value == 'enter':
+                self.enters += 1
+            else:
+                self.other_keys += 1
+        elif kind == 'sleep':
+            self.sleep_ms += value
+        elif kind == 'record':
+            self.records += 1
+
+    def consume(self):
+        """遍历全部片段（空跑）"""
+        for segment in self._segments:
+            self.add(segment)
+        return self
+
+    @property
+    def keystrokes(self):
+        return self.chars + self.enters + self.other_keys
+
+    def nominal_seconds(self, profile):
+        """按输入引擎的等待规则计算名义耗时：回车前等待enter_delay，其余按键之后等待char_delay"""
+        total_ms = ((self.chars + self.other_keys) * profile.char_delay_ms
+                    + self.enters * profile.enter_delay_ms + self.sleep_ms)
+        if profile.key_level:
+            # 慢路径字符直接写入，不经过按下/松开；Shift按下和松开各等待一次间隔
+            total_ms += (self.keystrokes - self.slow_chars) * profile.key_hold_ms
+            shift_presses = self.shift_runs if profile.hold_shift else self.shifted_chars
+            total_ms += 2 * shift_presses * profile.modifier_gap_ms
+        return total_ms / 1000.0
+
+
+class CostModel:
+    """按键开销模型：实际耗时 ≈ 名义耗时 + 按键数×key_overhead + 慢路径字符数×slow_overhead
+
+    observe在输入线程中调用，estimate与to_dict在预估线程和界面线程中调用，样本与系数由一把锁保护。
+    """
+
+    def __init__(self, key_overhead_s=0.0005, slow_overhead_s=0.005, keep=50):
+        self.key_overhead_s = key_overhead_s
+        self.slow_overhead_s = slow_overhead_s
+        self.samples = deque(maxlen=keep)  # (按键数, 慢路径字符数, 实测-名义)
+        self._lock = threading.Lock()
+
+    def observe(self, tally, profile, measured_s):
+        """记录一次实测结果并重新拟合"""
+        if tally.keystrokes <= 0 or measured_s <= 0:
+            return
+        residual = measured_s - tally.nominal_seconds(profile)
+        with self._lock:
+            self.samples.append((tally.keystrokes, tally.slow_chars, residual))
+            self._fit()
+
+    def _fit(self):
+        # 无截距的二元最小二乘；慢路径样本不足（矩阵奇异）时只拟合按键开销
+        skk = sum(k * k for k, _, _ in self.samples)
+        sss = sum(s * s for _, s, _ in self.samples)
+        sks = sum(k * s for k, s, _ in self.samples)
+        skr = sum(k * r for k, _, r in self.samples)
+        ssr = sum(s * r for _, s, r in self.samples)
+        det = skk * sss - sks * sks
+        if sss > 0 and det > 1e-9 * skk * sss:
+            key = (skr * sss - ssr * sks) / det
+            slow = (skk * ssr - sks * skr) / det
+            if key >= 0 and slow >= 0:
+                self.key_overhead_s = key
+                self.slow_overhead_s = slow
+                return
+        residual = sum(r - s * self.slow_overhead_s for _, s, r in self.samples)
+        keys = sum(k for k, _, _ in self.samples)
+        if keys:
+            self.key_overhead_s = max(0.0, residual / keys)
+
+    def estimate(self, jobs, profile):
+        """空跑一批任务（[(片段或已统计的SegmentTally, 是否倒计时)]），返回预估结果"""
+        with self._lock:
+            key_overhead_s, slow_overhead_s = self.key_overhead_s, self.slow_overhead_s
+            calibrated = bool(self.samples)
+        result = {'duration_s': 0.0, 'nominal_s': 0.0, 'keystrokes': 0, 'slow_chars': 0,
+                  'records': 0, 'jobs': 0, 'calibrated': calibrated}
+        for segments, countdown in jobs:
+            tally = segments if isinstance(segments, SegmentTally) else SegmentTally(segments).consume()
+            nominal = tally.nominal_seconds(profile) + (COUNTDOWN_S if countdown else 0.0)
+            result['nominal_s'] += nominal
+            result['duration_s'] += (nominal + tally.keystrokes * key_overhead_s
+                                     + tally.slow_chars * slow_overhead_s)
+            result['keystrokes'] += tally.keystrokes
+            result['slow_chars'] += tally.slow_chars
+            result['records'] += tally.records
+            result['jobs'] += 1
+        return result
+
+    def to_dict(self):
+        """在锁内取快照，可在输入线程记录新样本的同时调用"""
+        with self._lock:
+            return {
+                'key_overhead_s': self.key_overhead_s,
+                'slow_overhead_s': self.slow_overhead_s,
+                'samples': [list(sample) for sample in self.samples],
+            }
+
+    @classmethod
+    def from_dict(cls, data):
+        data = data or {}
+        model = cls(key_overhead_s=float(data.get('key_overhead_s', 0.0005)),
+                    slow_overhead_s=float(data.get('slow_overhead_s', 0.005)))
+        for sample in data.get('samples', []):
+            if len(sample) == 3:
+                model.samples.append(tuple(sample))
+        return model
+
+
+def format_duration(seconds):
+    """把秒数格式化为简短文本：45秒 / 3分20秒 / 2时05分"""
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}秒"
+    if seconds < 3600:
+        return f"{seconds // 60}分{seconds % 60:02d}秒"
+    return f"{seconds // 3600}时{seconds % 3600 // 60:02d}分"
@@ -0,0 +1,75 @@
+"""大文件流式输入：分块读取（优先mmap）、增量解码、边读边输入
+
+任何时刻内存中只保留一个块，历史记录中只保存文件引用（@file:路径）。
+"""
+import codecs
+import mmap
+import os
+
+FILE_REF_PREFIX = '@file:'
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def file_ref(path):
+    """历史记录中保存的文件引用"""
+    return FILE_REF_PREFIX + os.path.abspath(path)
+
+
+def parse_file_ref(text):
+    """若text是文件引用则返回路径，否则返回None"""
+    if text.startswith(FILE_REF_PREFIX):
+        return text[len(FILE_REF_PREFIX):].strip()
+    return None
+
+
+def _iter_bytes(f, chunk_size):
+    """按块读取文件
+
+    支持madvise的平台用mmap切片，并在每块读完后释放对应页面，使常驻内存不随文件增长；
+    其他平台（如Windows，映射视图会计入工作集）及无法映射的文件（空文件、管道等）用缓冲读取。
+    """
+    mapped = None
+    if hasattr(mmap, 'MADV_DONTNEED'):
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            mapped = None
+    if mapped is None:
+        while True:
+            block = f.read(chunk_size)
+            if not block:
+                return
+            yield block
+    # madvise要求按页对齐
+    chunk_size = max(mmap.PAGESIZE, chunk_size - chunk_size % mmap.PAGESIZE)
+    with mapped:
+        for offset in range(0, len(mapped), chunk_size):
+            block = mapped[offset:offset + chunk_size]
+            mapped.madvise(mmap.MADV_DONTNEED, offset, len(block))
+            yield block
+
+
+def iter_file_text(path, encoding='utf-8-sig', chunk_size=DEFAULT_CHUNK_SIZE):
+    """逐块读取并增量解码文件，多字节字符跨块时也能正确拼接"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    with open(path, 'rb') as f:
+        for block in _iter_bytes(f, chunk_size):
+            text = decoder.decode(block)
+            if text:
+                yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def file_segments(path, encoding='utf-8-sig', chunk_size=DEFAULT_CHUNK_SIZE):
+    """将文件转换为片段流：换行输入为回车键，每行结束作为一条记录"""
+    for chunk in iter_file_text(path, encoding, chunk_size):
+        lines = chunk.split('\n')
+        for i, line in enumerate(lines):
+            line = line.replace('\r', '')
+            if line:
+                yield ('text', line)
+            if i < len(lines) - 1:
+                yield ('key', 'enter')
+                yield ('record', None)
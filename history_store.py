@@ -0,0 +1,194 @@
+"""紧凑的历史记录存储：所有记录以UTF-8顺序打包在一个bytearray中，另用数组保存各记录的结束偏移
+
+与list[str]相比，每条记录只占编码后的字节数加上4~8字节偏移，没有每个str对象约50字节的固定开销；
+查找（去重）直接在打包数据上做子串搜索。对外提供历史记录用到的list子集，
+下标0为最新一条。
+
+记录之间以\\0分隔（数据以\\0开头，每条记录后跟\\0），记录本身不能包含\\0（写入时去掉）。
+
+历史记录部分的内存（Linux x86_64，Python 3，记录平均约30字节，python history_store.py 实测）：
+    记录数      常驻内存增量               tracemalloc：载入后保留 / 载入峰值
+                list[str]   HistoryArena   list[str]    HistoryArena
+    0           0 MB        0 MB           0 MB         0 MB / 0 MB
+    1 000       0.11 MB     <0.03 MB       0.13 MB      0.04 MB / 0.17 MB
+    100 000     13.1 MB     3.4 MB         12.6 MB      3.8 MB / 17.2 MB
+tracemalloc一栏按程序载入历史记录文件的方式测量（json解析为list[str]后打包，见traced_footprint）：
+载入完成后保留的内存约为list[str]的30%，载入过程中两者同时存在，峰值高于list[str]。
+上表只是历史记录存储本身，不含界面控件；低内存模式下历史卡片按页创建（每页30条），
+与历史记录条数无关。整个程序（含控件）的常驻内存用 python ui_benchmark.py --low-memory 测量（需要显示或Xvfb）。
+"""
+import bisect
+import os
+import sys
+from array import array
+
+SEPARATOR = b'\0'
+
+
+class HistoryArena:
+    """打包存储的历史记录（最新在前）"""
+
+    def __init__(self, items=None):
+        self._data = bytearray(SEPARATOR)
+        self._ends = array('L')  # 第i条（按添加顺序，最早在前）记录之后的分隔符位置
+        if items:
+            # items按最新在前给出，倒序添加
+            for text in reversed(list(items)):
+                self._append(text)
+
+    # ---- 内部 ----
+
+    @staticmethod
+    def _encode(text):
+        return str(text).replace('\0', '').encode('utf-8')
+
+    def _append(self, text):
+        self._data += self._encode(text)
+        self._ends.append(len(self._data))
+        self._data += SEPARATOR
+
+    def _slot(self, index):
+        """把对外下标（最新为0）转换为内部下标（最早为0）"""
+        count = len(self._ends)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError('历史记录下标越界')
+        return count - 1 - index
+
+    def _span(self, slot):
+        start = self._ends[slot - 1] + 1 if slot > 0 else 1
+        return start, self._ends[slot]
+
+    def _find_slot(self, encoded):
+        position = self._data.find(SEPARATOR + encoded + SEPARATOR)
+        if position < 0:
+            return None
+        return bisect.bisect_left(self._ends, position + 1 + len(encoded))
+
+    def _delete_slot(self, slot):
+        start, end = self._span(slot)
+        size = end + 1 - start
+        del self._data[start:end + 1]
+        tail = array('L', (offset - size for offset in self._ends[slot + 1:]))
+        del self._ends[slot:]
+        self._ends.extend(tail)
+
+    # ---- list子集 ----
+
+    def __len__(self):
+        return len(self._ends)
+
+    def __bool__(self):
+        return len(self._ends) > 0
+
+    def __getitem__(self, index):
+        start, end = self._span(self._slot(index))
+        return self._data[start:end].decode('utf-8')
+
+    def __iter__(self):
+        for slot in range(len(self._ends) - 1, -1, -1):
+            start, end = self._span(slot)
+            yield self._data[start:end].decode('utf-8')
+
+    def __contains__(self, text):
+        return self._find_slot(self._encode(text)) is not None
+
+    def index(self, text):
+        slot = self._find_slot(self._encode(text))
+        if slot is None:
+            raise ValueError('不在历史记录中')
+        return len(self._ends) - 1 - slot
+
+    def remove(self, text):
+        slot = self._find_slot(self._encode(text))
+        if slot is None:
+            raise ValueError('不在历史记录中')
+        self._delete_slot(slot)
+
+    def push(self, text):
+        """添加到最前面；已存在时先移除旧的一条"""
+        slot = self._find_slot(self._encode(text))
+        if slot is not None:
+            self._delete_slot(slot)
+        self._append(text)
+
+    def truncate(self, limit):
+        """只保留最新的limit条"""
+        excess = len(self._ends) - max(0, int(limit))
+        if excess <= 0:
+            return
+        cut = self._ends[excess - 1]  # 最后一条被丢弃记录之后的分隔符
+        del self._data[1:cut + 1]
+        self._ends = array('L', (offset - cut for offset in self._ends[excess:]))
+
+    def clear(self):
+        self._data = bytearray(SEPARATOR)
+        self._ends = array('L')
+
+    def to_list(self):
+        return list(self)
+
+    def nbytes(self):
+        """打包数据与偏移数组占用的字节数"""
+        return len(self._data) + self._ends.itemsize * len(self._ends)
+
+
+def sample_history(count):
+    """测量用的合成历史记录（条码、记录格式混合，平均约30字节；与_measure中的生成式相同）"""
+    return [f'订单 SN-{i:08d}|A{i % 97}|B{i % 89}' for i in range(count)]
+
+
+def traced_footprint(count, packed=True):
+    """用tracemalloc测量按程序的方式载入count条历史记录后保留的内存与载入峰值（字节）
+
+    程序载入历史记录文件时先json解析为list[str]；packed为真时再打包为HistoryArena。
+    """
+    import json
+    import tracemalloc
+    encoded = json.dumps(sample_history(count), ensure_ascii=False)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        store = json.loads(encoded)
+        if packed:
+            store = HistoryArena(store)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del store
+    return retained - before, peak - before
+
+
+def _rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def _measure(sizes=(0, 1000, 100000)):
+    """测量两种存储方式的常驻内存增量（各在独立子进程中测量，避免相互影响）与tracemalloc统计"""
+    import subprocess
+    script = (
+        "import sys, gc, history_store as h\n"
+        "n, kind = int(sys.argv[1]), sys.argv[2]\n"
+        "gc.collect(); before = h._rss_mb()\n"
+        "texts = (f'订单 SN-{i:08d}|A{i % 97}|B{i % 89}' for i in range(n))\n"
+        "if kind == 'arena':\n"
+        "    store = h.HistoryArena()\n"
+        "    for text in texts: store._append(text)\n"
+        "else:\n"
+        "    store = list(texts)\n"
+        "gc.collect(); print(round(h._rss_mb() - before, 2))\n"
+    )
+    print(f"{'记录数':>8} {'list[str]':>12} {'HistoryArena':>14} {'traced list':>12} {'traced arena/peak':>18}")
+    for size in sizes:
+        values = [subprocess.run([sys.executable, '-c', script, str(size), kind], capture_output=True,
+                                 text=True).stdout.strip() for kind in ('list', 'arena')]
+        listed = traced_footprint(size, packed=False)[0] / 1e6
+        packed, peak = (value / 1e6 for value in traced_footprint(size))
+        print(f"{size:>8} {values[0] + ' MB':>12} {values[1] + ' MB':>14} {listed:>9.2f} MB"
+              f" {packed:>8.2f}/{peak:.2f} MB")
+
+
+if __name__ == '__main__':
+    _measure()
@@ -0,0 +1,240 @@
+"""有界、按优先级出队的输入任务队列
+
+溢出策略（队列已满时）：
+    block        等待空位（界面线程提交时不等待，直接拒绝）
+    drop_oldest  丢弃优先级不高于新任务的最早任务
+    drop_newest  丢弃新任务
+    merge        队列中已有相同内容的任务时合并（不论是否已满），否则丢弃新任务
+
+带完成回调（on_done）的任务（如控制端分发的任务）需要各自执行并回报结果，
+不参与合并、不会被drop_oldest丢弃；队列已满时直接拒绝，由提交方回报失败。
+带序号的模板任务（pinned）同样不参与合并、不会被丢弃，丢弃会使已分配的序号跳号；
+提交方以put(policy=BLOCK)等待空位，而不是挤掉已排队的任务。
+
+优先级数值越大越先执行（见typing_engine.SOURCE_PRIORITY），同优先级先进先出；
+被抢占的任务通过requeue放回原位置。
+消费线程取出任务后在处理结束时调用task_done；busy()在同一把锁下同时判断队列与正在处理的任务，
+界面据此切换输入状态，不会在取出任务与开始处理之间误判为空闲。
+"""
+import heapq
+import itertools
+import threading
+import time
+
+from scheduler import LatenessStats
+from tracing import tracer
+
+BLOCK = 'block'
+DROP_OLDEST = 'drop_oldest'
+DROP_NEWEST = 'drop_newest'
+MERGE = 'merge'
+OVERFLOW_POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST, MERGE)
+POLICY_NAMES = {BLOCK: '等待', DROP_OLDEST: '丢弃最早', DROP_NEWEST: '丢弃最新', MERGE: '合并重复'}
+
+
+class JobQueue:
+    """线程安全的有界优先级队列，接口与queue.Queue的常用部分一致"""
+
+    def __init__(self, maxsize=1000, policy=BLOCK):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"未知的溢出策略: {policy}")
+        self.maxsize = max(1, int(maxsize))
+        self.policy = policy
+        self._heap = []  # (-优先级, 序号, 任务)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._active = 0  # 已取出、尚未task_done的任务数
+        # 统计
+        self.enqueued = 0
+        self.dequeued = 0
+        self.dropped_oldest = 0
+        self.dropped_newest = 0
+        self.merged = 0
+        self.rejected = 0  # block策略下非阻塞提交被拒绝的次数
+        self.max_depth = 0
+        self.wait = LatenessStats(keep=5000)  # 排队等待时间
+
+    def configure(self, maxsize=None, policy=None):
+        """运行中调整容量与策略"""
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = max(1, int(maxsize))
+            if policy is not None:
+                if policy not in OVERFLOW_POLICIES:
+                    raise ValueError(f"未知的溢出策略: {policy}")
+                self.policy = policy
+            self._not_full.notify_all()
+
+    def _push(self, job, seq=None):
+        if seq is None:
+            seq = next(self._seq)
+        job.enqueued_at = time.monotonic()
+        job.queue_seq = seq
+        heapq.heappush(self._heap, (-job.priority, seq, job))
+        if len(self._heap) > self.max_depth:
+            self.max_depth = len(self._heap)
+        self._not_empty.notify()
+
+    @staticmethod
+    def _pinned(job):
+        """必须各自执行的任务：不参与合并，不会被drop_oldest丢弃"""
+        return job.pinned or job.on_done is not None
+
+    def _find_duplicate(self, job):
+        key = job.payload_key()
+        if key is None:
+            return None
+        for item in self._heap:
+            if not self._pinned(item[2]) and item[2].payload_key() == key:
+                return item
+        return None
+
+    def _drop_oldest_for(self, job):
+        """丢弃优先级不高于job的最早任务；没有可丢弃的任务返回False"""
+        candidates = [item for item in self._heap if item[2].priority <= job.priority and not self._pinned(item[2])]
+        if not candidates:
+            return False
+        # 优先丢弃优先级最低的，其中最早入队的
+        victim = min(candidates, key=lambda item: (item[2].priority, item[1]))
+        self._heap.remove(victim)
+        heapq.heapify(self._heap)
+        self.dropped_oldest += 1
+        return True
+
+    def put(self, job, block=True, timeout=None, policy=None):
+        """提交任务，返回是否被接受（合并也视为接受）
+
+        policy指定本次提交的溢出策略，默认使用队列的策略。
+        """
+        with tracer.span('enqueue', 'queue', source=job.source, policy=policy or self.policy) as span:
+            accepted = self._put(job, block, timeout, policy)
+            span.set(accepted=accepted)
+            return accepted
+
+    def _put(self, job, block, timeout, policy=None):
+        with self._lock:
+            forced = policy is not None
+            if not forced:
+                policy = self.policy
+            if policy == MERGE and not self._pinned(job):
+                duplicate = self._find_duplicate(job)
+                if duplicate is not None:
+                    # 合并：保留队列中的任务，必要时提升其优先级
+                    if job.priority > duplicate[2].priority:
+                        self._heap.remove(duplicate)
+                        duplicate[2].priority = job.priority
+                        heapq.heapify(self._heap)
+                        heapq.heappush(self._heap, (-job.priority, duplicate[1], duplicate[2]))
+                    self.merged += 1
+                    return True
+
+            if len(self._heap) >= self.maxsize:
+                if policy == BLOCK:
+                    if not block:
+                        self.rejected += 1
+                        return False
+                    deadline = None if timeout is None else time.monotonic() + timeout
+                    while len(self._heap) >= self.maxsize and (forced or self.policy == BLOCK):
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            self.rejected += 1
+                            return False
+                        self._not_full.wait(remaining)
+                elif policy == DROP_OLDEST:
+                    if not self._drop_oldest_for(job):
+                        self.dropped_newest += 1
+                        return False
+                else:
+                    self.dropped_newest += 1
+                    return False
+
+            self._push(job)
+            self.enqueued += 1
+            return True
+
+    def requeue(self, job):
+        """将被抢占的任务放回队列原位置（不受容量限制，不计入入队统计）"""
+        with self._lock:
+            self._push(job, seq=job.queue_seq)
+
+    def get(self, timeout=None):
+        """取出优先级最高的任务；超时抛出TimeoutError"""
+        with self._lock:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not self._heap:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError
+                self._not_empty.wait(remaining)
+            _, _, job = heapq.heappop(self._heap)
+            self._active += 1
+            self.dequeued += 1
+            self.wait.add(time.monotonic() - job.enqueued_at)
+            self._not_full.notify()
+            return job
+
+    def task_done(self):
+        """消费线程处理完一个取出的任务（被抢占的任务先requeue再调用），返回此后队列是否空闲"""
+        with self._lock:
+            self._active = max(0, self._active - 1)
+            return not self._heap and not self._active
+
+    def busy(self):
+        """队列中有任务或有任务正在处理"""
+        with self._lock:
+            return bool(self._heap) or self._active > 0
+
+    def has_higher_priority(self, priority):
+        """队列中是否有优先级高于priority的任务（用于记录边界处的抢占判断）"""
+        with self._lock:
+            return bool(self._heap) and -self._heap[0][0] > priority
+
+    def qsize(self):
+        with self._lock:
+            return len(self._heap)
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def remove(self, predicate):
+        """移除满足predicate的排队任务（不调用其on_done），返回被移除的任务列表"""
+        with self._lock:
+            kept = []
+            removed = []
+            for item in self._heap:
+                (removed if predicate(item[2]) else kept).append(item)
+            if removed:
+                heapq.heapify(kept)
+                self._heap = kept
+                self._not_full.notify_all()
+            return [item[2] for item in removed]
+
+    def clear(self):
+        """清空队列，返回丢弃的任务数"""
+        with self._lock:
+            count = len(self._heap)
+            self._heap = []
+            self._not_full.notify_all()
+            return count
+
+    def stats(self):
+        with self._lock:
+            depth = len(self._heap)
+        wait = self.wait.summary()
+        return {
+            'depth': depth,
+            'max_depth': self.max_depth,
+            'capacity': self.maxsize,
+            'policy': self.policy,
+            'enqueued': self.enqueued,
+            'dequeued': self.dequeued,
+            'dropped_oldest': self.dropped_oldest,
+            'dropped_newest': self.dropped_newest,
+            'merged': self.merged,
+            'rejected': self.rejected,
+            'wait_mean_ms': wait['mean_ms'],
+            'wait_p95_ms': wait['p95_ms'],
+            'wait_max_ms': wait['max_ms'],
+        }
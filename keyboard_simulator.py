@@ -1,14 +1,49 @@
 import tkinter as tk
 from tkinter import ttk
 import tkinter.messagebox as messagebox
-import keyboard
+import tkinter.filedialog as filedialog
+import tkinter.simpledialog as simpledialog
 import time
 import threading
+import queue
 import json
 import os
+import gc
+import ctypes
+import sys
+import multiprocessing
+
+from typing_engine import TypingEngine, TimingProfile, TypingJob, text_segments
+from template_engine import TemplateError, compile_template, looks_like_template
+import barcode_generator
+from scheduler import PlaybackScheduler
+from metrics import MetricsRegistry
+from estimator import CostModel, SegmentTally, format_duration
+from settings_profiles import SettingsProfile, ProfileSwitcher, foreground_external_title
+from tracing import tracer, slow_span_hook
+from history_store import HistoryArena
+from dedup import DedupWindow, DEFAULT_WINDOW_MS
+import preflight
+from audit_journal import AuditJournal, segments_text
+from cluster import Agent, DEFAULT_HOST, DEFAULT_PORT, TOKEN_ENV
+from file_source import file_ref, file_segments, parse_file_ref
+from job_queue import JobQueue, OVERFLOW_POLICIES, POLICY_NAMES, BLOCK
+from record_mode import (RecordFormat, ThroughputMeter, read_records, record_segments,
+                         split_input_record, stream_segments)
+from typing_tuner import TkCaptureTarget, TypingRateTuner, machine_id
+
+# 界面切换的耗时预算：一帧（60Hz）
+FRAME_BUDGET_MS = 1000.0 / 60
+
+# 倒计时结束前查询前台窗口的时长上限（秒）：查询在倒计时之内完成，不推迟第一个按键
+FOREGROUND_PROBE_S = 0.25
+
+# 界面与读写操作过慢时输出日志；在模块级注册一次，多次创建界面不会重复注册
+SLOW_SPAN_HOOK = tracer.add_hook(slow_span_hook(100, categories=('ui', 'io')))
 
 class KeyboardSimulatorApp:
-    def __init__(self, root):
+    def __init__(self, root, sink=None):
+        """sink为输入输出端，默认向真实键盘发送按键（性能测试等场景可传入MemorySink）"""
         # 设置中文字体支持
         self.font_config = ('Microsoft YaHei UI', 9)
 
@@ -35,7 +70,14 @@ class KeyboardSimulatorApp:
         self.window_alpha = tk.IntVar(value=100)  # 窗口透明度 0-100
         self.is_typing = False  # 是否正在输入，防止重复触发
         self.ultra_compact = tk.BooleanVar(value=False)  # 极致紧凑模式（折叠历史时更小）
-        self.history = []  # 用于存储历史记录的列表，保持插入顺序
+        self.history = HistoryArena()  # 历史记录（紧凑打包存储，最新在前）
+        # 低内存模式：历史卡片分页按需创建，空闲一段时间后释放隐藏的界面并归还内存
+        self.low_memory_mode = tk.BooleanVar(value=False)
+        self.history_page_size = 30  # 低内存模式下每次创建的历史卡片数
+        self.idle_release_s = 120  # 低内存模式下空闲多久后释放界面（秒）
+        self._last_activity = time.monotonic()
+        self._idle_released = False
+        self._history_rendered = 0  # 已创建卡片的历史记录条数
         self.history_visible = False  # 历史记录区域的显示状态
         self.max_history_items = 50  # 最大历史记录条数
         # 将历史记录保存在系统临时目录，避免在exe目录生成多余文件
@@ -44,13 +86,72 @@ class KeyboardSimulatorApp:
         # self.history_file = os.path.join(tempfile.gettempdir(), 'keyboard_history.json')
         self.history_file = 'keyboard_history.json'  # 历史记录保存文件
         self.settings_file = 'keyboard_settings.json'  # 设置保存文件
+        self.template_file = 'keyboard_templates.json'  # 模板序号状态保存文件
+        self.template_counters = {}  # 模板序号状态 {模板原文: [各序号的下一个值]}
+        self.cost_model_file = 'keyboard_cost_model.json'  # 耗时预估校准数据保存文件（按机器）
+        self.cost_model = CostModel()  # 按实测结果校准的按键开销模型
+        self._cost_model_dirty = False
+        self.estimate_var = tk.StringVar(value='')  # 开始按钮旁显示的预估耗时
+        self._estimate_generation = 0  # 预估代次，丢弃过期的后台预估结果
+        self._estimate_after = None
+        self._file_tallies = {}  # 文件路径 -> ((修改时间, 大小), 空跑统计)，文件未变化时预估不再重新扫描
 
         # 输入间隔时间（毫秒）
         self.typing_delay = tk.IntVar(value=20)  # 默认20ms
+        self.enter_delay_ms = 0  # 按回车前的额外等待（毫秒），可由自动调优得出
+        # 按键级时序：按下保持时间、Shift与字符键之间的间隔、连续大写时保持Shift
+        self.key_hold_ms = tk.IntVar(value=0)
+        self.modifier_gap_ms = tk.IntVar(value=0)
+        self.hold_shift = tk.BooleanVar(value=False)
+        # 命名配置方案：按热键或前台窗口标题即时切换，切换时不写文件、不重新布局
+        self.profile_switcher = ProfileSwitcher()
+        self._profile_hotkeys = []  # 已注册的全局热键句柄
+        self.machine_profiles = {}  # 按机器保存的自动调优结果 {机器名: 时序参数}
+        # 运行指标（需早于其他组件创建，以便记录各环节耗时）
+        self.metrics = MetricsRegistry()
+        self.metrics_auto_export = tk.BooleanVar(value=False)  # 是否定期导出指标文件
+        self.metrics_export_dir = '.'  # 指标文件导出目录
+        self.init_metrics()
+        # 事件追踪（默认关闭）；过慢操作的日志见SLOW_SPAN_HOOK
+        self.tracing_enabled = tk.BooleanVar(value=False)
+        # 审计日志（默认开启）：每个输入任务的时间、内容、来源与结果，由后台线程压缩写入audit目录
+        self.audit_enabled = tk.BooleanVar(value=True)
+        self.audit = AuditJournal()
+        self.audit.start()
+        # 代理模式：连接控制端后接收分发的任务，放入本机输入队列执行
+        self.cluster_agent = None
+
+        self.typing_engine = TypingEngine(sink)
+
+        # 记录模式：文本框按“|”拆分为多个字段，字段之间按分隔键切换
+        self.record_mode = tk.BooleanVar(value=False)
+        self.field_separator = tk.StringVar(value='tab')  # 字段分隔键
+        self.record_terminator = tk.StringVar(value='enter')  # 记录结束键
+        self.field_delay = tk.IntVar(value=0)  # 字段之间的等待（毫秒）
+        self.record_delay = tk.IntVar(value=0)  # 记录之间的等待（毫秒）
+        self.throughput = ThroughputMeter()
+        # 输入队列：有界、按优先级出队，由单个后台线程依次执行，避免UI卡顿
+        self.queue_max_size = tk.IntVar(value=1000)  # 队列容量
+        self.queue_policy = tk.StringVar(value=BLOCK)  # 队列满时的溢出策略
+        self.typing_queue = JobQueue(maxsize=self.queue_max_size.get(), policy=self.queue_policy.get())
+        # 重复任务抑制：窗口内相同内容的任务只输入一次（各来源的窗口在设置文件dedup.source_windows中调整）
+        self.dedup_window_ms = tk.IntVar(value=DEFAULT_WINDOW_MS)
+        self.dedup = DedupWindow(self.dedup_window_ms.get())
+        threading.Thread(target=self._typing_worker_loop, name='typing-worker', daemon=True).start()
+        # 模板任务由模板线程逐条展开放入队列：队列满时等待空位，序号只推进到已加入队列的记录
+        self.template_feed_queue = queue.SimpleQueue()
+        self._template_lock = threading.Lock()  # 保护模板序号状态的修改与保存（界面、模板、调度线程）
+        threading.Thread(target=self._template_feed_loop, name='template-feed', daemon=True).start()
+        # 定时播放调度器：到期时把任务直接放入输入队列
+        self.scheduler = PlaybackScheduler(self._dispatch_scheduled)
+        self.scheduler.observer = lambda stage, lateness: self.metric_lateness.observe(lateness, stage=stage)
+        self.scheduler.start()
 
         # 加载历史记录和设置
         self.load_history()
         self.load_settings()
+        self.load_template_counters()
+        self.load_cost_model()
         # 应用透明度
         try:
             alpha = max(10, min(100, int(self.window_alpha.get()))) / 100.0
@@ -80,7 +181,9 @@ class KeyboardSimulatorApp:
         self.input_container.pack(fill=tk.X, pady=(0, 2))
 
         # 创建文本输入框 - Notion风格（圆角、柔和边框）
-        self.text_input = ttk.Entry(self.input_container, width=32, style='Notion.TEntry')
+        self.input_var = tk.StringVar()
+        self.input_var.trace_add('write', lambda *args: self.schedule_estimate())
+        self.text_input = ttk.Entry(self.input_container, width=32, style='Notion.TEntry', textvariable=self.input_var)
         self.text_input.pack(fill=tk.X, pady=(0, 1))
         self.text_input.focus()
 
@@ -98,6 +201,10 @@ class KeyboardSimulatorApp:
         self.start_button = ttk.Button(self.button_frame, text="开始", command=self.start_simulation, style='Notion.Primary.TButton')
         self.start_button.pack(side=tk.RIGHT, padx=(0, 2))
 
+        # 预估耗时标签 - 显示在开始按钮左侧
+        self.estimate_label = ttk.Label(self.button_frame, textvariable=self.estimate_var, style='Notion.Status.TLabel')
+        self.estimate_label.pack(side=tk.RIGHT, padx=(0, 4))
+
         # 创建历史记录按钮 - Notion风格
         self.history_button = ttk.Button(self.button_frame, text="显示历史", command=self.toggle_history, style='Notion.TButton')
         self.history_button.pack(side=tk.LEFT, padx=(0, 2))
@@ -116,11 +223,25 @@ class KeyboardSimulatorApp:
         self.root.bind('<Control-U>', lambda event: self.toggle_ultra_compact_mode())
 
         # 界面构建完成后再应用紧凑UI与按钮可见性，再设置窗口尺寸，避免初始化阶段布局异常
+        self.build_mode_layouts()
         self.root.update_idletasks()
         self.update_button_visibility()
         self.update_compact_ui()
         self.apply_window_geometry()
 
+        # 定期导出运行指标（未开启时只做检查）
+        self.root.after(15000, self._metrics_export_tick)
+        # 按前台窗口标题自动切换配置方案
+        self.register_profile_hotkeys()
+        # 历史卡片的事件绑定在类标签上，每张卡片不再各自持有回调闭包
+        self._bind_history_card_events()
+        # 记录用户活动时间，低内存模式下空闲后释放界面
+        self.root.bind_all('<Key>', self._note_activity, add='+')
+        self.root.bind_all('<Button>', self._note_activity, add='+')
+        self.root.after(30000, self._idle_release_tick)
+        # 查询前台窗口可能要启动外部进程（xdotool），在后台线程中轮询，不阻塞界面
+        threading.Thread(target=self._profile_watch_loop, name='profile-watch', daemon=True).start()
+
     def configure_notion_style(self):
         """配置Notion风格的UI样式"""
         # 主色调设置 - Notion风格的中性色调
@@ -194,6 +315,11 @@ class KeyboardSimulatorApp:
         self.style.map('Notion.TCheckbutton',
                       background=[('active', active_color)])
 
+        # 极致紧凑模式的样式：启动时一次性配置为独立样式（继承对应的常规样式），切换时只替换样式名
+        compact_font = (self.font_config[0], max(7, self.font_config[1] - 1))
+        self.style.configure('Compact.Notion.TEntry', font=compact_font, padding=1)
+        self.style.configure('Compact.Notion.Status.TLabel', font=compact_font)
+
     def create_rounded_frame(self, parent, padding=10, bg_color='#ffffff'):
         """创建圆角框架（模拟实现）"""
         # 创建一个普通框架
@@ -212,83 +338,47 @@ class KeyboardSimulatorApp:
         except Exception:
             pass
 
+    def build_mode_layouts(self):
+        """预先计算两种模式下各控件的样式、宽度与pack参数（界面构建完成后调用一次）"""
+        self._mode_layouts = {
+            True: {
+                'configure': ((self.main_frame, {'padding': 1}),
+                              (self.text_input, {'style': 'Compact.Notion.TEntry', 'width': 18}),
+                              (self.status_label, {'style': 'Compact.Notion.Status.TLabel'}),
+                              (self.estimate_label, {'style': 'Compact.Notion.Status.TLabel'})),
+                'pack': ((self.main_frame, {'padx': 2, 'pady': 1}),
+                         (self.input_container, {'padx': 2, 'pady': (0, 0)}),
+                         (self.text_input, {'pady': (0, 0)})),
+            },
+            False: {
+                'configure': ((self.main_frame, {'padding': 4}),
+                              (self.text_input, {'style': 'Notion.TEntry', 'width': 32}),
+                              (self.status_label, {'style': 'Notion.Status.TLabel'}),
+                              (self.estimate_label, {'style': 'Notion.Status.TLabel'})),
+                'pack': ((self.main_frame, {'padx': 4, 'pady': 4}),
+                         (self.input_container, {'padx': 4, 'pady': (0, 2)}),
+                         (self.text_input, {'pady': (0, 1)})),
+            },
+        }
+        self._applied_layout = None
+
     def apply_compact_styles(self):
-        """根据极致紧凑模式调整字体与控件内边距，并在退出时恢复"""
+        """按预先计算的布局表切换两种模式的样式名与控件边距（已是目标模式时不做任何事）"""
+        compact = bool(self.ultra_compact.get())
+        if getattr(self, '_applied_layout', None) is compact or not hasattr(self, '_mode_layouts'):
+            return
         try:
-            if not hasattr(self, '_regular_entry_padding'):
-                self._regular_entry_padding = 6
-            compact_font = (self.font_config[0], max(7, self.font_config[1]-1))
-
-            if bool(self.ultra_compact.get()):
-                # 缩小主框架内边距与pack外边距
-                try:
-                    self.main_frame.configure(padding=1)
-                except Exception:
-                    pass
-                try:
-                    self.main_frame.pack_configure(padx=2, pady=1)
-                except Exception:
-                    pass
-                try:
-                    self.input_container.pack_configure(pady=(0, 0), padx=2)
-                except Exception:
-                    pass
-                try:
-                    self.text_input.pack_configure(pady=(0, 0))
-                except Exception:
-                    pass
-                # 极致紧凑：显示状态行（紧凑排布在输入框下方）
-                try:
-                    if not self.status_label.winfo_ismapped():
-                        self.status_label.pack(anchor='w')
-                    # 紧凑模式不增加额外垂直间距
-                    self.status_label.pack_configure(anchor='w')
-                except Exception:
-                    pass
-
-                # 字体与样式更紧凑
-                self.style.configure('Notion.TEntry', font=compact_font, padding=1)
-                self.style.configure('Notion.Status.TLabel', font=compact_font)
-                # 输入框字符宽度更小，避免水平溢出
-                try:
-                    self.text_input.configure(width=18)
-                except Exception:
-                    pass
-            else:
-                # 恢复常规边距
-                try:
-                    self.main_frame.configure(padding=4)
-                except Exception:
-                    pass
-                try:
-                    self.main_frame.pack_configure(padx=4, pady=4)
-                except Exception:
-                    pass
-                try:
-                    self.input_container.pack_configure(pady=(0, 2), padx=4)
-                except Exception:
-                    pass
-                try:
-                    self.text_input.pack_configure(pady=(0, 1))
-                except Exception:
-                    pass
-
-                # 恢复常规字体与样式
-                self.style.configure('Notion.TEntry', font=self.font_config, padding=self._regular_entry_padding)
-                self.style.configure('Notion.Status.TLabel', font=self.font_config)
-                # 恢复状态行显示
-                try:
-                    if not self.status_label.winfo_ismapped():
-                        self.status_label.pack(anchor='w')
-                except Exception:
-                    pass
-                # 恢复输入框宽度
-                try:
-                    self.text_input.configure(width=32)
-                except Exception:
-                    pass
-        except Exception:
-            pass
+            layout = self._mode_layouts[compact]
+            for widget, options in layout['configure']:
+                widget.configure(**options)
+            for widget, options in layout['pack']:
+                widget.pack_configure(**options)
+            # 两种模式都显示状态行（紧凑排布在输入框下方）
+            if not self.status_label.winfo_manager():
+                self.status_label.pack(anchor='w')
+            self._applied_layout = compact
+        except Exception as e:
+            print(f"切换界面样式失败: {e}")
 
     def _start_move(self, event):
         self._drag_x = event.x
@@ -323,7 +413,11 @@ class KeyboardSimulatorApp:
             pass
 
     def update_compact_ui(self):
-        """在极致紧凑模式下隐藏提示标签并去除标题栏；恢复时反之"""
+        """在极致紧凑模式下隐藏提示标签并去除标题栏；恢复时反之（记录耗时）"""
+        with tracer.span('ui_refresh', 'ui', view='compact'), self.metric_ui_refresh.time(view='compact'):
+            self._update_compact_ui()
+
+    def _update_compact_ui(self):
         self.apply_window_chrome()
         try:
             if bool(self.ultra_compact.get()):
@@ -490,6 +584,21 @@ class KeyboardSimulatorApp:
         # 创建设置菜单
         settings_menu = tk.Menu(menubar, tearoff=0)
         settings_menu.add_command(label="设置", command=self.open_settings)
+        settings_menu.add_command(label="配置方案", command=self.open_profiles_dialog)
+        settings_menu.add_command(label="自动调优输入速率", command=self.open_auto_tune)
+        settings_menu.add_command(label="批量生成条码", command=self.open_barcode_generator)
+        settings_menu.add_command(label="从文件输入记录", command=self.open_record_file)
+        settings_menu.add_command(label="从文件流式输入", command=self.open_stream_file)
+        settings_menu.add_command(label="预检后输入文件", command=self.open_preflight_file)
+        settings_menu.add_command(label="定时播放", command=self.open_scheduler)
+        settings_menu.add_command(label="代理模式（连接控制端）", command=self.toggle_agent_mode)
+        settings_menu.add_command(label="队列状态", command=self.show_queue_stats)
+        settings_menu.add_command(label="运行统计", command=self.open_stats_view)
+        settings_menu.add_checkbutton(label="启用事件追踪", variable=self.tracing_enabled,
+                                      onvalue=True, offvalue=False, command=self.toggle_tracing)
+        settings_menu.add_command(label="导出追踪文件", command=self.export_trace)
+        settings_menu.add_checkbutton(label="记录审计日志", variable=self.audit_enabled,
+                                      onvalue=True, offvalue=False, command=self.toggle_audit)
         settings_menu.add_separator()
         settings_menu.add_command(label="关于", command=self.open_about)
 
@@ -525,7 +634,11 @@ class KeyboardSimulatorApp:
         self.refresh_history_display()
 
     def refresh_history_display(self):
-        """刷新历史记录显示内容"""
+        """刷新历史记录显示内容（记录耗时）"""
+        with tracer.span('ui_refresh', 'ui', view='history'), self.metric_ui_refresh.time(view='history'):
+            self._refresh_history_display()
+
+    def _refresh_history_display(self):
         # 清空历史记录区域
         for widget in self.history_frame.winfo_children():
             widget.destroy()
@@ -558,102 +671,162 @@ class KeyboardSimulatorApp:
         self.history_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
 
         # 显示历史记录
+        self._history_rendered = 0
         if not self.history:
             empty_label = ttk.Label(content_frame, text="暂无历史记录", style='Notion.Status.TLabel')
             empty_label.pack(pady=8)
         else:
-            # 显示所有历史记录，让用户可以通过滚动查看全部
-            display_history = self.history
-
-            # 创建3列的网格布局来显示小卡片
-            for i, text in enumerate(display_history):
-                # 计算行列位置
-                row = i // 3
-                col = i % 3
-
-                # 创建小卡片框架
-                card_frame = ttk.Frame(content_frame, style='Notion.TFrame', padding=2)
-                card_frame.grid(row=row, column=col, padx=2, pady=2, sticky="nsew")
-
-                # 设置固定大小，增加宽度以容纳更长的文本
-                card_frame.configure(width=96, height=56)
-
-                # 添加阴影和圆角效果
-                card_frame.config(relief="solid", borderwidth=1)
-
-                # 文本标签（小卡片样式）
-                # 截取部分文本显示在卡片上
-                display_text = text[:20] + '...' if len(text) > 20 else text
-                text_label = ttk.Label(card_frame, text=display_text, style='Notion.TLabel', wraplength=90, justify="left")
-                text_label.pack(fill=tk.BOTH, expand=True, pady=2)
-
-                # 为卡片添加点击事件，点击后复制内容
-                def copy_on_click(event, text_to_copy=text):
-                    self.root.clipboard_clear()
-                    self.root.clipboard_append(text_to_copy)
-                    self.root.update()  # 保持剪贴板内容
-
-                    # 显示复制成功提示（完整显示内容）
-                    self.status_var.set(f"已复制: {text_to_copy}")
-                    self.root.after(2000, lambda: self.status_var.set("就绪"))
-
-                card_frame.bind("<Button-1>", copy_on_click)
-                text_label.bind("<Button-1>", copy_on_click)
-
-                # 设置鼠标悬停效果（使用ttk样式来改变背景颜色为绿色，不改变边框）
-                # 创建悬停样式（如果不存在）
-                if not hasattr(self, 'hover_style_created'):
-                    self.hover_style_created = True
-                    # 设置框架悬停样式
-                    self.style.configure('Hover.TFrame', background='#d4edda')
-                    # 设置标签悬停样式
-                    self.style.configure('Hover.TLabel', background='#d4edda')
-
-                # 保存原始样式
-
-                # 为卡片添加双击事件，双击后将内容覆盖到输入框并执行开始操作
-                def double_click_to_input(event, text_to_input=text):
-                    # 正在输入则直接忽略，等待完成
-                    if getattr(self, 'is_typing', False):
-                        return "break"
-                    # 使用更可靠的方式检测按钮是否被禁用
-                    if self.start_button['state'] in (tk.DISABLED, 'disabled'):
-                        return "break"
-
-                    # 将内容设置到输入框
-                    self.text_input.delete(0, tk.END)
-                    self.text_input.insert(0, text_to_input)
-                    # 执行开始按钮操作
-                    self.start_simulation()
-                    return "break"
-
-                card_frame.bind("<Double-1>", double_click_to_input)
-                text_label.bind("<Double-1>", double_click_to_input)
-                original_frame_style = card_frame['style']
-                original_label_style = text_label['style']
-
-                # 绑定鼠标进入和离开事件来切换样式
-                card_frame.bind("<Enter>", lambda e, frame=card_frame, label=text_label: (
-                    frame.config(style='Hover.TFrame'),
-                    label.config(style='Hover.TLabel')
-                ))
-                card_frame.bind("<Leave>", lambda e, frame=card_frame, label=text_label, f_style=original_frame_style, l_style=original_label_style: (
-                    frame.config(style=f_style),
-                    label.config(style=l_style)
-                ))
-                text_label.bind("<Enter>", lambda e, frame=card_frame, label=text_label: (
-                    frame.config(style='Hover.TFrame'),
-                    label.config(style='Hover.TLabel')
-                ))
-                text_label.bind("<Leave>", lambda e, frame=card_frame, label=text_label, f_style=original_frame_style, l_style=original_label_style: (
-                    frame.config(style=f_style),
-                    label.config(style=l_style)
-                ))
-
             # 确保网格列可以扩展
             content_frame.columnconfigure(0, weight=1)
             content_frame.columnconfigure(1, weight=1)
             content_frame.columnconfigure(2, weight=1)
+            # 普通模式显示所有历史记录，让用户可以通过滚动查看全部；低内存模式分页按需创建
+            if bool(self.low_memory_mode.get()):
+                self._render_history_cards(content_frame, self.history_page_size)
+            else:
+                self._render_history_cards(content_frame, len(self.history))
+
+    def _render_history_cards(self, content_frame, count):
+        """在已创建的卡片之后再创建count张卡片，还有剩余时在末尾放置“显示更多”"""
+        more = content_frame.children.get('more')
+        if more is not None:
+            more.destroy()
+        start = self._history_rendered
+        stop = min(len(self.history), start + count)
+        # 创建悬停样式（如果不存在）
+        if not hasattr(self, 'hover_style_created'):
+            self.hover_style_created = True
+            # 设置框架悬停样式
+            self.style.configure('Hover.TFrame', background='#d4edda')
+            # 设置标签悬停样式
+            self.style.configure('Hover.TLabel', background='#d4edda')
+
+        # 创建3列的网格布局来显示小卡片
+        for i in range(start, stop):
+            text = self.history[i]
+            # 计算行列位置
+            row = i // 3
+            col = i % 3
+
+            # 创建小卡片框架（控件名带序号，事件处理时据此找回对应的历史记录）
+            card_frame = ttk.Frame(content_frame, style='Notion.TFrame', padding=2, name=f'hc{i}')
+            card_frame.grid(row=row, column=col, padx=2, pady=2, sticky="nsew")
+
+            # 设置固定大小，增加宽度以容纳更长的文本
+            card_frame.configure(width=96, height=56)
+
+            # 添加阴影和圆角效果
+            card_frame.config(relief="solid", borderwidth=1)
+
+            # 文本标签（小卡片样式）
+            # 截取部分文本显示在卡片上
+            display_text = text[:20] + '...' if len(text) > 20 else text
+            if parse_file_ref(text) is not None:
+                # 文件引用只显示文件名
+                display_text = "文件: " + os.path.basename(parse_file_ref(text))[:16]
+            text_label = ttk.Label(card_frame, text=display_text, style='Notion.TLabel', wraplength=90,
+                                   justify="left", name='label')
+            text_label.pack(fill=tk.BOTH, expand=True, pady=2)
+
+            # 点击复制、双击输入、悬停高亮均由HistoryCard类标签处理
+            for widget in (card_frame, text_label):
+                tags = widget.bindtags()
+                widget.bindtags((tags[0], 'HistoryCard') + tags[1:])
+        self._history_rendered = stop
+
+        remaining = len(self.history) - stop
+        if remaining > 0:
+            more = ttk.Label(content_frame, text=f"显示更多（剩余{remaining}条）", style='Notion.Status.TLabel',
+                             cursor='hand2', name='more')
+            more.grid(row=stop // 3 + 1, column=0, columnspan=3, pady=4)
+            more.bind("<Button-1>", lambda e: self._render_history_cards(content_frame, self.history_page_size))
+
+    def _bind_history_card_events(self):
+        """为所有历史卡片绑定一次事件（类标签HistoryCard）"""
+        self.root.bind_class('HistoryCard', '<Button-1>', self._on_history_card_click)
+        self.root.bind_class('HistoryCard', '<Double-1>', self._on_history_card_double_click)
+        self.root.bind_class('HistoryCard', '<Enter>', lambda e: self._set_history_card_hover(e.widget, True))
+        self.root.bind_class('HistoryCard', '<Leave>', lambda e: self._set_history_card_hover(e.widget, False))
+
+    def _history_card_text(self, widget):
+        """根据卡片（或卡片内标签）的控件名找回对应的历史记录"""
+        card = widget if widget.winfo_name().startswith('hc') else widget.master
+        try:
+            return self.history[int(card.winfo_name()[2:])]
+        except (ValueError, IndexError):
+            return None
+
+    def _on_history_card_click(self, event):
+        """点击卡片复制内容"""
+        text_to_copy = self._history_card_text(event.widget)
+        if text_to_copy is None:
+            return
+        self.root.clipboard_clear()
+        self.root.clipboard_append(text_to_copy)
+        self.root.update()  # 保持剪贴板内容
+
+        # 显示复制成功提示（完整显示内容）
+        self.status_var.set(f"已复制: {text_to_copy}")
+        self.root.after(2000, lambda: self.status_var.set("就绪"))
+
+    def _on_history_card_double_click(self, event):
+        """双击卡片将内容覆盖到输入框并执行开始操作"""
+        # 正在输入时由开始操作按队列策略排队
+        # 使用更可靠的方式检测按钮是否被禁用
+        if self.start_button['state'] in (tk.DISABLED, 'disabled'):
+            return "break"
+        text_to_input = self._history_card_text(event.widget)
+        if text_to_input is None:
+            return "break"
+
+        # 将内容设置到输入框
+        self.text_input.delete(0, tk.END)
+        self.text_input.insert(0, text_to_input)
+        # 执行开始按钮操作
+        self.start_simulation()
+        return "break"
+
+    def _set_history_card_hover(self, widget, hovering):
+        """切换卡片悬停样式（背景变为绿色，不改变边框）"""
+        card = widget if widget.winfo_name().startswith('hc') else widget.master
+        label = card.children.get('label')
+        card.config(style='Hover.TFrame' if hovering else 'Notion.TFrame')
+        if label is not None:
+            label.config(style='Hover.TLabel' if hovering else 'Notion.TLabel')
+
+    def _note_activity(self, event=None):
+        self._last_activity = time.monotonic()
+        self._idle_released = False
+
+    def _idle_release_tick(self):
+        """低内存模式下空闲超过idle_release_s后释放隐藏的历史卡片并归还内存（每30秒检查一次）"""
+        try:
+            idle = time.monotonic() - self._last_activity
+            if (bool(self.low_memory_mode.get()) and not self._idle_released
+                    and idle >= self.idle_release_s and not self.typing_queue.busy()):
+                self.release_idle_ui()
+                self._idle_released = True
+        except Exception as e:
+            print(f"释放空闲界面失败: {e}")
+        self.root.after(30000, self._idle_release_tick)
+
+    def release_idle_ui(self):
+        """销毁隐藏中的历史卡片（再次显示时重新创建），回收垃圾并把空闲内存归还系统"""
+        if not self.history_visible:
+            for widget in self.history_frame.winfo_children():
+                widget.destroy()
+            self._history_rendered = 0
+        gc.collect()
+        try:
+            if sys.platform == 'win32':
+                # 清空工作集，常驻内存立即下降，之后按需换入
+                kernel32 = ctypes.windll.kernel32
+                ctypes.windll.psapi.EmptyWorkingSet(kernel32.GetCurrentProcess())
+            elif sys.platform.startswith('linux'):
+                # glibc：把堆顶及空闲页归还系统
+                ctypes.CDLL('libc.so.6').malloc_trim(0)
+        except Exception:
+            pass
 
     def hide_history(self):
         """隐藏历史记录区域"""
@@ -686,7 +859,7 @@ class KeyboardSimulatorApp:
         settings_width = int(root_width * 0.85)  # 增加宽度比例
         settings_height = int(root_height * 0.85)  # 增加高度比例
         # 设置最小高度，确保有足够空间显示所有设置项
-        min_height = 200
+        min_height = 480
         if settings_height < min_height:
             settings_height = min_height
         settings_window.geometry(f"{settings_width}x{settings_height}")
@@ -721,6 +894,23 @@ class KeyboardSimulatorApp:
         delay_entry = ttk.Entry(delay_frame, width=10, textvariable=self.typing_delay, style='Notion.TEntry')
         delay_entry.pack(side=tk.LEFT)
 
+        # 按键级时序：部分目标程序在按下/松开无间隔时丢字
+        key_timing_frame = ttk.Frame(main_frame, style='Notion.TFrame')
+        key_timing_frame.pack(anchor='w', fill=tk.X, pady=(0, 4))
+        ttk.Label(key_timing_frame, text="按键保持(毫秒):", style='Notion.TLabel').pack(side=tk.LEFT, padx=(0, 6))
+        ttk.Entry(key_timing_frame, width=4, textvariable=self.key_hold_ms, style='Notion.TEntry').pack(side=tk.LEFT)
+        ttk.Label(key_timing_frame, text="Shift间隔:", style='Notion.TLabel').pack(side=tk.LEFT, padx=(6, 6))
+        ttk.Entry(key_timing_frame, width=4, textvariable=self.modifier_gap_ms, style='Notion.TEntry').pack(side=tk.LEFT)
+        hold_shift_checkbox = ttk.Checkbutton(
+            main_frame,
+            text="连续大写时保持Shift",
+            variable=self.hold_shift,
+            onvalue=True,
+            offvalue=False,
+            style='Notion.TCheckbutton'
+        )
+        hold_shift_checkbox.pack(anchor='w', pady=(0, 8))
+
         # 添加透明度设置（0-100）
         alpha_frame = ttk.Frame(main_frame, style='Notion.TFrame')
         alpha_frame.pack(anchor='w', fill=tk.X, pady=(4, 8))
@@ -742,6 +932,64 @@ class KeyboardSimulatorApp:
         )
         compact_checkbox.pack(anchor='w', pady=(4, 8))
 
+        # 低内存模式：历史卡片分页创建，空闲后释放界面
+        low_memory_checkbox = ttk.Checkbutton(
+            main_frame,
+            text="低内存模式",
+            variable=self.low_memory_mode,
+            onvalue=True,
+            offvalue=False,
+            style='Notion.TCheckbutton'
+        )
+        low_memory_checkbox.pack(anchor='w', pady=(0, 8))
+
+        # 记录模式开关与参数
+        record_checkbox = ttk.Checkbutton(
+            main_frame,
+            text="记录模式（用“|”分隔字段）",
+            variable=self.record_mode,
+            onvalue=True,
+            offvalue=False,
+            style='Notion.TCheckbutton'
+        )
+        record_checkbox.pack(anchor='w', pady=(4, 4))
+
+        record_rows = [
+            ("字段分隔键:", ttk.Combobox, self.field_separator, ['tab', 'enter']),
+            ("记录结束键:", ttk.Combobox, self.record_terminator, ['enter', 'tab', '']),
+            ("字段间隔(毫秒):", ttk.Entry, self.field_delay, None),
+            ("记录间隔(毫秒):", ttk.Entry, self.record_delay, None),
+        ]
+        for text, widget_class, variable, values in record_rows:
+            row_frame = ttk.Frame(main_frame, style='Notion.TFrame')
+            row_frame.pack(anchor='w', fill=tk.X, pady=(2, 2))
+            ttk.Label(row_frame, text=text, style='Notion.TLabel').pack(side=tk.LEFT, padx=(0, 6))
+            if values is not None:
+                # 可直接输入其他按键名，如 down、f2
+                widget = widget_class(row_frame, width=8, textvariable=variable, values=values)
+            else:
+                widget = widget_class(row_frame, width=10, textvariable=variable, style='Notion.TEntry')
+            widget.pack(side=tk.LEFT)
+
+        # 输入队列容量与溢出策略
+        policy_names = [POLICY_NAMES[p] for p in OVERFLOW_POLICIES]
+        policy_display = tk.StringVar(value=POLICY_NAMES.get(self.queue_policy.get(), policy_names[0]))
+        policy_display.trace_add('write', lambda *args: self.queue_policy.set(
+            OVERFLOW_POLICIES[policy_names.index(policy_display.get())]))
+        queue_frame = ttk.Frame(main_frame, style='Notion.TFrame')
+        queue_frame.pack(anchor='w', fill=tk.X, pady=(4, 8))
+        ttk.Label(queue_frame, text="队列容量:", style='Notion.TLabel').pack(side=tk.LEFT, padx=(0, 6))
+        ttk.Entry(queue_frame, width=6, textvariable=self.queue_max_size, style='Notion.TEntry').pack(side=tk.LEFT)
+        ttk.Label(queue_frame, text="满时:", style='Notion.TLabel').pack(side=tk.LEFT, padx=(6, 6))
+        ttk.Combobox(queue_frame, width=8, textvariable=policy_display, values=policy_names,
+                     state='readonly').pack(side=tk.LEFT)
+
+        # 重复抑制窗口：窗口内相同内容的任务只输入一次（0为关闭）
+        dedup_frame = ttk.Frame(main_frame, style='Notion.TFrame')
+        dedup_frame.pack(anchor='w', fill=tk.X, pady=(0, 8))
+        ttk.Label(dedup_frame, text="重复抑制(毫秒):", style='Notion.TLabel').pack(side=tk.LEFT, padx=(0, 6))
+        ttk.Entry(dedup_frame, width=6, textvariable=self.dedup_window_ms, style='Notion.TEntry').pack(side=tk.LEFT)
+
         # 删除了确定按钮，用户可以通过点击窗口右上角的关闭按钮来关闭设置对话框
         # 绑定关闭事件，保存设置
         settings_window.protocol("WM_DELETE_WINDOW", lambda: (self.save_settings(), settings_window.destroy()))
@@ -752,36 +1000,873 @@ class KeyboardSimulatorApp:
         self.status_var.set("就绪")
         self.text_input.focus()
 
-    def simulate_typing(self, text):
-        """模拟键盘输入"""
+    def _typing_worker_loop(self):
+        """输入队列消费线程：依次执行队列中的输入任务，队列清空后恢复界面"""
+        while True:
+            job = self.typing_queue.get()
+            self.metric_queue_wait.observe(max(0.0, time.monotonic() - job.enqueued_at))
+            # 出错时按实际开始时刻与已输入的按键数记录
+            job.started_at = None
+            keystrokes_before = self.typing_engine.keystrokes
+            try:
+                if self.simulate_typing(job) == 'preempted':
+                    # 在记录边界被更高优先级的任务抢占：剩余部分放回队列原位置，稍后继续
+                    job.countdown = False
+                    self.typing_queue.requeue(job)
+            except Exception as e:
+                print(f"模拟输入失败: {e}")
+                started = job.started_at if job.started_at is not None else time.time()
+                duration = time.time() - started
+                keystrokes = self.typing_engine.keystrokes - keystrokes_before
+                self.audit_job(job, 'error', started, duration, keystrokes, None, None)
+                if job.on_done is not None:
+                    job.on_done('error', duration, keystrokes)
+            # 取出与完成都在队列的锁内计数，界面据busy()判断状态
+            if self.typing_queue.task_done():
+                if self.throughput.records:
+                    self.status_var.set(f"输入完成！共{self.throughput.records}条记录，"
+                                        f"{self.throughput.records_per_minute():.0f}条/分钟")
+                else:
+                    self.status_var.set("输入完成！")
+                self.root.after(0, self._finish_reset)
+
+    def _finish_reset(self):
+        """恢复按钮状态、重置输入标记并重新绑定Enter键"""
+        # 期间又有新任务到达则保持输入状态
+        if self.typing_queue.busy():
+            return
+        self.is_typing = False
+        self.enable_buttons()
+        self.root.bind('<Return>', lambda event: self.start_simulation())
+        # 一批任务完成后保存校准数据，并按新的校准结果及模板序号刷新预估
+        if self._cost_model_dirty:
+            self._cost_model_dirty = False
+            self.save_cost_model()
+        self.schedule_estimate(0)
+
+    def simulate_typing(self, job):
+        """模拟键盘输入；在记录边界被抢占时返回'preempted'"""
+        # 定时任务记录实际开始时刻相对计划的延迟
+        self.scheduler.report_started(job)
         # 等待2秒
-        for i in range(2, 0, -1):
-            self.status_var.set(f"将在{i}秒后开始输入...")
+        if job.countdown:
+            with tracer.span('countdown', 'typing'):
+                deadline = time.monotonic() + 2
+                for i in range(2, 0, -1):
+                    self.status_var.set(f"将在{i}秒后开始输入...")
+                    time.sleep(1 if i > 1 else 1 - FOREGROUND_PROBE_S)
+                # 倒计时最后时刻操作员已切换到目标窗口，按其标题选择配置方案（只影响时序参数）；
+                # 查询超时则沿用当前配置，倒计时总长不变
+                self.check_foreground_profile(timeout=FOREGROUND_PROBE_S)
+                time.sleep(max(0.0, deadline - time.monotonic()))
+
+            # 倒计时结束即为一批任务的开始，从此处统计记录吞吐量
+            self.throughput.start()
+
+        remaining = self.typing_queue.qsize()
+        self.status_var.set(f"正在输入...（剩余{remaining}条）" if remaining else "正在输入...")
+
+        preempted = []
+
+        def _on_record():
+            self.throughput.record_done()
+            self.status_var.set(f"已输入{self.throughput.records}条记录，"
+                                f"{self.throughput.records_per_minute():.0f}条/分钟")
+            # 记录边界：队列中有更高优先级的任务时暂停当前任务
+            if self.typing_queue.has_higher_priority(job.priority):
+                preempted.append(True)
+                return True
+            return False
+
+        # 逐字符模拟输入，保留大小写；使用迭代器以便被抢占后从断点继续
+        # 经过的片段同时累计空跑统计，用于校准耗时预估
+        if job.payload_text is None:
+            # 片段列表在输入前还原为文本供审计；流式任务只记录名称
+            job.payload_text = segments_text(job.segments) if isinstance(job.segments, (list, tuple)) else None
+        tally = SegmentTally(job.segments)
+        job.segments = iter(tally)
+        profile = self.current_timing_profile()
+        started = job.started_at = time.time()
+        began = time.perf_counter()
+        keystrokes_before = self.typing_engine.keystrokes
+        with tracer.span('job', 'typing', source=job.source, label=str(job.label)[:40]) as span:
+            self.typing_engine.type_segments(job.segments, profile, on_record=_on_record)
+            outcome = 'preempted' if preempted else 'done'
+            span.set(outcome=outcome, keystrokes=self.typing_engine.keystrokes - keystrokes_before)
+        self.cost_model.observe(tally, profile, time.perf_counter() - began)
+        self._cost_model_dirty = True
+        duration = time.perf_counter() - began
+        keystrokes = self.typing_engine.keystrokes - keystrokes_before
+        self.record_job_metrics(job, outcome, duration, keystrokes)
+        self.audit_job(job, outcome, started, duration, keystrokes, tally.records, profile)
+        if job.on_done is not None and outcome != 'preempted':
+            job.on_done(outcome, duration, keystrokes)
+        return outcome
+
+    def init_metrics(self):
+        """注册运行指标"""
+        m = self.metrics
+        self.metric_keystrokes = m.counter('keystrokes_total', '已输入的按键数（字符与特殊按键）')
+        self.metric_jobs = m.counter('jobs_total', '已执行的输入任务数（按来源与结果）')
+        self.metric_job_duration = m.histogram('job_duration_seconds', '单个任务的输入耗时（不含倒计时）')
+        self.metric_chars_per_second = m.gauge('chars_per_second', '最近一个任务的输入速率（按键/秒）')
+        self.metric_lateness = m.histogram('schedule_lateness_seconds', '定时任务相对计划时刻的延迟（触发/开始输入）')
+        self.metric_queue_wait = m.histogram('queue_wait_seconds', '任务在输入队列中的等待时间')
+        self.metric_persist = m.histogram('persist_write_seconds', '历史/设置/模板文件的写入耗时')
+        self.metric_ui_refresh = m.histogram('ui_refresh_seconds', '界面刷新耗时（历史列表/紧凑模式切换）')
+        m.gauge('queue_depth', '输入队列当前深度', fn=lambda: self.typing_queue.qsize())
+        m.counter('queue_discarded_total', '输入队列丢弃/合并/拒绝的任务数', fn=lambda: [
+            ({'reason': reason}, self.typing_queue.stats()[reason])
+            for reason in ('dropped_oldest', 'dropped_newest', 'merged', 'rejected')])
+        m.counter('dedup_suppressed_total', '重复抑制窗口内被丢弃的重复任务数（按来源）', fn=lambda: [
+            ({'source': source}, count) for source, count in self.dedup.stats()['suppressed'].items()])
+        m.gauge('schedules_pending', '尚未结束的定时计划数', fn=lambda: self.scheduler.pending())
+
+    def record_job_metrics(self, job, outcome, duration, keystrokes):
+        """记录单个任务的输入指标"""
+        self.metric_keystrokes.inc(keystrokes)
+        self.metric_jobs.inc(source=job.source, outcome=outcome)
+        self.metric_job_duration.observe(duration, source=job.source)
+        if duration > 0:
+            self.metric_chars_per_second.set(round(keystrokes / duration, 2))
+
+    def export_metrics(self):
+        """导出Prometheus文本文件与JSON快照，返回写入的文件路径"""
+        return self.metrics.export(self.metrics_export_dir)
+
+    def _metrics_export_tick(self):
+        """定期导出指标（每15秒）"""
+        if bool(self.metrics_auto_export.get()):
+            try:
+                self.export_metrics()
+            except Exception as e:
+                print(f"导出指标失败: {e}")
+        self.root.after(15000, self._metrics_export_tick)
+
+    def toggle_tracing(self):
+        """开启/关闭事件追踪并保存设置"""
+        if bool(self.tracing_enabled.get()):
+            tracer.enable()
+            self.status_var.set("事件追踪已开启")
+        else:
+            tracer.disable()
+            self.status_var.set("事件追踪已关闭")
+        self.save_settings()
+
+    def toggle_audit(self):
+        """开启/关闭审计日志并保存设置"""
+        self.audit.enabled = bool(self.audit_enabled.get())
+        self.status_var.set("审计日志已开启" if self.audit.enabled else "审计日志已关闭")
+        self.save_settings()
+
+    def audit_job(self, job, outcome, started, duration, keystrokes, records, profile):
+        """把一个任务的执行结果放入审计日志（只入队，不等待写入）"""
+        self.audit.record({
+            'ts': round(started, 3),
+            'station': machine_id(),
+            'source': job.source,
+            'label': job.label if job.label is None else str(job.label),
+            'payload': job.payload_text if job.payload_text is not None else str(job.label or ''),
+            'profile': profile.name if profile is not None else None,
+            'duration_s': round(duration, 4),
+            'outcome': outcome,
+            'keystrokes': keystrokes,
+            'records': records,
+        })
+
+    def export_trace(self):
+        """把追踪缓冲区导出为Chrome trace JSON（可在chrome://tracing或Perfetto中打开）"""
+        if not tracer.events():
+            messagebox.showinfo("导出追踪文件", "没有追踪数据，请先在选项菜单中启用事件追踪")
+            return
+        path = filedialog.asksaveasfilename(
+            title="导出追踪文件",
+            defaultextension=".json",
+            initialfile=f"keyboard_trace_{time.strftime('%Y%m%d_%H%M%S')}.json",
+            filetypes=[("Chrome trace", "*.json"), ("所有文件", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            count = tracer.dump_chrome(path)
+            self.status_var.set(f"已导出{count}条追踪事件")
+        except Exception as e:
+            messagebox.showerror("导出失败", str(e))
+
+    def open_stats_view(self):
+        """运行统计窗口：每秒刷新关键指标，可导出指标文件"""
+        window = tk.Toplevel(self.root)
+        window.title("运行统计")
+        window.resizable(False, False)
+        window.configure(bg='#ffffff')
+        window.transient(self.root)
+
+        main_frame = self.create_rounded_frame(window, padding=8, bg_color='#ffffff')
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=4, pady=4)
+
+        stats_var = tk.StringVar(value='')
+        ttk.Label(main_frame, textvariable=stats_var, style='Notion.TLabel', justify='left').pack(anchor='w')
+
+        def _ms(summary):
+            return f"{summary['mean'] * 1000:.1f}/{summary['p95'] * 1000:.1f} ms（{summary['count']}次）"
+
+        def _refresh():
+            if not window.winfo_exists():
+                return
+            jobs_done = sum(value for _, value in self.metric_jobs.samples())
+            persist = [_ms(self.metric_persist.summary(file=name)) for name in ('history', 'settings')]
+            stats_var.set(
+                f"已输入按键: {self.metric_keystrokes.value()}\n"
+                f"已执行任务: {jobs_done}\n"
+                f"最近速率: {self.metric_chars_per_second.value()} 按键/秒\n"
+                f"队列深度: {self.typing_queue.qsize()}，等待 平均/p95: {_ms(self.metric_queue_wait.summary())}\n"
+                f"定时触发延迟 平均/p95: {_ms(self.metric_lateness.summary(stage='dispatch'))}\n"
+                f"定时开始延迟 平均/p95: {_ms(self.metric_lateness.summary(stage='start'))}\n"
+                f"写历史 平均/p95: {persist[0]}\n"
+                f"写设置 平均/p95: {persist[1]}\n"
+                f"刷新历史 平均/p95: {_ms(self.metric_ui_refresh.summary(view='history'))}\n"
+                f"紧凑切换 平均/p95: {_ms(self.metric_ui_refresh.summary(view='compact'))}"
+            )
+            window.after(1000, _refresh)
+
+        def _export():
+            try:
+                paths = self.export_metrics()
+                self.status_var.set(f"已导出: {', '.join(os.path.basename(p) for p in paths)}")
+            except Exception as e:
+                messagebox.showerror("导出失败", str(e), parent=window)
+
+        ttk.Checkbutton(main_frame, text="每15秒自动导出", variable=self.metrics_auto_export,
+                        onvalue=True, offvalue=False, style='Notion.TCheckbutton',
+                        command=self.save_settings).pack(anchor='w', pady=(6, 0))
+        ttk.Button(main_frame, text="导出指标文件", command=_export, style='Notion.TButton').pack(anchor='e', pady=(6, 0))
+        _refresh()
+
+    def switch_profile(self, name):
+        """切换到指定配置方案（None为默认参数）：只替换内存中的参数，不写文件、不重新布局"""
+        if self.profile_switcher.switch(name):
+            self.status_var.set(f"已切换配置：{name or '默认'}")
+            self.schedule_estimate()
+
+    def check_foreground_profile(self, timeout=1.0):
+        """按前台窗口标题自动切换配置方案（前台为本程序窗口时不切换）
+
+        查询前台窗口可能耗时（最长timeout秒，超时不切换），只在后台线程中调用；界面更新通过root.after交回主线程。
+        """
+        if not self.profile_switcher.auto_match or not self.profile_switcher.has_window_rules():
+            return
+        title = foreground_external_title(timeout)
+        if title is None:
+            return
+        if self.profile_switcher.auto_switch(title):
+            self.root.after(0, self._show_switched_profile)
+
+    def _show_switched_profile(self):
+        active = self.profile_switcher.active
+        self.status_var.set(f"已切换配置：{active.name if active is not None else '默认'}")
+        self.schedule_estimate()
+
+    def _profile_watch_loop(self):
+        """每秒检查一次前台窗口（操作员在目标程序与本程序之间切换时，记住最近的目标程序）"""
+        while True:
             time.sleep(1)
+            try:
+                if not self.typing_queue.busy():
+                    self.check_foreground_profile()
+            except Exception as e:
+                print(f"检查前台窗口失败: {e}")
+
+    def register_profile_hotkeys(self):
+        """为配置方案注册全局热键（需要keyboard库），重新注册前先移除旧热键"""
+        try:
+            import keyboard
+        except Exception:
+            return
+        for handle in self._profile_hotkeys:
+            try:
+                keyboard.remove_hotkey(handle)
+            except Exception:
+                pass
+        self._profile_hotkeys = []
+        for profile in list(self.profile_switcher.profiles.values()):
+            if not profile.hotkey:
+                continue
+            try:
+                handle = keyboard.add_hotkey(
+                    profile.hotkey, lambda name=profile.name: self.root.after(0, lambda: self.switch_profile(name)))
+                self._profile_hotkeys.append(handle)
+            except Exception as e:
+                print(f"注册热键失败（{profile.hotkey}）: {e}")
+
+    def open_profiles_dialog(self):
+        """配置方案对话框：将当前设置保存为方案、切换或删除方案"""
+        window = tk.Toplevel(self.root)
+        window.title("配置方案")
+        window.resizable(False, False)
+        window.configure(bg='#ffffff')
+        window.transient(self.root)
+
+        main_frame = self.create_rounded_frame(window, padding=8, bg_color='#ffffff')
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=4, pady=4)
 
-        self.status_var.set("正在输入...")
+        listbox = tk.Listbox(main_frame, height=6, width=44, activestyle='none', exportselection=False)
+        listbox.pack(fill=tk.X)
+
+        def _refresh():
+            listbox.delete(0, tk.END)
+            active = self.profile_switcher.active
+            listbox.insert(tk.END, f"{'● ' if active is None else '  '}默认（设置对话框中的参数）")
+            for profile in self.profile_switcher.profiles.values():
+                marker = '● ' if profile is active else '  '
+                extra = []
+                if profile.hotkey:
+                    extra.append(profile.hotkey)
+                if profile.window_match:
+                    extra.append('窗口: ' + ','.join(profile.window_match))
+                listbox.insert(tk.END, f"{marker}{profile.name}  {'  '.join(extra)}".rstrip())
+
+        def _selected_name():
+            selection = listbox.curselection()
+            if not selection or selection[0] == 0:
+                return None
+            return list(self.profile_switcher.profiles)[selection[0] - 1]
+
+        name_var = tk.StringVar()
+        match_var = tk.StringVar()
+        hotkey_var = tk.StringVar()
+        for text, variable in (("名称:", name_var), ("窗口标题关键字(逗号分隔):", match_var), ("热键(如ctrl+alt+1):", hotkey_var)):
+            row_frame = ttk.Frame(main_frame, style='Notion.TFrame')
+            row_frame.pack(anchor='w', fill=tk.X, pady=(4, 0))
+            ttk.Label(row_frame, text=text, style='Notion.TLabel').pack(side=tk.LEFT, padx=(0, 6))
+            ttk.Entry(row_frame, width=18, textvariable=variable, style='Notion.TEntry').pack(side=tk.LEFT)
+
+        def _on_select(event=None):
+            name = _selected_name()
+            profile = self.profile_switcher.profiles.get(name) if name else None
+            name_var.set(profile.name if profile else '')
+            match_var.set(','.join(profile.window_match) if profile else '')
+            hotkey_var.set(profile.hotkey if profile else '')
+
+        listbox.bind('<<ListboxSelect>>', _on_select)
+
+        def _save_current():
+            name = name_var.get().strip()
+            if not name:
+                messagebox.showerror("参数错误", "请填写方案名称", parent=window)
+                return
+            # 以设置对话框中的当前参数创建方案
+            profile = SettingsProfile(
+                name,
+                timing=self.settings_timing_profile().copy(name=name),
+                with_enter=self.with_enter.get(),
+                record_mode=bool(self.record_mode.get()),
+                record_format=self.settings_record_format(),
+                window_match=match_var.get().replace('，', ',').split(','),
+                hotkey=hotkey_var.get(),
+            )
+            self.profile_switcher.add(profile)
+            self._persist_profiles()
+            _refresh()
 
-        # 计算延迟时间（只计算一次）
-        delay_seconds = self.typing_delay.get() / 1000.0  # 转换为秒
+        def _switch():
+            self.switch_profile(_selected_name())
+            _refresh()
 
-        # 逐字符模拟输入，保留大小写
-        for char in text:
-            # 直接输入普通字符
-            keyboard.write(char)
-            # 使用预先计算好的间隔时间
-            time.sleep(delay_seconds)
+        def _delete():
+            name = _selected_name()
+            if name is None:
+                return
+            self.profile_switcher.remove(name)
+            self._persist_profiles()
+            _refresh()
+
+        auto_var = tk.BooleanVar(value=self.profile_switcher.auto_match)
+
+        def _toggle_auto():
+            self.profile_switcher.auto_match = bool(auto_var.get())
+            self._persist_profiles()
+
+        ttk.Checkbutton(main_frame, text="按前台窗口标题自动切换", variable=auto_var, onvalue=True, offvalue=False,
+                        style='Notion.TCheckbutton', command=_toggle_auto).pack(anchor='w', pady=(6, 0))
+        button_frame = ttk.Frame(main_frame, style='Notion.TFrame')
+        button_frame.pack(fill=tk.X, pady=(6, 0))
+        ttk.Button(button_frame, text="切换", command=_switch, style='Notion.Primary.TButton').pack(side=tk.RIGHT)
+        ttk.Button(button_frame, text="删除", command=_delete, style='Notion.TButton').pack(side=tk.RIGHT, padx=(0, 4))
+        ttk.Button(button_frame, text="保存当前设置为方案", command=_save_current,
+                   style='Notion.TButton').pack(side=tk.LEFT)
+        _refresh()
+
+    def _persist_profiles(self):
+        """方案增删后保存并重新注册热键（只在编辑方案时写文件，切换方案时不写）"""
+        self.save_settings()
+        self.register_profile_hotkeys()
+
+    def current_timing_profile(self):
+        """当前生效的输入时序参数：已切换到配置方案时使用方案中的参数"""
+        active = self.profile_switcher.active
+        if active is not None:
+            return active.timing
+        return self.settings_timing_profile()
+
+    def settings_timing_profile(self):
+        """根据设置对话框中的参数构造输入时序参数"""
+        return TimingProfile(char_delay_ms=self.typing_delay.get(), enter_delay_ms=self.enter_delay_ms,
+                             key_hold_ms=self.key_hold_ms.get(), modifier_gap_ms=self.modifier_gap_ms.get(),
+                             hold_shift=bool(self.hold_shift.get()))
+
+    def open_scheduler(self):
+        """定时播放对话框：按墙上时间/间隔/突发计划输入，并显示延迟统计"""
+        window = tk.Toplevel(self.root)
+        window.title("定时播放")
+        window.resizable(False, False)
+        window.configure(bg='#ffffff')
+        window.transient(self.root)
+
+        main_frame = self.create_rounded_frame(window, padding=8, bg_color='#ffffff')
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=4, pady=4)
 
-        # 如果勾选了以回车键结束，则按回车键
-        if self.with_enter.get():
-            keyboard.press_and_release('enter')
+        kinds = ["单次", "间隔", "突发"]
+        text_var = tk.StringVar(value=self.text_input.get().strip())
+        kind_var = tk.StringVar(value=kinds[1])
+        at_var = tk.StringVar(value='')
+        interval_var = tk.StringVar(value='800')
+        count_var = tk.StringVar(value='')
+        duration_var = tk.StringVar(value='60')
+        burst_var = tk.StringVar(value='5')
+
+        fields = [
+            ("内容:", ttk.Entry(main_frame, textvariable=text_var, width=22, style='Notion.TEntry')),
+            ("方式:", ttk.Combobox(main_frame, textvariable=kind_var, values=kinds, state='readonly', width=8)),
+            ("开始时间(HH:MM:SS，空为立即):", ttk.Entry(main_frame, textvariable=at_var, width=12, style='Notion.TEntry')),
+            ("间隔(毫秒):", ttk.Entry(main_frame, textvariable=interval_var, width=12, style='Notion.TEntry')),
+            ("次数(空为不限):", ttk.Entry(main_frame, textvariable=count_var, width=12, style='Notion.TEntry')),
+            ("持续(分钟，空为不限):", ttk.Entry(main_frame, textvariable=duration_var, width=12, style='Notion.TEntry')),
+            ("每次条数(突发):", ttk.Entry(main_frame, textvariable=burst_var, width=12, style='Notion.TEntry')),
+        ]
+        for row, (label_text, widget) in enumerate(fields):
+            ttk.Label(main_frame, text=label_text, style='Notion.TLabel').grid(row=row, column=0, sticky='w', pady=2)
+            widget.grid(row=row, column=1, sticky='w', pady=2)
+
+        stats_var = tk.StringVar(value='')
+        ttk.Label(main_frame, textvariable=stats_var, style='Notion.Status.TLabel', justify='left').grid(
+            row=len(fields) + 1, column=0, columnspan=2, sticky='w', pady=(6, 0))
+
+        def _parse_at(value):
+            """解析今天的HH:MM:SS为时间戳，已过去则顺延到明天"""
+            if not value.strip():
+                return None
+            parsed = time.strptime(value.strip(), '%H:%M:%S')
+            now = time.localtime()
+            at = time.mktime((now.tm_year, now.tm_mon, now.tm_mday, parsed.tm_hour,
+                              parsed.tm_min, parsed.tm_sec, 0, 0, -1))
+            return at + 86400 if at < time.time() else at
+
+        def _add():
+            text = text_var.get().strip()
+            if not text:
+                messagebox.showerror("参数错误", "内容不能为空", parent=window)
+                return
+            try:
+                factory = self.make_schedule_factory(text)
+                at = _parse_at(at_var.get())
+                kind = kind_var.get()
+                if kind == "单次":
+                    self.scheduler.schedule_once(factory, at=at, label=text)
+                else:
+                    interval_s = int(interval_var.get()) / 1000.0
+                    count = int(count_var.get()) if count_var.get().strip() else None
+                    duration_s = float(duration_var.get()) * 60 if duration_var.get().strip() else None
+                    burst_size = int(burst_var.get()) if kind == "突发" else 1
+                    self.scheduler.schedule_burst(factory, burst_size, interval_s, at=at, count=count,
+                                                  duration_s=duration_s, label=text)
+            except (TemplateError, ValueError) as e:
+                messagebox.showerror("参数错误", str(e), parent=window)
+                return
+            self.status_var.set(f"已添加定时计划，待执行{self.scheduler.pending()}个")
+
+        def _refresh():
+            if not window.winfo_exists():
+                return
+            stats = self.scheduler.stats()
+            dispatch = stats['dispatch_lateness']
+            started = stats['start_lateness']
+            stats_var.set(
+                f"待执行计划: {stats['pending']}\n"
+                f"触发延迟 p50/p95/最大: {dispatch['p50_ms']:.1f}/{dispatch['p95_ms']:.1f}/{dispatch['max_ms']:.1f} ms\n"
+                f"开始延迟 p50/p95/最大: {started['p50_ms']:.1f}/{started['p95_ms']:.1f}/{started['max_ms']:.1f} ms"
+            )
+            window.after(500, _refresh)
+
+        button_frame = ttk.Frame(main_frame, style='Notion.TFrame')
+        button_frame.grid(row=len(fields), column=0, columnspan=2, sticky='ew', pady=(8, 0))
+        ttk.Button(button_frame, text="取消全部", command=self.scheduler.cancel_all, style='Notion.TButton').pack(side=tk.LEFT)
+        ttk.Button(button_frame, text="添加计划", command=_add, style='Notion.Primary.TButton').pack(side=tk.RIGHT)
+        _refresh()
+
+    def show_queue_stats(self):
+        """显示输入队列的深度、等待时间与丢弃计数"""
+        stats = self.typing_queue.stats()
+        info = (
+            f"当前深度: {stats['depth']} / {stats['capacity']}（峰值 {stats['max_depth']}）\n"
+            f"溢出策略: {POLICY_NAMES[stats['policy']]}\n"
+            f"入队/出队: {stats['enqueued']} / {stats['dequeued']}\n"
+            f"丢弃最早/丢弃最新/合并/拒绝: {stats['dropped_oldest']} / {stats['dropped_newest']} / "
+            f"{stats['merged']} / {stats['rejected']}\n"
+            f"排队等待 平均/p95/最大: {stats['wait_mean_ms']:.0f} / {stats['wait_p95_ms']:.0f} / "
+            f"{stats['wait_max_ms']:.0f} ms"
+        )
+        messagebox.showinfo("队列状态", info)
+
+    def current_with_enter(self):
+        """当前是否以回车键结束（配置方案优先）"""
+        active = self.profile_switcher.active
+        return active.with_enter if active is not None else self.with_enter.get()
+
+    def current_record_mode(self):
+        """当前是否为记录模式（配置方案优先）"""
+        active = self.profile_switcher.active
+        return active.record_mode if active is not None else bool(self.record_mode.get())
+
+    def current_record_format(self):
+        """当前生效的记录格式（配置方案优先）"""
+        active = self.profile_switcher.active
+        if active is not None:
+            return active.record_format
+        return self.settings_record_format()
+
+    def settings_record_format(self):
+        """根据设置对话框中的参数构造记录格式"""
+        return RecordFormat(field_separator=self.field_separator.get(),
+                            record_terminator=self.record_terminator.get(),
+                            field_delay_ms=self.field_delay.get(),
+                            record_delay_ms=self.record_delay.get())
+
+    def open_record_file(self):
+        """从CSV/TSV文件逐条输入记录（流式读取，记录之间连续输入）"""
+        path = filedialog.askopenfilename(filetypes=[("记录文件", "*.csv *.tsv *.txt"), ("所有文件", "*.*")])
+        if not path:
+            return
+        try:
+            fmt = self.current_record_format()
+        except Exception as e:
+            self.status_var.set(f"记录设置无效: {e}")
+            return
+        segments = stream_segments(read_records(path), fmt)
+        self.submit_jobs([TypingJob(segments, source='record', label=os.path.basename(path))])
+
+    def make_file_job(self, path):
+        """构造流式输入文件的任务；文件不存在时提示并返回None"""
+        if not os.path.isfile(path):
+            self.status_var.set(f"文件不存在: {path}")
+            return None
+        return TypingJob(file_segments(path), source='file', label=os.path.basename(path))
+
+    def open_stream_file(self):
+        """选择文本文件并流式输入，历史记录中只保存文件引用"""
+        path = filedialog.askopenfilename(filetypes=[("文本文件", "*.txt"), ("所有文件", "*.*")])
+        if not path:
+            return
+        job = self.make_file_job(path)
+        if job is None:
+            return
+        self.add_to_history(file_ref(path))
+        self.submit_jobs([job])
+
+    def open_preflight_file(self):
+        """预检对话框：按规则集剔除不合格的行，确认后流式输入合格行文件"""
+        window = tk.Toplevel(self.root)
+        window.title("预检后输入文件")
+        window.resizable(False, False)
+        window.configure(bg='#ffffff')
+        window.transient(self.root)
+
+        main_frame = self.create_rounded_frame(window, padding=8, bg_color='#ffffff')
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=4, pady=4)
 
-        self.status_var.set("输入完成！")
-        # 恢复按钮状态、重置输入标记并重新绑定Enter键
-        def _finish_reset():
-            self.is_typing = False
-            self.enable_buttons()
-            self.root.bind('<Return>', lambda event: self.start_simulation())
-        self.root.after(0, _finish_reset)
+        rule_keys = list(preflight.RULE_SETS)
+        names = [preflight.RULE_SETS[key].name for key in rule_keys] + ["自定义规则文件..."]
+        rules_var = tk.StringVar(value=names[0])
+        row_frame = ttk.Frame(main_frame, style='Notion.TFrame')
+        row_frame.pack(anchor='w', fill=tk.X)
+        ttk.Label(row_frame, text="规则集:", style='Notion.TLabel').pack(side=tk.LEFT, padx=(0, 6))
+        ttk.Combobox(row_frame, textvariable=rules_var, values=names, state='readonly', width=16).pack(side=tk.LEFT)
+
+        progress_var = tk.StringVar(value="选择文件后在后台预检，合格行另存为 .clean.txt，剔除报告为 .rejects.csv")
+        ttk.Label(main_frame, textvariable=progress_var, style='Notion.Status.TLabel',
+                  wraplength=300).pack(anchor='w', pady=(6, 0))
+
+        def _rules():
+            name = rules_var.get()
+            if name in names[:-1]:
+                return preflight.RULE_SETS[rule_keys[names.index(name)]]
+            path = filedialog.askopenfilename(parent=window, filetypes=[("规则文件", "*.json")])
+            return preflight.load_rule_set(path) if path else None
+
+        def _run():
+            try:
+                rules = _rules()
+            except Exception as e:
+                messagebox.showerror("规则集无效", str(e), parent=window)
+                return
+            if rules is None:
+                return
+            path = filedialog.askopenfilename(parent=window,
+                                              filetypes=[("文本文件", "*.txt *.csv"), ("所有文件", "*.*")])
+            if not path:
+                return
+            total = max(1, os.path.getsize(path))
+            start_button.config(state=tk.DISABLED)
+
+            def _progress(done):
+                self.root.after(0, lambda: progress_var.set(f"预检中… {done * 100 // total}%"))
+
+            def _worker():
+                try:
+                    result = preflight.run_preflight(path, rules, progress=_progress)
+                    self.root.after(0, lambda: _finish(result, None))
+                except Exception as e:
+                    # except结束后e被删除，先绑定到默认参数
+                    self.root.after(0, lambda error=e: _finish(None, error))
+
+            threading.Thread(target=_worker, name='preflight', daemon=True).start()
+
+        def _finish(result, error):
+            if not window.winfo_exists():
+                return
+            start_button.config(state=tk.NORMAL)
+            if error is not None:
+                progress_var.set(f"预检失败: {error}")
+                return
+            progress_var.set(result.summary())
+            if not result.clean:
+                return
+            message = result.summary()
+            if result.rejected_total:
+                message += f"\n剔除报告: {result.report_path}"
+            if messagebox.askyesno("预检完成", message + "\n\n是否输入合格的行？", parent=window):
+                job = self.make_file_job(result.clean_path)
+                if job is not None:
+                    self.add_to_history(file_ref(result.clean_path))
+                    self.submit_jobs([job])
+                    window.destroy()
+
+        start_button = ttk.Button(main_frame, text="选择文件并预检", command=_run, style='Notion.Primary.TButton')
+        start_button.pack(anchor='e', pady=(8, 0))
+
+    def toggle_agent_mode(self):
+        """连接控制端作为代理运行，或断开已有连接"""
+        if self.cluster_agent is not None:
+            self.cluster_agent.stop()
+            self.cluster_agent = None
+            # 控制端会重新分配未完成的任务，本机不再输入队列中的控制端任务
+            self._drop_cluster_jobs()
+            self.status_var.set("已退出代理模式")
+            return
+        address = simpledialog.askstring("代理模式", "控制端地址（host:port）:",
+                                         initialvalue=f"127.0.0.1:{DEFAULT_PORT}", parent=self.root)
+        if not address:
+            return
+        host, _, port = address.strip().rpartition(':')
+        try:
+            port = int(port)
+        except ValueError:
+            messagebox.showerror("参数错误", "地址格式应为 host:port")
+            return
+        # 共享令牌：控制端监听非本机地址时必须设置，留空只能连接未设置令牌的本机控制端
+        token = simpledialog.askstring("代理模式", "共享令牌（与控制端一致，可留空）:", show='*',
+                                       initialvalue=os.environ.get(TOKEN_ENV, ''), parent=self.root)
+        if token is None:
+            return
+        self.cluster_agent = Agent(host or DEFAULT_HOST, port, name=machine_id(), executor=self._run_cluster_job,
+                                   profile=self.current_timing_profile(), token=token.strip() or None,
+                                   on_disconnect=self._drop_cluster_jobs).start()
+        self.status_var.set(f"代理模式：已连接 {host}:{port}，再次选择菜单可退出")
+
+    def _drop_cluster_jobs(self):
+        """与控制端断开或退出代理模式：移除队列中尚未开始的控制端任务（正在输入的一条会输入完）"""
+        removed = self.typing_queue.remove(lambda job: job.source == 'cluster')
+        if removed:
+            print(f"已丢弃{len(removed)}个控制端任务（由控制端重新分配）")
+            self.root.after(0, self._finish_reset)
+
+    def _run_cluster_job(self, segments, on_done):
+        """代理线程回调：把控制端分发的任务放入输入队列（不倒计时，不经过重复抑制）"""
+        job = TypingJob([tuple(segment) for segment in segments], source='cluster', countdown=False)
+        job.on_done = on_done
+        # 按队列策略等待空位，形成背压
+        if self.typing_queue.put(job):
+            self.root.after(0, self._mark_typing)
+        else:
+            on_done('error', 0.0, 0)
+
+    def open_barcode_generator(self):
+        """批量生成条码对话框：生成到文件、放入输入队列或校验已有文件"""
+        window = tk.Toplevel(self.root)
+        window.title("批量生成条码")
+        window.resizable(False, False)
+        window.configure(bg='#ffffff')
+        window.transient(self.root)
+
+        main_frame = self.create_rounded_frame(window, padding=8, bg_color='#ffffff')
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=4, pady=4)
+
+        names = [barcode_generator.SYMBOLOGY_NAMES[s] for s in barcode_generator.SYMBOLOGIES]
+        symbology_var = tk.StringVar(value=names[0])
+        count_var = tk.StringVar(value='1000')
+        prefix_var = tk.StringVar(value='')
+        start_var = tk.StringVar(value='')
+
+        fields = [
+            ("码制:", ttk.Combobox(main_frame, textvariable=symbology_var, values=names, state='readonly', width=12)),
+            ("数量:", ttk.Entry(main_frame, textvariable=count_var, width=14, style='Notion.TEntry')),
+            ("前缀:", ttk.Entry(main_frame, textvariable=prefix_var, width=14, style='Notion.TEntry')),
+            ("起始序号(空为随机):", ttk.Entry(main_frame, textvariable=start_var, width=14, style='Notion.TEntry')),
+        ]
+        for row, (text, widget) in enumerate(fields):
+            ttk.Label(main_frame, text=text, style='Notion.TLabel').grid(row=row, column=0, sticky='w', pady=2)
+            widget.grid(row=row, column=1, sticky='w', pady=2)
+
+        def _options():
+            """读取并检查参数，返回 (码制, 数量, 生成参数)，非法时提示并返回None"""
+            try:
+                symbology = barcode_generator.SYMBOLOGIES[names.index(symbology_var.get())]
+                count = int(count_var.get())
+                if count < 1:
+                    raise ValueError("数量必须大于0")
+                start = int(start_var.get()) if start_var.get().strip() else None
+                prefix = prefix_var.get().strip()
+                barcode_generator.check_options(symbology, prefix, start, count)
+                return symbology, count, dict(prefix=prefix, start=start)
+            except ValueError as e:
+                messagebox.showerror("参数错误", str(e), parent=window)
+                return None
+
+        def _to_file():
+            options = _options()
+            if options is None:
+                return
+            path = filedialog.asksaveasfilename(parent=window, defaultextension='.txt',
+                                                filetypes=[("文本文件", "*.txt")])
+            if not path:
+                return
+            symbology, count, extra = options
+            self.status_var.set("正在生成条码...")
+
+            def _worker():
+                try:
+                    began = time.perf_counter()
+                    written = barcode_generator.write_codes(path, symbology, count, **extra)
+                    self.status_var.set(f"已生成{written}条，用时{time.perf_counter() - began:.1f}秒")
+                except Exception as e:
+                    self.status_var.set(f"生成失败: {e}")
+
+            threading.Thread(target=_worker, daemon=True).start()
+
+        def _to_queue():
+            options = _options()
+            if options is None:
+                return
+            symbology, count, extra = options
+            with_enter = self.current_with_enter()
+
+            def _segments():
+                # 逐块生成，内存中只保留一个块
+                for code in barcode_generator.iter_codes(symbology, count, **extra):
+                    yield ('text', code)
+                    if with_enter:
+                        yield ('key', 'enter')
+                    # 每条条码作为一条记录：统计吞吐量，并允许高优先级任务在此插队
+                    yield ('record', None)
+
+            window.destroy()
+            label = f"{barcode_generator.SYMBOLOGY_NAMES[symbology]} x{count}"
+            self.submit_jobs([TypingJob(_segments(), source='barcode', label=label)])
+
+        def _validate():
+            path = filedialog.askopenfilename(parent=window, filetypes=[("文本文件", "*.txt"), ("所有文件", "*.*")])
+            if not path:
+                return
+            symbology = barcode_generator.SYMBOLOGIES[names.index(symbology_var.get())]
+            self.status_var.set("正在校验...")
+
+            def _worker():
+                try:
+                    total, invalid, samples = barcode_generator.validate_file(path, symbology)
+                    lines = [f"共{total}行，无效{invalid}行"]
+                    lines += [f"第{no}行: {text}" for no, text in samples[:10]]
+                    message = "\n".join(lines)
+                except Exception as e:
+                    message = f"校验失败: {e}"
+                self.status_var.set("就绪")
+                self.root.after(0, lambda: messagebox.showinfo("校验结果", message))
+
+            threading.Thread(target=_worker, daemon=True).start()
+
+        button_frame = ttk.Frame(main_frame, style='Notion.TFrame')
+        button_frame.grid(row=len(fields), column=0, columnspan=2, sticky='ew', pady=(8, 0))
+        ttk.Button(button_frame, text="保存到文件", command=_to_file, style='Notion.TButton').pack(side=tk.LEFT, padx=(0, 2))
+        ttk.Button(button_frame, text="校验文件", command=_validate, style='Notion.TButton').pack(side=tk.LEFT, padx=(0, 2))
+        ttk.Button(button_frame, text="放入输入队列", command=_to_queue, style='Notion.Primary.TButton').pack(side=tk.RIGHT)
+
+    def open_auto_tune(self):
+        """自动调优输入速率：在本地采集窗口中搜索零丢字的最低输入间隔"""
+        if getattr(self, 'is_typing', False) or self.typing_queue.busy():
+            self.status_var.set("正在输入中，请稍候...")
+            return
+        if not messagebox.askyesno("自动调优输入速率",
+                                   "将打开一个测试窗口并自动输入样本文本，\n"
+                                   "调优期间请勿操作键盘和鼠标。\n\n是否开始？"):
+            return
+
+        self.is_typing = True
+        self.disable_buttons()
+        self.root.unbind('<Return>')
+        target = TkCaptureTarget(self.root)
+        target.open()
+
+        def _progress(message):
+            self.root.after(0, lambda: self.status_var.set(f"调优中：{message}"))
+
+        def _worker():
+            result = None
+            try:
+                tuner = TypingRateTuner(self.typing_engine, target, trials=3, progress=_progress)
+                result = tuner.tune(self.settings_timing_profile())
+            except Exception as e:
+                print(f"自动调优失败: {e}")
+            finally:
+                target.close()
+            self.root.after(0, lambda: self._finish_auto_tune(result))
+
+        threading.Thread(target=_worker, daemon=True).start()
+
+    def _finish_auto_tune(self, profile):
+        """调优结束：应用并按机器保存结果"""
+        self.is_typing = False
+        self.enable_buttons()
+        self.root.bind('<Return>', lambda event: self.start_simulation())
+        if profile is None:
+            self.status_var.set("自动调优失败：最大间隔下仍有丢字")
+            return
+        self.apply_machine_profile(profile.to_dict())
+        entry = profile.to_dict()
+        entry['tuned_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        self.machine_profiles[machine_id()] = entry
+        self.save_settings()
+        self.status_var.set(f"调优完成：间隔{profile.char_delay_ms}ms，回车前等待{profile.enter_delay_ms}ms，"
+                            f"按键保持{profile.key_hold_ms}ms{'，连续大写保持Shift' if profile.hold_shift else ''}")
+
+    def apply_machine_profile(self, data):
+        """应用按机器保存的时序参数"""
+        try:
+            profile = TimingProfile.from_dict(data)
+            self.typing_delay.set(profile.char_delay_ms)
+            self.enter_delay_ms = profile.enter_delay_ms
+            self.key_hold_ms.set(profile.key_hold_ms)
+            self.modifier_gap_ms.set(profile.modifier_gap_ms)
+            self.hold_shift.set(profile.hold_shift)
+        except Exception:
+            pass
 
     def disable_buttons(self):
         """禁用按钮，防止重复点击"""
@@ -796,25 +1881,139 @@ class KeyboardSimulatorApp:
         self.history_button.config(state=tk.NORMAL)
 
     def start_simulation(self):
-        """开始模拟输入"""
-        # 防重入：若正在输入，忽略新的触发
-        if getattr(self, 'is_typing', False):
-            self.status_var.set("正在输入中，请稍候...")
-            return
+        """开始模拟输入；正在输入时按队列溢出策略排队"""
         text = self.text_input.get().strip()
         if not text:
             self.status_var.set("请先输入文本！")
             return
 
-        # 将文本添加到历史记录中（去重并保持顺序）
-        if text in self.history:
-            # 如果文本已存在，先移除再添加到列表开头
-            self.history.remove(text)
-        self.history.insert(0, text)  # 添加到列表开头
+        try:
+            if parse_file_ref(text) is None and looks_like_template(text):
+                # 含占位符的文本按模板编译，由模板线程逐条展开放入队列
+                template, jobs = compile_template(text), None
+            else:
+                template, jobs = None, self.build_jobs(text)
+        except TemplateError as e:
+            self.status_var.set(f"模板错误：{e}")
+            return
+        if template is None and jobs is None:
+            return
+
+        # 历史记录中保存模板原文/文件引用，而非展开结果或文件内容
+        self.add_to_history(text)
+        if template is not None:
+            self.submit_template(text, template)
+        else:
+            self.submit_jobs(jobs)
+
+    def build_jobs(self, text, dry_run=False):
+        """根据输入框文本构造输入任务；文件不存在时返回None
+
+        dry_run为真时只用于预估，不保存任何状态。
+        模板在此只按已保存的序号预览展开（用于预估）；实际输入由submit_template逐条展开并推进序号。
+        """
+        # 文件引用：流式读取文件内容输入，换行输入为回车
+        file_path = parse_file_ref(text)
+        if file_path is not None:
+            if dry_run:
+                return [TypingJob(file_segments(file_path), source='file')] if os.path.isfile(file_path) else None
+            job = self.make_file_job(file_path)
+            return [job] if job is not None else None
+        # 含占位符的文本按模板编译并展开（模板自行控制Tab/回车，不追加回车）
+        if looks_like_template(text):
+            template = compile_template(text)
+            template.restore_counters(self.template_counters.get(text))
+            return [TypingJob(segments, source='template', countdown=(i == 0), label=text)
+                    for i, segments in enumerate(template.expand())]
+        if self.current_record_mode():
+            # 记录模式：按记录结束键结束，不追加回车
+            fields = split_input_record(text)
+            return [TypingJob(record_segments(fields, self.current_record_format()), source='record', label=text)]
+        # 如果勾选了以回车键结束，则按回车键
+        return [TypingJob(text_segments(text, self.current_with_enter()), label=text)]
+
+    def schedule_estimate(self, delay_ms=300):
+        """输入内容或设置变化后延迟刷新预估耗时（连续输入时只计算最后一次）"""
+        if self._estimate_after is not None:
+            self.root.after_cancel(self._estimate_after)
+        self._estimate_after = self.root.after(delay_ms, self.refresh_estimate)
+
+    def refresh_estimate(self):
+        """在后台线程空跑当前输入内容，结果显示在开始按钮旁"""
+        self._estimate_after = None
+        self._estimate_generation += 1
+        generation = self._estimate_generation
+        text = self.input_var.get().strip()
+        if not text:
+            self.estimate_var.set('')
+            return
+        profile = self.current_timing_profile()
+
+        def _worker():
+            try:
+                jobs = self._estimate_jobs(text, generation)
+                if jobs is None:
+                    message = ''
+                else:
+                    result = self.cost_model.estimate(jobs, profile)
+                    if generation != self._estimate_generation:
+                        return  # 扫描期间输入又有变化，结果已过期
+                    message = f"预计{format_duration(result['duration_s'])}·{result['keystrokes']}键"
+                    if result['slow_chars']:
+                        message += f"·慢{result['slow_chars']}"
+            except TemplateError:
+                message = '模板有误'
+            except Exception as e:
+                print(f"预估耗时失败: {e}")
+                message = ''
+            self.root.after(0, lambda: self._show_estimate(generation, message))
+
+        threading.Thread(target=_worker, daemon=True).start()
+
+    def _estimate_jobs(self, text, generation):
+        """预估用的 (片段, 是否倒计时) 列表；文件引用使用缓存的统计，输入无效时返回None"""
+        file_path = parse_file_ref(text)
+        if file_path is not None:
+            if not os.path.isfile(file_path):
+                return None
+            return [(self._file_tally(file_path, generation), True)]
+        jobs = self.build_jobs(text, dry_run=True)
+        if jobs is None:
+            return None
+        return [(self._until_stale(job.segments, generation), job.countdown) for job in jobs]
+
+    def _until_stale(self, segments, generation):
+        """逐个传递片段，预估过期（输入内容又变化）后提前结束扫描"""
+        for i, segment in enumerate(segments):
+            if not i % 1024 and generation != self._estimate_generation:
+                return
+            yield segment
+
+    def _file_tally(self, path, generation):
+        """空跑文件得到统计，按路径、修改时间与大小缓存；扫描中途过期的结果不缓存"""
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = self._file_tallies.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        tally = SegmentTally(self._until_stale(file_segments(path), generation)).consume()
+        if generation == self._estimate_generation:
+            if len(self._file_tallies) >= 8:
+                self._file_tallies.clear()
+            self._file_tallies[path] = (version, tally)
+        return tally
+
+    def _show_estimate(self, generation, message):
+        if generation == self._estimate_generation:
+            self.estimate_var.set(message)
+
+    def add_to_history(self, text):
+        """将文本添加到历史记录中（去重并保持顺序）"""
+        # 如果文本已存在，先移除再添加到列表开头
+        self.history.push(text)
 
         # 限制历史记录数量
-        if len(self.history) > self.max_history_items:
-            self.history = self.history[:self.max_history_items]  # 保留前50条
+        self.history.truncate(self.max_history_items)
 
         # 保存历史记录到文件
         self.save_history()
@@ -823,31 +2022,183 @@ class KeyboardSimulatorApp:
         if self.history_visible:
             self.refresh_history_display()
 
-        # 标记正在输入并禁用按钮
+    def _mark_typing(self):
+        """标记正在输入：禁用按钮并临时解绑Enter键"""
+        # 任务已在此之前全部完成（定时任务的标记可能晚于完成回调）则无需标记
+        if not self.typing_queue.busy():
+            return
         self.is_typing = True
         # 禁用按钮
         self.disable_buttons()
+        # 开始按钮保持可用：输入期间点击会按溢出策略加入队列
+        if not bool(self.ultra_compact.get()):
+            self.start_button.config(state=tk.NORMAL)
         # 临时解绑Enter键事件，防止自动按Enter导致的循环
         self.root.unbind('<Return>')
 
-        # 在新线程中执行模拟输入，避免UI卡顿
-        threading.Thread(target=self.simulate_typing, args=(text,), daemon=True).start()
+    def submit_jobs(self, jobs):
+        """将任务放入输入队列，由后台线程执行；界面线程提交时不等待队列空位"""
+        was_typing = getattr(self, 'is_typing', False)
+        admitted = [job for job in jobs if self.dedup.admit(job)]
+        if not admitted:
+            self.status_var.set("重复内容已忽略")
+            return 0
+        accepted = sum(1 for job in admitted if self._put_admitted(job, block=False))
+        if accepted:
+            self._mark_typing()
+        if accepted < len(admitted):
+            self.status_var.set(f"队列已满，{len(admitted) - accepted}条未加入")
+        elif was_typing:
+            self.status_var.set(f"已加入队列，排队{self.typing_queue.qsize()}条")
+        return accepted
+
+    def _put_admitted(self, job, block=True, policy=None):
+        """放入已通过重复抑制的任务；队列拒绝时撤销其窗口记录，以便重试"""
+        if self.typing_queue.put(job, block=block, policy=policy):
+            return True
+        self.dedup.release(job)
+        return False
+
+    def _dispatch_scheduled(self, entry, jobs):
+        """调度线程回调：放入输入队列后在主线程标记输入状态"""
+        # 调度线程按策略等待队列空位，形成背压
+        accepted = sum(1 for job in jobs if self.dedup.admit(job) and self._put_admitted(job))
+        if accepted:
+            self.root.after(0, self._mark_typing)
+
+    def make_schedule_factory(self, text):
+        """根据文本构造定时计划的任务工厂：模板只编译一次，每次执行展开新的一批"""
+        if looks_like_template(text):
+            template = compile_template(text)
+            template.restore_counters(self.template_counters.get(text))
+
+            def _template_jobs():
+                jobs = [TypingJob(segments, source='schedule', countdown=False, label=text)
+                        for segments in template.expand()]
+                self.store_template_counters(text, template)
+                return jobs
+            return _template_jobs
+
+        if self.current_record_mode():
+            segments = record_segments(split_input_record(text), self.current_record_format())
+        else:
+            segments = text_segments(text, self.current_with_enter())
+        return lambda: [TypingJob(segments, source='schedule', countdown=False, label=text)]
+
+    def submit_template(self, text, template):
+        """把编译好的模板交给模板线程，序号从上次运行处继续"""
+        with self._template_lock:
+            # 只保留仍在历史记录中的模板序号
+            self.template_counters = {k: v for k, v in self.template_counters.items() if k in self.history}
+        self.template_feed_queue.put((text, template))
+
+    def _template_feed_loop(self):
+        """模板线程：按提交顺序逐个展开模板（同一模板的多次提交依次接续序号）"""
+        while True:
+            text, template = self.template_feed_queue.get()
+            try:
+                self.feed_template(text, template)
+            except Exception as e:
+                print(f"模板任务加入队列失败: {e}")
+
+    def feed_template(self, text, template):
+        """逐条展开模板并放入输入队列，返回加入队列的条数
+
+        每条以等待策略提交：队列满时等待空位，不挤掉已排队的任务，自身也不会被丢弃或合并，
+        因此重复次数超过队列容量时序号也连续。每条入队前先保存推进后的序号，
+        异常退出时最多跳过已保存但未输入的序号，不会重复输入同一序号。
+        """
+        with self._template_lock:
+            template.restore_counters(self.template_counters.get(text))
+        queued = []
+        ignored = []
+
+        def _submit(segments, index):
+            job = TypingJob(segments, source='template', countdown=(index == 0), label=text)
+            job.pinned = True
+            if not self.dedup.admit(job):
+                # 窗口内已输入过相同内容（没有序号变化），跳过不算跳号
+                ignored.append(job)
+                return True
+            self.store_template_counters(text, template)
+            if not self._put_admitted(job, policy=BLOCK):
+                return False
+            queued.append(job)
+            if not self.is_typing:
+                self.root.after(0, self._mark_typing)
+            return True
+
+        template.feed(_submit)
+        # 被拒绝的记录已撤销序号推进，保存最终状态
+        self.store_template_counters(text, template)
+        if not queued and ignored:
+            self.status_var.set("重复内容已忽略")
+        return len(queued)
+
+    def store_template_counters(self, text, template):
+        """记录模板的当前序号并保存到文件"""
+        with self._template_lock:
+            self.template_counters[text] = template.counter_state()
+            self.save_template_counters()
+
+    def load_template_counters(self):
+        """从文件加载模板序号状态"""
+        try:
+            if os.path.exists(self.template_file):
+                with open(self.template_file, 'r', encoding='utf-8') as f:
+                    self.template_counters = json.load(f)
+        except Exception as e:
+            print(f"加载模板序号失败: {e}")
+            self.template_counters = {}
+
+    def load_cost_model(self):
+        """从文件加载本机的耗时预估校准数据"""
+        try:
+            if os.path.exists(self.cost_model_file):
+                with open(self.cost_model_file, 'r', encoding='utf-8') as f:
+                    self.cost_model = CostModel.from_dict(json.load(f).get(machine_id()))
+        except Exception as e:
+            print(f"加载耗时预估校准数据失败: {e}")
+            self.cost_model = CostModel()
+
+    def save_cost_model(self):
+        """保存本机的耗时预估校准数据（保留其他机器的数据）"""
+        try:
+            models = {}
+            if os.path.exists(self.cost_model_file):
+                with open(self.cost_model_file, 'r', encoding='utf-8') as f:
+                    models = json.load(f)
+            models[machine_id()] = self.cost_model.to_dict()
+            with open(self.cost_model_file, 'w', encoding='utf-8') as f:
+                json.dump(models, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"保存耗时预估校准数据失败: {e}")
+
+    def save_template_counters(self):
+        """保存模板序号状态到文件"""
+        try:
+            with tracer.span('template_save', 'io'), self.metric_persist.time(file='templates'):
+                with open(self.template_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.template_counters, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"保存模板序号失败: {e}")
 
     def load_history(self):
         """从文件加载历史记录"""
         try:
             if os.path.exists(self.history_file):
                 with open(self.history_file, 'r', encoding='utf-8') as f:
-                    self.history = json.load(f)
+                    self.history = HistoryArena(json.load(f))
         except Exception as e:
             print(f"加载历史记录失败: {e}")
-            self.history = []
+            self.history = HistoryArena()
 
     def save_history(self):
         """保存历史记录到文件"""
         try:
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.history, f, ensure_ascii=False, indent=2)
+            with tracer.span('history_save', 'io', count=len(self.history)), self.metric_persist.time(file='history'):
+                with open(self.history_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.history.to_list(), f, ensure_ascii=False, indent=2)
         except Exception as e:
             print(f"保存历史记录失败: {e}")
 
@@ -860,6 +2211,8 @@ class KeyboardSimulatorApp:
                     # 加载设置项
                     if 'with_enter' in settings:
                         self.with_enter.set(settings['with_enter'])
+                    if 'low_memory_mode' in settings:
+                        self.low_memory_mode.set(bool(settings['low_memory_mode']))
                     if 'typing_delay' in settings:
                         self.typing_delay.set(settings['typing_delay'])
                     if 'window_alpha' in settings:
@@ -872,6 +2225,69 @@ class KeyboardSimulatorApp:
                             self.ultra_compact.set(bool(settings['ultra_compact']))
                         except Exception:
                             pass
+                    if 'record_mode' in settings:
+                        self.record_mode.set(bool(settings['record_mode']))
+                    if 'record_format' in settings:
+                        try:
+                            fmt = RecordFormat.from_dict(settings['record_format'])
+                            self.field_separator.set(fmt.field_separator)
+                            self.record_terminator.set(fmt.record_terminator)
+                            self.field_delay.set(fmt.field_delay_ms)
+                            self.record_delay.set(fmt.record_delay_ms)
+                        except Exception:
+                            pass
+                    if 'queue_max_size' in settings or 'queue_policy' in settings:
+                        try:
+                            self.queue_max_size.set(int(settings.get('queue_max_size', 1000)))
+                            if settings.get('queue_policy') in OVERFLOW_POLICIES:
+                                self.queue_policy.set(settings['queue_policy'])
+                            self.typing_queue.configure(self.queue_max_size.get(), self.queue_policy.get())
+                        except Exception:
+                            pass
+                    if 'dedup' in settings:
+                        try:
+                            dedup = settings['dedup']
+                            self.dedup_window_ms.set(int(dedup.get('window_ms', DEFAULT_WINDOW_MS)))
+                            self.dedup.configure(self.dedup_window_ms.get(), dedup.get('source_windows'))
+                        except Exception:
+                            pass
+                    if 'settings_profiles' in settings:
+                        try:
+                            self.profile_switcher.set_profiles(
+                                [SettingsProfile.from_dict(data) for data in settings['settings_profiles']])
+                        except Exception as e:
+                            print(f"加载配置方案失败: {e}")
+                    if 'profile_auto_match' in settings:
+                        self.profile_switcher.auto_match = bool(settings['profile_auto_match'])
+                    if 'audit_enabled' in settings:
+                        self.audit_enabled.set(bool(settings['audit_enabled']))
+                        self.audit.enabled = bool(self.audit_enabled.get())
+                    if 'tracing_enabled' in settings:
+                        self.tracing_enabled.set(bool(settings['tracing_enabled']))
+                        if self.tracing_enabled.get():
+                            tracer.enable()
+                    if 'metrics_auto_export' in settings:
+                        self.metrics_auto_export.set(bool(settings['metrics_auto_export']))
+                    if settings.get('metrics_export_dir'):
+                        self.metrics_export_dir = str(settings['metrics_export_dir'])
+                    if 'enter_delay_ms' in settings:
+                        try:
+                            self.enter_delay_ms = max(0, int(settings['enter_delay_ms']))
+                        except Exception:
+                            pass
+                    if 'key_timing' in settings:
+                        try:
+                            key_timing = settings['key_timing']
+                            self.key_hold_ms.set(max(0, int(key_timing.get('key_hold_ms', 0))))
+                            self.modifier_gap_ms.set(max(0, int(key_timing.get('modifier_gap_ms', 0))))
+                            self.hold_shift.set(bool(key_timing.get('hold_shift', False)))
+                        except Exception:
+                            pass
+                    # 本机存在自动调优结果时优先使用
+                    if isinstance(settings.get('machine_profiles'), dict):
+                        self.machine_profiles = settings['machine_profiles']
+                        if machine_id() in self.machine_profiles:
+                            self.apply_machine_profile(self.machine_profiles[machine_id()])
             # 加载完成后立即应用透明度
             try:
                 alpha = max(10, min(100, int(self.window_alpha.get()))) / 100.0
@@ -884,7 +2300,27 @@ class KeyboardSimulatorApp:
             print(f"加载设置失败: {e}")
 
     def save_settings(self):
-        """保存设置到文件"""
+        """保存设置到文件，并按当前设置刷新界面"""
+        self.write_settings()
+        # 保存后根据当前状态应用窗口尺寸、按钮可见性与极致紧凑UI
+        self.apply_window_geometry()
+        self.update_button_visibility()
+        self.update_compact_ui()
+        # 时序、记录格式等设置会影响预估耗时
+        self.schedule_estimate()
+
+    def save_settings_later(self, delay_ms=1000):
+        """延迟写入设置文件（连续切换时只写最后一次，不占用切换本身的时间）"""
+        if getattr(self, '_settings_write_after', None) is not None:
+            self.root.after_cancel(self._settings_write_after)
+        self._settings_write_after = self.root.after(delay_ms, self._write_settings_deferred)
+
+    def _write_settings_deferred(self):
+        self._settings_write_after = None
+        self.write_settings()
+
+    def write_settings(self):
+        """只写入设置文件，不刷新界面"""
         try:
             # 保存时进行范围限制并立即应用透明度
             try:
@@ -894,32 +2330,56 @@ class KeyboardSimulatorApp:
             except Exception:
                 pass
 
+            # 本机已有调优结果时，手动修改的间隔同步到本机参数中
+            if machine_id() in self.machine_profiles:
+                self.machine_profiles[machine_id()].update(
+                    self.settings_timing_profile().to_dict(), name=self.machine_profiles[machine_id()].get('name', '默认'))
+
+            # 队列容量与策略、重复抑制窗口立即生效
+            try:
+                self.typing_queue.configure(self.queue_max_size.get(), self.queue_policy.get())
+            except Exception:
+                pass
+            try:
+                self.dedup.configure(self.dedup_window_ms.get())
+            except Exception:
+                pass
+
             settings = {
                 'with_enter': self.with_enter.get(),
                 'typing_delay': self.typing_delay.get(),
                 'window_alpha': self.window_alpha.get(),
-                'ultra_compact': bool(self.ultra_compact.get())
+                'ultra_compact': bool(self.ultra_compact.get()),
+                'low_memory_mode': bool(self.low_memory_mode.get()),
+                'enter_delay_ms': self.enter_delay_ms,
+                'key_timing': {
+                    'key_hold_ms': self.key_hold_ms.get(),
+                    'modifier_gap_ms': self.modifier_gap_ms.get(),
+                    'hold_shift': bool(self.hold_shift.get()),
+                },
+                'record_mode': bool(self.record_mode.get()),
+                'record_format': self.settings_record_format().to_dict(),
+                'queue_max_size': self.queue_max_size.get(),
+                'queue_policy': self.queue_policy.get(),
+                'dedup': self.dedup.to_dict(),
+                'tracing_enabled': bool(self.tracing_enabled.get()),
+                'audit_enabled': bool(self.audit_enabled.get()),
+                'metrics_auto_export': bool(self.metrics_auto_export.get()),
+                'metrics_export_dir': self.metrics_export_dir,
+                'machine_profiles': self.machine_profiles,
+                'settings_profiles': [profile.to_dict() for profile in self.profile_switcher.profiles.values()],
+                'profile_auto_match': self.profile_switcher.auto_match
             }
-            with open(self.settings_file, 'w', encoding='utf-8') as f:
-                json.dump(settings, f, ensure_ascii=False, indent=2)
+            with tracer.span('settings_save', 'io'), self.metric_persist.time(file='settings'):
+                with open(self.settings_file, 'w', encoding='utf-8') as f:
+                    json.dump(settings, f, ensure_ascii=False, indent=2)
         except Exception as e:
             print(f"保存设置失败: {e}")
-        # 保存后根据当前状态应用窗口尺寸、按钮可见性与极致紧凑UI
-        self.apply_window_geometry()
-        self.update_button_visibility()
-        self.update_compact_ui()
 
     def enter_ultra_compact_mode(self):
-        """显式进入极致紧凑模式：执行一轮强制性UI与布局调整"""
+        """显式进入极致紧凑模式：一次性切换样式名与布局（样式已在启动时预先配置）"""
         try:
-            self.ultra_compact.set(True)
-            # 强制隐藏历史与可选UI
-            self.enforce_history_hidden_if_compact()
-            self.detach_optional_ui()
-            # 更新按钮/紧凑UI/几何
-            self.update_button_visibility()
-            self.update_compact_ui()
-            self.apply_window_geometry()
+            self._switch_compact_layout(True)
             # 切换时添加淡入动画：先降低到10%，再淡入到目标透明度
             try:
                 final_pct = max(10, min(100, int(self.window_alpha.get())))
@@ -927,32 +2387,44 @@ class KeyboardSimulatorApp:
                 self._fade_to_alpha_pct(final_pct, total_ms=200, steps=10)
             except Exception:
                 pass
-            # 持久化设置
-            self.save_settings()
+            # 持久化设置（延迟写文件，不计入切换耗时）
+            self.save_settings_later()
         except Exception:
             pass
 
     def exit_ultra_compact_mode(self):
         """退出极致紧凑模式：恢复完整UI、容器、菜单与几何"""
         try:
-            self.ultra_compact.set(False)
-            # 恢复按钮与历史容器
-            self.attach_optional_ui()
-            # 更新按钮/紧凑UI/几何
-            self.update_button_visibility()
-            self.update_compact_ui()
-            self.apply_window_geometry()
+            self._switch_compact_layout(False)
             # 淡入到目标透明度（保持当前设置）
             try:
                 final_pct = max(10, min(100, int(self.window_alpha.get())))
                 self._fade_to_alpha_pct(final_pct, total_ms=150, steps=8)
             except Exception:
                 pass
-            # 持久化设置
-            self.save_settings()
+            # 持久化设置（延迟写文件，不计入切换耗时）
+            self.save_settings_later()
         except Exception:
             pass
 
+    def _switch_compact_layout(self, compact):
+        """在一批操作中切换模式：显示/隐藏可选区域、替换样式名与pack参数、设置窗口尺寸
+
+        耗时记入ui_refresh_seconds{view="toggle"}，last_toggle_ms超过一帧（FRAME_BUDGET_MS）时打印提示。
+        """
+        began = time.perf_counter()
+        with tracer.span('compact_toggle', 'ui', compact=compact), self.metric_ui_refresh.time(view='toggle'):
+            self.ultra_compact.set(compact)
+            # 强制隐藏历史
+            self.enforce_history_hidden_if_compact()
+            # 按钮可见性与紧凑UI（移除/恢复可选区域，按预先计算的布局表切换样式）
+            self.update_button_visibility()
+            self._update_compact_ui()
+            self.apply_window_geometry()
+        self.last_toggle_ms = (time.perf_counter() - began) * 1000.0
+        if self.last_toggle_ms > FRAME_BUDGET_MS:
+            print(f"极致紧凑模式切换耗时 {self.last_toggle_ms:.1f}ms，超过一帧（{FRAME_BUDGET_MS}ms）")
+
     def toggle_ultra_compact_mode(self):
         try:
             if bool(self.ultra_compact.get()):
@@ -1061,6 +2533,9 @@ class KeyboardSimulatorApp:
                 "极致紧凑模式：\n"
                 "- 隐藏按钮与历史，仅保留快捷键操作\n"
                 "- 可在设置中启用/关闭，或用 Ctrl+U 快速切换\n\n"
+                "输入模板：\n"
+                "- {seq:6} 递增序号、{date} 日期、{rand:8} 随机数、{gs1} 校验位\n"
+                "- {tab} {enter} {key:f5} 特殊按键，{repeat:100} 批量展开\n\n"
             )
             messagebox.showinfo("关于", info)
         except Exception:
@@ -1068,6 +2543,8 @@ class KeyboardSimulatorApp:
 
 
 if __name__ == "__main__":
+    # 预检使用进程池，打包为exe后子进程需要此调用
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = KeyboardSimulatorApp(root)
     root.mainloop()
\ No newline at end of file
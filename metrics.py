@@ -0,0 +1,236 @@
+"""运行指标：计数器、仪表与直方图，可导出为Prometheus文本格式与JSON快照
+
+导出的 .prom 文件可直接交给 node_exporter 的 textfile collector 采集，
+用于集中监控多台扫码枪模拟工作站。
+"""
+import bisect
+import json
+import math
+import os
+import threading
+import time
+
+# 默认直方图分桶（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+PROMETHEUS_FILE = 'keyboard_metrics.prom'
+JSON_FILE = 'keyboard_metrics.json'
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + (list(extra) if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name, help_text, fn=None):
+        self.name = name
+        self.help = help_text
+        self.fn = fn  # 导出时调用的取值函数：返回数值或 [(标签dict, 数值)]
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def samples(self):
+        """[(标签键, 数值)]"""
+        if self.fn is not None:
+            try:
+                result = self.fn()
+            except Exception:
+                return []
+            if isinstance(result, (int, float)):
+                return [((), result)]
+            return [(_label_key(labels), value) for labels, value in result]
+        with self._lock:
+            return sorted(self._values.items())
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+
+class Counter(_Metric):
+    """只增计数器"""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """可任意设置的仪表值"""
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.began = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.began, **self.labels)
+        return False
+
+
+class Histogram(_Metric):
+    """固定分桶直方图"""
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [各桶计数(非累计), 总和, 总数]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels):
+        """计时上下文：with histogram.time(): ..."""
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self._lock:
+            return [(key, (list(state[0]), state[1], state[2])) for key, state in sorted(self._values.items())]
+
+    def summary(self, **labels):
+        """返回 {count, sum, mean, p50, p95}（分位数按桶上界估算）"""
+        with self._lock:
+            state = self._values.get(_label_key(labels))
+            if state is None:
+                return {'count': 0, 'sum': 0.0, 'mean': 0.0, 'p50': 0.0, 'p95': 0.0}
+            counts, total, count = list(state[0]), state[1], state[2]
+        return {
+            'count': count,
+            'sum': total,
+            'mean': total / count,
+            'p50': self._quantile(counts, count, 0.50),
+            'p95': self._quantile(counts, count, 0.95),
+        }
+
+    def _quantile(self, counts, count, q):
+        target = q * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return self.buckets[index] if index < len(self.buckets) else math.inf
+        return math.inf
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self, prefix='scanner_'):
+        self.prefix = prefix
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help_text, fn=None):
+        return self._register(Counter(self.prefix + name, help_text, fn=fn))
+
+    def gauge(self, name, help_text, fn=None):
+        return self._register(Gauge(self.prefix + name, help_text, fn=fn))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self.prefix + name, help_text, buckets=buckets))
+
+    def get(self, name):
+        return self._metrics.get(self.prefix + name)
+
+    def metrics(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    def to_prometheus(self):
+        """Prometheus文本格式（0.0.4）"""
+        lines = []
+        for metric in self.metrics():
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            if metric.kind == 'histogram':
+                for key, (counts, total, count) in metric.samples():
+                    cumulative = 0
+                    for bound, bucket_count in zip(list(metric.buckets) + [math.inf], counts):
+                        cumulative += bucket_count
+                        labels = _format_labels(key, [('le', _format_value(float(bound)))])
+                        lines.append(f'{metric.name}_bucket{labels} {cumulative}')
+                    lines.append(f'{metric.name}_sum{_format_labels(key)} {_format_value(float(total))}')
+                    lines.append(f'{metric.name}_count{_format_labels(key)} {count}')
+            else:
+                for key, value in metric.samples():
+                    lines.append(f'{metric.name}{_format_labels(key)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """JSON可序列化的指标快照"""
+        result = {'timestamp': time.time(), 'metrics': {}}
+        for metric in self.metrics():
+            entries = []
+            if metric.kind == 'histogram':
+                for key, (counts, total, count) in metric.samples():
+                    bounds = [str(b) for b in metric.buckets] + ['+Inf']
+                    entries.append({'labels': dict(key), 'count': count, 'sum': total,
+                                    'buckets': dict(zip(bounds, counts))})
+            else:
+                entries = [{'labels': dict(key), 'value': value} for key, value in metric.samples()]
+            result['metrics'][metric.name] = {'type': metric.kind, 'help': metric.help, 'values': entries}
+        return result
+
+    def export(self, directory='.'):
+        """原子写入 .prom 与 .json 文件（先写临时文件再替换，避免采集到半个文件）"""
+        outputs = [
+            (os.path.join(directory, PROMETHEUS_FILE), self.to_prometheus()),
+            (os.path.join(directory, JSON_FILE), json.dumps(self.snapshot(), ensure_ascii=False, indent=2)),
+        ]
+        for path, content in outputs:
+            temp_path = path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(temp_path, path)
+        return [path for path, _ in outputs]
@@ -0,0 +1,323 @@
+"""批量输入前的预检：在输入之前剔除不合格的记录，生成干净的输入文件与剔除报告
+
+检查项由规则集（RuleSet）配置：
+    长度范围、正则格式、码制校验位（见barcode_generator.validate_lines）、
+    当前键盘布局能否直接键入（美式布局的可打印ASCII）、文件内重复。
+规范化：去除首尾空白，可选去除内部空格、转为大写。
+
+文件按约1MB的块切分（在换行处截断，父进程只统计换行数），各块在进程池中并行校验与规范化，
+父进程按块顺序合并：只做跨块去重（比较各行的64位摘要）并写出结果，因此耗时随核数近似线性下降。
+同时在途的块数有上限，读入与校验的内存不随文件增大；去重需要在父进程中保留每个不重复合格行的摘要，
+这部分内存为O(不重复行数)，约每行70字节（100万行约70MB），不需要去重的规则集（unique=False）没有这部分开销。
+
+用法：
+    python preflight.py codes.txt --rules ean13
+    python preflight.py codes.txt --rules rules.json --workers 8 -o clean.txt --report rejects.csv
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import barcode_generator
+
+DEFAULT_BLOCK_BYTES = 1 << 20
+
+# 剔除原因
+REASON_ENCODING = '编码错误'
+REASON_LENGTH = '长度不符'
+REASON_PATTERN = '格式不符'
+REASON_CHECK_DIGIT = '校验位错误'
+REASON_CHARSET = '含无法键入的字符'
+REASON_DUPLICATE = '重复'
+
+
+class RuleSet:
+    """一组预检规则；charset为'us'时只允许美式布局可直接键入的字符，为None时不检查"""
+
+    def __init__(self, name='默认', min_length=1, max_length=None, pattern=None, symbology=None,
+                 charset='us', unique=True, remove_spaces=False, upper=False):
+        if symbology is not None and symbology not in barcode_generator.SYMBOLOGIES:
+            raise ValueError(f"不支持的码制: {symbology}")
+        self.name = name
+        self.min_length = max(0, int(min_length or 0))
+        self.max_length = int(max_length) if max_length else None
+        self.pattern = pattern or None
+        self.symbology = symbology
+        self.charset = charset
+        self.unique = bool(unique)
+        self.remove_spaces = bool(remove_spaces)
+        self.upper = bool(upper)
+        self._regex = re.compile(self.pattern) if self.pattern else None
+        # 自定义字符集：删除允许的字符后应为空
+        self._charset_table = str.maketrans('', '', charset) if charset and charset != 'us' else None
+
+    def __getstate__(self):
+        # 编译后的正则在子进程中重新编译
+        state = self.__dict__.copy()
+        state['_regex'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._regex = re.compile(self.pattern) if self.pattern else None
+
+    def normalize(self, text):
+        text = text.strip()
+        if self.remove_spaces:
+            text = text.replace(' ', '')
+        if self.upper:
+            text = text.upper()
+        return text
+
+    def check(self, text):
+        """单行（已规范化）的剔除原因；合格返回None（码制校验按块在validate_block中进行）"""
+        if '�' in text:
+            return REASON_ENCODING
+        if len(text) < self.min_length or (self.max_length is not None and len(text) > self.max_length):
+            return REASON_LENGTH
+        if self.charset == 'us':
+            # 美式布局可直接键入的字符恰为可打印ASCII（空格至~）
+            if not (text.isascii() and text.isprintable()):
+                return REASON_CHARSET
+        elif self._charset_table is not None and text.translate(self._charset_table):
+            return REASON_CHARSET
+        if self._regex is not None and not self._regex.fullmatch(text):
+            return REASON_PATTERN
+        return None
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'min_length': self.min_length,
+            'max_length': self.max_length,
+            'pattern': self.pattern,
+            'symbology': self.symbology,
+            'charset': self.charset,
+            'unique': self.unique,
+            'remove_spaces': self.remove_spaces,
+            'upper': self.upper,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data or {})
+        return cls(**{key: data[key] for key in cls().to_dict() if key in data})
+
+
+# 内置规则集
+RULE_SETS = {
+    'ean13': RuleSet('EAN-13', min_length=13, max_length=13, symbology='ean13', remove_spaces=True),
+    'upca': RuleSet('UPC-A', min_length=12, max_length=12, symbology='upca', remove_spaces=True),
+    'code128': RuleSet('Code128', symbology='code128'),
+    'gs1-128': RuleSet('GS1-128', symbology='gs1-128', remove_spaces=True),
+    'text': RuleSet('文本'),
+}
+
+
+def load_rule_set(spec):
+    """按名称取内置规则集，或从JSON文件加载"""
+    if spec in RULE_SETS:
+        return RULE_SETS[spec]
+    with open(spec, 'r', encoding='utf-8') as f:
+        return RuleSet.from_dict(json.load(f))
+
+
+def _digest(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def validate_block(rules, first_line, block):
+    """校验一块文本（bytes，完整的若干行），在子进程中运行
+
+    返回 (合格行文本, 合格行行号列表, 摘要列表, [(行号, 原因, 原文)])；合格行以换行连接，
+    摘要只在需要去重时计算（否则为None），空行直接跳过。
+    """
+    lines = block.decode('utf-8', errors='replace').split('\n')
+    if lines and lines[-1] == '':
+        lines.pop()
+    clean = []
+    numbers = []
+    rejects = []
+    for offset, raw in enumerate(lines):
+        text = rules.normalize(raw)
+        if not text:
+            continue
+        reason = rules.check(text)
+        if reason is not None:
+            rejects.append((first_line + offset, reason, raw.rstrip('\r')))
+            continue
+        clean.append(text)
+        numbers.append(first_line + offset)
+    if rules.symbology is not None and clean:
+        valid = barcode_generator.validate_lines(clean, rules.symbology)
+        if not all(valid):
+            kept = []
+            kept_numbers = []
+            for text, line_no, ok in zip(clean, numbers, valid):
+                if ok:
+                    kept.append(text)
+                    kept_numbers.append(line_no)
+                else:
+                    rejects.append((line_no, REASON_CHECK_DIGIT, text))
+            rejects.sort()
+            clean, numbers = kept, kept_numbers
+    digests = [_digest(text) for text in clean] if rules.unique else None
+    return '\n'.join(clean), numbers, digests, rejects
+
+
+def iter_blocks(path, block_bytes=DEFAULT_BLOCK_BYTES):
+    """按块读取文件并在最后一个换行处截断，返回 (块首行号, bytes)"""
+    line_no = 1
+    carry = b''
+    with open(path, 'rb') as f:
+        first = True
+        while True:
+            data = f.read(block_bytes)
+            if first:
+                # 去掉UTF-8 BOM
+                if data.startswith(b'\xef\xbb\xbf'):
+                    data = data[3:]
+                first = False
+            if not data:
+                break
+            data = carry + data
+            cut = data.rfind(b'\n')
+            if cut < 0:
+                carry = data
+                continue
+            block, carry = data[:cut + 1], data[cut + 1:]
+            yield line_no, block
+            line_no += block.count(b'\n')
+    if carry:
+        yield line_no, carry + b'\n'
+
+
+class PreflightResult:
+    """预检结果统计"""
+
+    def __init__(self, clean_path, report_path):
+        self.clean_path = clean_path
+        self.report_path = report_path
+        self.clean = 0
+        self.rejected = {}  # 原因 -> 行数
+        self.elapsed = 0.0
+
+    @property
+    def rejected_total(self):
+        return sum(self.rejected.values())
+
+    def summary(self):
+        parts = [f"合格 {self.clean} 行", f"剔除 {self.rejected_total} 行"]
+        parts += [f"{reason} {count}" for reason, count in self.rejected.items()]
+        return '，'.join(parts) + f"，用时 {self.elapsed:.2f}s"
+
+
+def run_preflight(path, rules, clean_path=None, report_path=None, workers=None,
+                  block_bytes=DEFAULT_BLOCK_BYTES, progress=None):
+    """预检文件：合格行写入clean_path，剔除行写入report_path（CSV：行号,原因,内容）
+
+    workers为进程数（默认CPU核数，1为在当前进程中校验）；progress(已处理字节数)在每块合并后调用。
+    """
+    base, _ = os.path.splitext(path)
+    clean_path = clean_path or base + '.clean.txt'
+    report_path = report_path or base + '.rejects.csv'
+    workers = max(1, int(workers or os.cpu_count() or 1))
+    result = PreflightResult(clean_path, report_path)
+    seen = set()  # 已出现的合格行摘要（随不重复行数增长）
+    began = time.perf_counter()
+    done_bytes = 0
+
+    with open(clean_path, 'w', encoding='utf-8', newline='\n') as clean_file, \
+            open(report_path, 'w', encoding='utf-8-sig', newline='') as report_file:
+        report = csv.writer(report_file)
+        report.writerow(['行号', '原因', '内容'])
+
+        def _merge(size, outcome):
+            nonlocal done_bytes
+            text, numbers, digests, rejects = outcome
+            lines = None
+            if digests is not None:
+                duplicates = set()
+                block_digests = set(digests)
+                if len(block_digests) == len(digests) and seen.isdisjoint(block_digests):
+                    # 常见情况：没有重复，整块登记
+                    seen.update(block_digests)
+                else:
+                    for line_no, digest in zip(numbers, digests):
+                        if digest in seen:
+                            duplicates.add(line_no)
+                        else:
+                            seen.add(digest)
+                if duplicates:
+                    # 块内有重复时逐行过滤，并把重复行按行号并入剔除列表
+                    lines = text.split('\n')
+                    kept = []
+                    for line_no, line in zip(numbers, lines):
+                        if line_no in duplicates:
+                            rejects.append((line_no, REASON_DUPLICATE, line))
+                        else:
+                            kept.append(line)
+                    rejects.sort()
+                    text = '\n'.join(kept)
+                    lines = kept
+            count = len(lines) if lines is not None else (text.count('\n') + 1 if text else 0)
+            if count:
+                clean_file.write(text)
+                clean_file.write('\n')
+            result.clean += count
+            for line_no, reason, raw in rejects:
+                result.rejected[reason] = result.rejected.get(reason, 0) + 1
+                report.writerow([line_no, reason, raw])
+            done_bytes += size
+            if progress is not None:
+                progress(done_bytes)
+
+        if workers == 1:
+            for first_line, block in iter_blocks(path, block_bytes):
+                _merge(len(block), validate_block(rules, first_line, block))
+        else:
+            # 在途块数有上限，按提交顺序合并
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                for first_line, block in iter_blocks(path, block_bytes):
+                    pending.append((len(block), pool.submit(validate_block, rules, first_line, block)))
+                    if len(pending) >= workers * 2:
+                        size, future = pending.popleft()
+                        _merge(size, future.result())
+                while pending:
+                    size, future = pending.popleft()
+                    _merge(size, future.result())
+
+    result.elapsed = time.perf_counter() - began
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量输入前预检：剔除不合格记录，生成干净文件与剔除报告")
+    parser.add_argument('path', help="待预检的文件（每行一条）")
+    parser.add_argument('--rules', default='text', help=f"规则集：{'/'.join(RULE_SETS)} 或规则JSON文件")
+    parser.add_argument('--workers', type=int, help="进程数，默认为CPU核数")
+    parser.add_argument('-o', '--output', help="合格行输出文件，默认为 <文件名>.clean.txt")
+    parser.add_argument('--report', help="剔除报告（CSV），默认为 <文件名>.rejects.csv")
+    args = parser.parse_args(argv)
+
+    try:
+        rules = load_rule_set(args.rules)
+    except (OSError, ValueError, TypeError) as e:
+        print(f"规则集无效: {e}", file=sys.stderr)
+        return 2
+    result = run_preflight(args.path, rules, args.output, args.report, workers=args.workers)
+    print(result.summary(), file=sys.stderr)
+    print(f"合格行: {result.clean_path}\n剔除报告: {result.report_path}", file=sys.stderr)
+    return 1 if result.rejected_total else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""记录模式：一条记录由多个字段组成，字段之间按分隔键切换，记录之间连续输入
+
+记录转换为片段列表后交给输入引擎；每条记录末尾带有 ('record', None) 标记，
+输入引擎据此回调统计吞吐量。
+"""
+import csv
+import os
+import time
+
+# 文本框中字段之间的分隔符（记录模式下）
+INPUT_FIELD_DELIMITER = '|'
+
+
+class RecordFormat:
+    """记录格式：字段分隔键、记录结束键及字段/记录之间的等待"""
+
+    def __init__(self, field_separator='tab', record_terminator='enter',
+                 field_delay_ms=0, record_delay_ms=0):
+        self.field_separator = (field_separator or 'tab').strip().lower()
+        # 记录结束键可为空（不按键）
+        self.record_terminator = (record_terminator or '').strip().lower()
+        self.field_delay_ms = max(0, int(field_delay_ms))  # 每个字段分隔键之后的等待
+        self.record_delay_ms = max(0, int(record_delay_ms))  # 每条记录结束之后的等待
+
+    def to_dict(self):
+        return {
+            'field_separator': self.field_separator,
+            'record_terminator': self.record_terminator,
+            'field_delay_ms': self.field_delay_ms,
+            'record_delay_ms': self.record_delay_ms,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        data = data or {}
+        return cls(
+            field_separator=data.get('field_separator', 'tab'),
+            record_terminator=data.get('record_terminator', 'enter'),
+            field_delay_ms=data.get('field_delay_ms', 0),
+            record_delay_ms=data.get('record_delay_ms', 0),
+        )
+
+
+def record_segments(fields, fmt):
+    """将一条记录转换为片段列表"""
+    segments = []
+    last = len(fields) - 1
+    for i, value in enumerate(fields):
+        if value:
+            segments.append(('text', value))
+        if i < last:
+            segments.append(('key', fmt.field_separator))
+            if fmt.field_delay_ms:
+                segments.append(('sleep', fmt.field_delay_ms))
+    if fmt.record_terminator:
+        segments.append(('key', fmt.record_terminator))
+    if fmt.record_delay_ms:
+        segments.append(('sleep', fmt.record_delay_ms))
+    segments.append(('record', None))
+    return segments
+
+
+def split_input_record(text, delimiter=INPUT_FIELD_DELIMITER):
+    """将文本框中的一行拆分为字段"""
+    return [field.strip() for field in text.split(delimiter)]
+
+
+def read_records(path, delimiter=None, encoding='utf-8-sig'):
+    """逐条读取记录文件（CSV按逗号，其余按Tab分隔），跳过空行"""
+    if delimiter is None:
+        delimiter = ',' if os.path.splitext(path)[1].lower() == '.csv' else '\t'
+    with open(path, 'r', encoding=encoding, newline='') as f:
+        for row in csv.reader(f, delimiter=delimiter):
+            if any(field.strip() for field in row):
+                yield row
+
+
+def stream_segments(records, fmt):
+    """将记录流逐条转换为片段流，记录之间不停顿、不倒计时"""
+    for fields in records:
+        for segment in record_segments(fields, fmt):
+            yield segment
+
+
+class ThroughputMeter:
+    """记录吞吐量统计（条/分钟）"""
+
+    def __init__(self):
+        self.started = None
+        self.records = 0
+
+    def start(self):
+        """开始计时（任务开始输入时调用）"""
+        self.started = time.perf_counter()
+        self.records = 0
+
+    def record_done(self):
+        if self.started is None:
+            self.start()
+        self.records += 1
+
+    def records_per_minute(self):
+        if self.started is None or not self.records:
+            return 0.0
+        elapsed = time.perf_counter() - self.started
+        return self.records * 60.0 / elapsed if elapsed > 0 else 0.0
@@ -0,0 +1,294 @@
+"""定时播放：基于优先级堆的任务调度器
+
+支持三类计划：
+    单次（once）     在指定时刻执行一次
+    间隔（interval） 每隔固定时间执行一次，可限定次数或持续时长
+    突发（burst）    每隔固定时间一次性执行多条
+
+所有待执行时刻保存在一个按时间排序的最小堆中，调度线程只等待堆顶，
+临近到期时改为短暂自旋以提高定时精度；每次执行都会记录相对计划时刻的延迟。
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+
+ONCE = 'once'
+INTERVAL = 'interval'
+BURST = 'burst'
+SCHEDULE_KINDS = (ONCE, INTERVAL, BURST)
+
+
+class LatenessStats:
+    """延迟统计：总数、均值、最大值，以及最近若干个样本的分位数"""
+
+    def __init__(self, keep=2000):
+        self.samples = deque(maxlen=keep)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def summary(self):
+        """以毫秒为单位返回统计摘要"""
+        if not self.count:
+            return {'count': 0, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+        ordered = sorted(self.samples)
+
+        def _pct(p):
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000.0
+
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count * 1000.0,
+            'p50_ms': _pct(0.50),
+            'p95_ms': _pct(0.95),
+            'max_ms': self.max * 1000.0,
+        }
+
+
+class ScheduleEntry:
+    """一个计划：负责生成任务的factory以及重复规则"""
+
+    def __init__(self, entry_id, kind, factory, interval_s=0.0, runs=None, until=None,
+                 burst_size=1, label=''):
+        self.id = entry_id
+        self.kind = kind
+        self.factory = factory  # 每次执行时调用，返回输入任务列表
+        self.interval_s = interval_s
+        self.runs_left = runs  # 剩余执行次数，None表示不限
+        self.until = until  # 截止时刻（monotonic），None表示不限
+        self.burst_size = max(1, int(burst_size))
+        self.label = label
+        self.fired = 0
+        self.missed = 0  # 因严重落后而跳过的次数
+        self.cancelled = False
+        self.next_due = None
+        self.dispatch_lateness = LatenessStats()  # 调度线程触发的延迟
+        self.start_lateness = LatenessStats()  # 任务实际开始输入的延迟
+
+    def summary(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'label': self.label,
+            'fired': self.fired,
+            'missed': self.missed,
+            'dispatch_lateness': self.dispatch_lateness.summary(),
+            'start_lateness': self.start_lateness.summary(),
+        }
+
+
+class PlaybackScheduler:
+    """按计划时刻调用dispatch(entry, jobs)，把任务送入输入队列
+
+    dispatch在调度线程中调用，应尽快返回（例如只做queue.put）。
+    """
+
+    def __init__(self, dispatch, spin_s=0.002, clock=time.monotonic):
+        self.dispatch = dispatch
+        self.spin_s = spin_s  # 到期前的自旋时间，提高定时精度
+        self.clock = clock
+        self._heap = []  # (到期时刻, 序号, 计划)
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._ids = itertools.count(1)
+        self._entries = {}
+        self._finished = deque(maxlen=100)  # 最近结束的计划，便于查看延迟统计
+        self._running = False
+        self._thread = None
+        self.dispatch_lateness = LatenessStats(keep=10000)
+        self.start_lateness = LatenessStats(keep=10000)
+        self.observer = None  # 可选回调 observer(阶段, 延迟秒数)，阶段为 dispatch/start
+
+    # ---- 生命周期 ----
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    # ---- 添加与取消 ----
+
+    def _due_from(self, at, delay_s):
+        """把墙上时间at（time.time()时间戳）或相对延迟转换为monotonic时刻"""
+        now = self.clock()
+        if at is not None:
+            return now + max(0.0, at - time.time())
+        return now + max(0.0, delay_s)
+
+    def _add(self, entry, due):
+        with self._cond:
+            self._entries[entry.id] = entry
+            entry.next_due = due
+            heapq.heappush(self._heap, (due, next(self._seq), entry))
+            # 新计划可能早于当前堆顶，唤醒调度线程重新计算等待时间
+            self._cond.notify()
+        return entry.id
+
+    def schedule_once(self, factory, at=None, delay_s=0.0, label=''):
+        """在墙上时间at（或delay_s秒后）执行一次"""
+        entry = ScheduleEntry(next(self._ids), ONCE, factory, runs=1, label=label)
+        return self._add(entry, self._due_from(at, delay_s))
+
+    def schedule_interval(self, factory, interval_s, at=None, delay_s=0.0, count=None,
+                          duration_s=None, label='', burst_size=1):
+        """每隔interval_s秒执行一次，可用count限定次数或duration_s限定持续时长"""
+        if interval_s <= 0:
+            raise ValueError("间隔必须大于0")
+        due = self._due_from(at, delay_s)
+        until = due + duration_s if duration_s else None
+        kind = BURST if burst_size > 1 else INTERVAL
+        entry = ScheduleEntry(next(self._ids), kind, factory, interval_s=interval_s, runs=count,
+                              until=until, burst_size=burst_size, label=label)
+        return self._add(entry, due)
+
+    def schedule_burst(self, factory, burst_size, interval_s, **options):
+        """每隔interval_s秒一次性执行burst_size条"""
+        return self.schedule_interval(factory, interval_s, burst_size=max(1, int(burst_size)), **options)
+
+    def cancel(self, entry_id):
+        """取消计划（堆中的条目在到期时被丢弃）"""
+        with self._cond:
+            entry = self._entries.pop(entry_id, None)
+            if entry is not None:
+                entry.cancelled = True
+                self._finished.append(entry)
+            self._cond.notify()
+
+    def cancel_all(self):
+        with self._cond:
+            for entry in self._entries.values():
+                entry.cancelled = True
+                self._finished.append(entry)
+            self._entries.clear()
+            self._heap = []
+            self._cond.notify()
+
+    # ---- 查询 ----
+
+    def pending(self):
+        """尚未结束的计划数"""
+        with self._cond:
+            return len(self._entries)
+
+    def entries(self):
+        with self._cond:
+            return list(self._entries.values())
+
+    def report_started(self, job):
+        """输入线程开始执行计划任务时调用，记录实际开始时刻相对计划的延迟
+
+        只记录首次开始：被抢占后继续执行的任务不再计入。
+        """
+        if getattr(job, 'scheduled_at', None) is None or getattr(job, 'start_reported', False):
+            return
+        job.start_reported = True
+        lateness = max(0.0, self.clock() - job.scheduled_at)
+        self.start_lateness.add(lateness)
+        self._observe('start', lateness)
+        if job.schedule is not None:
+            job.schedule.start_lateness.add(lateness)
+
+    def _observe(self, stage, lateness):
+        if self.observer is not None:
+            try:
+                self.observer(stage, lateness)
+            except Exception:
+                pass
+
+    def stats(self):
+        with self._cond:
+            finished = list(self._finished)
+        return {
+            'pending': self.pending(),
+            'dispatch_lateness': self.dispatch_lateness.summary(),
+            'start_lateness': self.start_lateness.summary(),
+            'entries': [entry.summary() for entry in self.entries()],
+            'finished': [entry.summary() for entry in finished],
+        }
+
+    # ---- 调度线程 ----
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                due, _, entry = self._heap[0]
+                if entry.cancelled:
+                    heapq.heappop(self._heap)
+                    continue
+                remaining = due - self.clock()
+                if remaining > self.spin_s:
+                    self._cond.wait(remaining - self.spin_s)
+                    continue
+                heapq.heappop(self._heap)
+
+            # 剩余时间很短，自旋等待到期
+            while self.clock() < due:
+                time.sleep(0)
+            # 自旋期间（锁外）可能被取消
+            if entry.cancelled:
+                continue
+            self._fire(entry, due)
+
+    def _fire(self, entry, due):
+        fired_at = self.clock()
+        lateness = fired_at - due
+        entry.dispatch_lateness.add(lateness)
+        self.dispatch_lateness.add(lateness)
+        self._observe('dispatch', lateness)
+        entry.fired += 1
+
+        jobs = []
+        try:
+            for _ in range(entry.burst_size):
+                jobs.extend(entry.factory())
+            for job in jobs:
+                job.schedule = entry
+                job.scheduled_at = due
+            self.dispatch(entry, jobs)
+        except Exception as e:
+            print(f"定时任务执行失败: {e}")
+
+        if entry.runs_left is not None:
+            entry.runs_left -= 1
+        self._reschedule(entry, due)
+
+    def _reschedule(self, entry, due):
+        with self._cond:
+            finished = (entry.kind == ONCE or entry.cancelled
+                        or (entry.runs_left is not None and entry.runs_left <= 0))
+            if not finished:
+                # 以计划时刻而非实际时刻累加，避免漂移；严重落后时跳过错过的轮次
+                next_due = due + entry.interval_s
+                now = self.clock()
+                while next_due + entry.interval_s <= now:
+                    next_due += entry.interval_s
+                    entry.missed += 1
+                if entry.until is not None and next_due > entry.until:
+                    finished = True
+                else:
+                    entry.next_due = next_due
+                    heapq.heappush(self._heap, (next_due, next(self._seq), entry))
+            if finished and self._entries.pop(entry.id, None) is not None:
+                self._finished.append(entry)
@@ -0,0 +1,169 @@
+"""命名配置方案：按目标程序保存一组输入参数，运行中按热键或前台窗口标题即时切换
+
+切换只替换内存中的当前方案对象（输入线程下次读取参数时生效），
+不写设置文件，也不改动界面布局。
+"""
+import ctypes
+import os
+import shutil
+import subprocess
+import sys
+import threading
+
+from record_mode import RecordFormat
+from typing_engine import TimingProfile
+
+
+class SettingsProfile:
+    """一个配置方案：时序参数、结束键、记录格式，以及自动匹配的窗口标题关键字与热键"""
+
+    def __init__(self, name, timing=None, with_enter=True, record_mode=False, record_format=None,
+                 window_match=None, hotkey=''):
+        self.name = name
+        self.timing = timing or TimingProfile(name=name)
+        self.with_enter = bool(with_enter)
+        self.record_mode = bool(record_mode)
+        self.record_format = record_format or RecordFormat()
+        # 前台窗口标题包含任一关键字（不区分大小写）时自动切换到此方案
+        self.window_match = [k.strip().lower() for k in (window_match or []) if k.strip()]
+        self.hotkey = (hotkey or '').strip()  # 全局热键，如 ctrl+alt+1
+
+    def matches(self, title):
+        title = (title or '').lower()
+        return any(keyword in title for keyword in self.window_match)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'timing': self.timing.to_dict(),
+            'with_enter': self.with_enter,
+            'record_mode': self.record_mode,
+            'record_format': self.record_format.to_dict(),
+            'window_match': self.window_match,
+            'hotkey': self.hotkey,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            name=str(data['name']),
+            timing=TimingProfile.from_dict(data.get('timing')),
+            with_enter=data.get('with_enter', True),
+            record_mode=data.get('record_mode', False),
+            record_format=RecordFormat.from_dict(data.get('record_format')),
+            window_match=data.get('window_match'),
+            hotkey=data.get('hotkey', ''),
+        )
+
+
+class ProfileSwitcher:
+    """保存所有方案与当前方案；active为None表示使用设置对话框中的默认参数"""
+
+    def __init__(self):
+        self.profiles = {}  # 名称 -> SettingsProfile，保持添加顺序
+        self.active = None
+        self.auto_match = True  # 是否按前台窗口标题自动切换
+        self._auto_selected = False  # 当前方案是否由窗口标题自动选中
+        self._lock = threading.Lock()
+
+    def set_profiles(self, profiles):
+        with self._lock:
+            self.profiles = {profile.name: profile for profile in profiles}
+            if self.active is not None:
+                self.active = self.profiles.get(self.active.name)
+
+    def add(self, profile):
+        """添加或替换同名方案"""
+        with self._lock:
+            self.profiles[profile.name] = profile
+            if self.active is not None and self.active.name == profile.name:
+                self.active = profile
+
+    def remove(self, name):
+        with self._lock:
+            self.profiles.pop(name, None)
+            if self.active is not None and self.active.name == name:
+                self.active = None
+
+    def switch(self, name):
+        """手动切换到指定方案（None为默认参数），返回是否发生变化"""
+        with self._lock:
+            profile = self.profiles.get(name) if name is not None else None
+            if name is not None and profile is None:
+                return False
+            changed = profile is not self.active
+            self.active = profile
+            self._auto_selected = False
+            return changed
+
+    def match_title(self, title):
+        """第一个匹配窗口标题的方案"""
+        with self._lock:
+            for profile in self.profiles.values():
+                if profile.matches(title):
+                    return profile
+        return None
+
+    def auto_switch(self, title):
+        """按前台窗口标题切换，返回是否发生变化
+
+        手动选中的方案不会被自动匹配覆盖，直到前台窗口匹配到其他方案；
+        自动选中的方案在窗口不再匹配任何方案时恢复为默认参数。
+        """
+        if not self.auto_match:
+            return False
+        profile = self.match_title(title)
+        with self._lock:
+            if profile is None:
+                if self._auto_selected and self.active is not None:
+                    self.active = None
+                    self._auto_selected = False
+                    return True
+                return False
+            if profile is self.active:
+                return False
+            self.active = profile
+            self._auto_selected = True
+            return True
+
+    def has_window_rules(self):
+        with self._lock:
+            return any(profile.window_match for profile in self.profiles.values())
+
+
+_xdotool = shutil.which('xdotool') if sys.platform.startswith('linux') else None
+
+
+def foreground_window(timeout=1.0):
+    """前台窗口的（标题, 进程ID）；无法获取（或xdotool超过timeout秒）时返回None
+
+    Windows使用user32，Linux需要xdotool。
+    """
+    try:
+        if sys.platform == 'win32':
+            user32 = ctypes.windll.user32
+            hwnd = user32.GetForegroundWindow()
+            if not hwnd:
+                return None
+            length = user32.GetWindowTextLengthW(hwnd)
+            buffer = ctypes.create_unicode_buffer(length + 1)
+            user32.GetWindowTextW(hwnd, buffer, length + 1)
+            pid = ctypes.c_ulong()
+            user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+            return buffer.value, pid.value
+        if _xdotool is not None:
+            output = subprocess.run([_xdotool, 'getactivewindow', 'getwindowname', 'getwindowpid'],
+                                    capture_output=True, text=True, timeout=timeout).stdout.splitlines()
+            if len(output) >= 2:
+                return output[0], int(output[1])
+    except Exception:
+        pass
+    return None
+
+
+def foreground_external_title(timeout=1.0):
+    """前台窗口不属于本程序时返回其标题，否则返回None"""
+    window = foreground_window(timeout)
+    if window is None or window[1] == os.getpid():
+        return None
+    return window[0]
@@ -0,0 +1,194 @@
+"""输入模板：一次编译、批量展开
+
+模板语法（占位符不区分大小写）：
+    {seq:宽度:起始:步长}   递增序号，如 {seq:6} -> 000001, 000002 ...
+    {date:格式}            日期/时间，格式同strftime，默认 %Y%m%d
+    {rand:位数:字符集}     随机值，字符集可选 digit(默认)/hex/alpha/alnum
+    {gs1}                  对当前字段（上一个按键之后）的数字计算GS1校验位
+    {tab} {enter} {esc}    特殊按键，同时作为字段分隔
+    {key:按键名}           任意按键，如 {key:f5}、{key:ctrl+a}
+    {repeat:次数}          每次运行展开的条数，默认1
+    {{ 与 }}               字面量花括号
+
+展开结果是片段列表：('text', 文本) 或 ('key', 按键名)，可直接放入输入队列。
+"""
+import random
+import re
+import string
+import time
+
+from barcode_generator import gs1_check_digit
+
+RANDOM_CHARSETS = {
+    'digit': string.digits,
+    'hex': '0123456789ABCDEF',
+    'alpha': string.ascii_uppercase,
+    'alnum': string.digits + string.ascii_uppercase,
+}
+
+SPECIAL_KEYS = {'tab': 'tab', 'enter': 'enter', 'esc': 'esc'}
+
+_TEMPLATE_HINT = re.compile(r'\{(seq|date|rand|gs1|tab|enter|esc|key|repeat)\b', re.IGNORECASE)
+
+
+class TemplateError(ValueError):
+    """模板语法错误"""
+
+
+def looks_like_template(text):
+    """文本中含有已知占位符时视为模板"""
+    return bool(_TEMPLATE_HINT.search(text))
+
+
+class CompiledTemplate:
+    """编译后的模板：保存操作序列与序号状态，可反复展开"""
+
+    def __init__(self, source, ops, counters, repeat, rng=None):
+        self.source = source
+        self.repeat = repeat
+        self._ops = ops  # [(类型, 参数)]，类型为 text/key/seq/date/rand/gs1
+        self._counters = counters  # 每个序号占位符的 [当前值, 步长, 宽度]
+        self._rng = rng or random.Random()
+
+    def counter_state(self):
+        """当前各序号的下一个值，便于持久化"""
+        return [c[0] for c in self._counters]
+
+    def restore_counters(self, state):
+        """恢复序号状态；数量不匹配（模板已改动）时忽略"""
+        if state and len(state) == len(self._counters):
+            for counter, value in zip(self._counters, state):
+                counter[0] = int(value)
+
+    def expand_one(self):
+        """展开一条，返回片段列表"""
+        segments = []
+        field = []  # 当前字段已生成的文本片段
+        now = None
+        for kind, arg in self._ops:
+            if kind == 'text':
+                field.append(arg)
+            elif kind == 'seq':
+                counter = self._counters[arg]
+                field.append(str(counter[0]).zfill(counter[2]))
+                counter[0] += counter[1]
+            elif kind == 'date':
+                if now is None:
+                    now = time.localtime()
+                field.append(time.strftime(arg, now))
+            elif kind == 'rand':
+                length, charset = arg
+                field.append(''.join(self._rng.choice(charset) for _ in range(length)))
+            elif kind == 'gs1':
+                digits = ''.join(ch for ch in ''.join(field) if ch.isdigit())
+                field.append(gs1_check_digit(digits))
+            else:  # key
+                if field:
+                    segments.append(('text', ''.join(field)))
+                    field = []
+                segments.append(('key', arg))
+        if field:
+            segments.append(('text', ''.join(field)))
+        return segments
+
+    def expand(self, count=None):
+        """逐条生成展开结果，默认生成repeat条"""
+        total = self.repeat if count is None else count
+        for _ in range(total):
+            yield self.expand_one()
+
+    def feed(self, submit, count=None):
+        """逐条展开并交给submit(片段, 第几条)，返回被接受的条数（默认repeat条）
+
+        submit返回假值（如队列拒绝）时撤销该条对序号的推进并停止，
+        序号状态只推进到最后一条被接受的记录，之后从未被接受的序号继续，不会跳号。
+        """
+        total = self.repeat if count is None else count
+        for i in range(total):
+            state = self.counter_state()
+            if not submit(self.expand_one(), i):
+                self.restore_counters(state)
+                return i
+        return total
+
+
+def _parse_int(value, name, minimum=0):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise TemplateError(f"{name}需要整数: {value}")
+    if number < minimum:
+        raise TemplateError(f"{name}不能小于{minimum}: {value}")
+    return number
+
+
+def compile_template(source, rng=None):
+    """将模板文本编译为CompiledTemplate"""
+    ops = []
+    counters = []
+    repeat = 1
+    literal = []
+    i = 0
+    length = len(source)
+
+    def _flush():
+        if literal:
+            ops.append(('text', ''.join(literal)))
+            literal.clear()
+
+    while i < length:
+        ch = source[i]
+        if ch == '{' and source.startswith('{{', i):
+            literal.append('{')
+            i += 2
+            continue
+        if ch == '}' and source.startswith('}}', i):
+            literal.append('}')
+            i += 2
+            continue
+        if ch == '}':
+            raise TemplateError(f"第{i + 1}个字符处有多余的 }}")
+        if ch != '{':
+            literal.append(ch)
+            i += 1
+            continue
+
+        end = source.find('}', i + 1)
+        if end < 0:
+            raise TemplateError(f"第{i + 1}个字符处的占位符未闭合")
+        body = source[i + 1:end]
+        name, _, rest = body.partition(':')
+        name = name.strip().lower()
+        args = rest.split(':') if rest else []
+        i = end + 1
+
+        if name == 'repeat':
+            repeat = _parse_int(rest, '重复次数', 1)
+            continue
+        _flush()
+        if name == 'seq':
+            width = _parse_int(args[0], '序号宽度') if len(args) > 0 and args[0] else 1
+            start = _parse_int(args[1], '序号起始') if len(args) > 1 and args[1] else 1
+            step = _parse_int(args[2], '序号步长', 1) if len(args) > 2 and args[2] else 1
+            counters.append([start, step, width])
+            ops.append(('seq', len(counters) - 1))
+        elif name == 'date':
+            ops.append(('date', rest or '%Y%m%d'))
+        elif name == 'rand':
+            count = _parse_int(args[0], '随机位数', 1) if args and args[0] else 6
+            charset_name = args[1].lower() if len(args) > 1 else 'digit'
+            if charset_name not in RANDOM_CHARSETS:
+                raise TemplateError(f"未知的随机字符集: {charset_name}")
+            ops.append(('rand', (count, RANDOM_CHARSETS[charset_name])))
+        elif name == 'gs1':
+            ops.append(('gs1', None))
+        elif name in SPECIAL_KEYS:
+            ops.append(('key', SPECIAL_KEYS[name]))
+        elif name == 'key':
+            if not rest.strip():
+                raise TemplateError("{key:按键名} 缺少按键名")
+            ops.append(('key', rest.strip().lower()))
+        else:
+            raise TemplateError(f"未知的占位符: {{{body}}}")
+    _flush()
+    return CompiledTemplate(source, ops, counters, repeat, rng=rng)
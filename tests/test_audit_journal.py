@@ -0,0 +1,52 @@
+import os
+import time
+
+import audit_journal
+from audit_journal import AuditJournal
+
+
+def _entry(ts, payload, outcome='done'):
+    return {'ts': ts, 'station': 'test', 'source': 'manual', 'label': None, 'payload': payload,
+            'profile': None, 'duration_s': 0.1, 'outcome': outcome, 'keystrokes': len(payload), 'records': 1}
+
+
+def _journal(directory):
+    journal = AuditJournal(str(directory))
+    journal.start()
+    return journal
+
+
+def test_until_includes_entries_started_before_segment(tmp_path):
+    now = time.time()
+    journal = _journal(tmp_path)
+    # 任务在分段创建前开始、结束后才写出
+    journal.record(_entry(now - 5, 'early'))
+    journal.record(_entry(now, 'late'))
+    journal.close()
+    assert os.path.exists(tmp_path / audit_journal.INDEX_FILE)
+    found = [entry['payload'] for entry in audit_journal.query(str(tmp_path), until=now - 3)]
+    assert found == ['early']
+    # 没有索引（异常退出的分段）时同样不能漏掉
+    os.remove(tmp_path / audit_journal.INDEX_FILE)
+    found = [entry['payload'] for entry in audit_journal.query(str(tmp_path), until=now - 3)]
+    assert found == ['early']
+
+
+def test_index_skips_segments_outside_range(tmp_path):
+    now = time.time()
+    journal = _journal(tmp_path)
+    journal.record(_entry(now - 100, 'old'))
+    journal.close()
+    segments = audit_journal.list_segments(str(tmp_path), since=now - 10)
+    assert segments == []
+    assert len(audit_journal.list_segments(str(tmp_path), since=now - 200, until=now - 50)) == 1
+
+
+def test_query_filters(tmp_path):
+    now = time.time()
+    journal = _journal(tmp_path)
+    journal.record(_entry(now, '6901234567892'))
+    journal.record(_entry(now, 'ABC', outcome='error'))
+    journal.close()
+    assert [e['payload'] for e in audit_journal.query(str(tmp_path), outcome='error')] == ['ABC']
+    assert [e['payload'] for e in audit_journal.query(str(tmp_path), contains='690123')] == ['6901234567892']
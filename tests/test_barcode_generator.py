@@ -0,0 +1,34 @@
+import pytest
+
+import barcode_generator
+
+
+def test_gs1_128_serial_bound_uses_serial_length():
+    limit = 10 ** barcode_generator.GS1_128_SERIAL_LENGTH
+    assert barcode_generator.check_options('gs1-128', '', limit - 2, 2) == 13
+    with pytest.raises(ValueError):
+        barcode_generator.check_options('gs1-128', '', limit - 1, 3)
+    with pytest.raises(ValueError):
+        barcode_generator.generate_codes('gs1-128', 3, start=limit - 1)
+
+
+def test_gs1_128_sequential_serials_at_upper_bound():
+    limit = 10 ** barcode_generator.GS1_128_SERIAL_LENGTH
+    codes = barcode_generator.generate_codes('gs1-128', 2, start=limit - 2, seed=1)
+    assert [code[-8:] for code in codes] == ['99999998', '99999999']
+    assert all(barcode_generator.validate_lines(codes, 'gs1-128'))
+
+
+def test_digits_raise_on_overflow():
+    with pytest.raises(ValueError):
+        barcode_generator._py_digits(8, 10 ** 8, None)
+    if barcode_generator.np is not None:
+        with pytest.raises(ValueError):
+            barcode_generator._np_digits(2, 8, 10 ** 8 - 1, None)
+
+
+@pytest.mark.parametrize('symbology', ['ean13', 'upca'])
+def test_sequential_codes_are_valid(symbology):
+    codes = barcode_generator.generate_codes(symbology, 100, prefix='690', start=0)
+    assert len(set(codes)) == 100
+    assert all(barcode_generator.validate_lines(codes, symbology))
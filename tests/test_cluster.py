@@ -0,0 +1,166 @@
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+import cluster
+from typing_engine import MemorySink, TimingProfile
+
+
+def _wait(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class FakeController:
+    """只接受一个代理连接，按顺序发送给定的原始行并收集代理的消息"""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.received = []
+        self.server = socket.create_server(('127.0.0.1', 0))
+        self.port = self.server.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        sock, _ = self.server.accept()
+        with sock, sock.makefile('rb') as stream:
+            hello = json.loads(stream.readline())
+            self.received.append(hello)
+            sock.sendall(b'{"type":"welcome","proof":null}\n')
+            for line in self.lines:
+                sock.sendall(line if isinstance(line, bytes) else (json.dumps(line) + '\n').encode())
+            for line in stream:
+                self.received.append(json.loads(line))
+
+    def done_messages(self):
+        return [message for message in self.received if message.get('type') == 'done']
+
+
+def test_agent_survives_malformed_messages():
+    controller = FakeController([
+        b'not json\n',
+        b'[1, 2, 3]\n',
+        {'type': 'job'},
+        {'type': 'job', 'task': 'x', 'segments': []},
+        {'type': 'job', 'task': 1, 'segments': 'abc'},
+        {'type': 'job', 'task': 2, 'segments': [['text', 'ok']]},
+    ])
+    sink = MemorySink()
+    agent = cluster.Agent('127.0.0.1', controller.port, name='t', sink=sink, heartbeat_s=10,
+                          profile=TimingProfile(char_delay_ms=0)).start()
+    try:
+        assert _wait(lambda: len(controller.done_messages()) == 2)
+        outcomes = {message['task']: message['outcome'] for message in controller.done_messages()}
+        assert outcomes == {1: 'rejected', 2: 'done'}
+        assert sink.text() == 'ok'
+        assert agent._thread.is_alive()
+    finally:
+        agent.stop()
+
+
+def test_controller_distributes_all_lines():
+    controller = cluster.Controller('127.0.0.1', 0, dead_after_s=2.0).start()
+    sinks = [MemorySink(), MemorySink()]
+    agents = [cluster.Agent('127.0.0.1', controller.port, name=f'a{i}', sink=sink, heartbeat_s=0.2,
+                            profile=TimingProfile(char_delay_ms=0)).start() for i, sink in enumerate(sinks)]
+    try:
+        assert _wait(lambda: len(controller.progress()['agents']) == 2)
+        lines = [f'SN-{i:04d}' for i in range(200)]
+        controller.submit_lines(lines)
+        assert controller.wait(timeout=10)
+        typed = set()
+        for sink in sinks:
+            typed.update(sink.text().split('\n'))
+        assert set(lines) <= typed
+    finally:
+        for agent in agents:
+            agent.stop()
+        controller.stop()
+
+
+@pytest.mark.parametrize('segments', [
+    None, [['text']], [1, 2],
+    [['key', 'windows+r']], [['key', 'alt+f4']], [['key', 'ctrl']],
+    [['sleep', 10 ** 9]], [['sleep', -1]], [['sleep', True]],
+    [['text', 'a\x1bb']], [['exec', 'x']],
+])
+def test_parse_segments_rejects_unsafe_segments(segments):
+    with pytest.raises(ValueError):
+        cluster.parse_segments(segments)
+
+
+def test_parse_segments_accepts_whitelist():
+    segments = [['text', 'SN-001 条码'], ['key', 'tab'], ['sleep', 50], ['key', 'enter'], ['record', None]]
+    assert cluster.parse_segments(segments) == [tuple(segment) for segment in segments]
+
+
+def test_controller_requires_token_off_loopback():
+    with pytest.raises(ValueError):
+        cluster.Controller('0.0.0.0', 0)
+
+
+def test_token_mismatch_is_rejected_both_ways():
+    controller = cluster.Controller('127.0.0.1', 0, token='secret').start()
+    wrong = cluster.Agent('127.0.0.1', controller.port, name='wrong', sink=MemorySink(), token='other',
+                          reconnect_s=0.05).start()
+    missing = cluster.Agent('127.0.0.1', controller.port, name='missing', sink=MemorySink(),
+                            reconnect_s=0.05).start()
+    right = cluster.Agent('127.0.0.1', controller.port, name='right', sink=MemorySink(), token='secret').start()
+    try:
+        assert _wait(lambda: right.connected)
+        time.sleep(0.2)
+        names = [agent['name'] for agent in controller.progress()['agents']]
+        assert names == ['right']
+        assert not wrong.connected and not missing.connected
+    finally:
+        for agent in (wrong, missing, right):
+            agent.stop()
+        controller.stop()
+
+
+def test_agent_rejects_impersonating_controller():
+    controller = cluster.Controller('127.0.0.1', 0).start()  # 未设置令牌，无法给出控制端证明
+    agent = cluster.Agent('127.0.0.1', controller.port, name='a', sink=MemorySink(), token='secret',
+                          reconnect_s=0.05).start()
+    try:
+        time.sleep(0.3)
+        assert not agent.connected
+    finally:
+        agent.stop()
+        controller.stop()
+
+
+def test_line_segments_split_tabs():
+    assert cluster.line_segments('A\tB') == [('text', 'A'), ('key', 'tab'), ('text', 'B'), ('key', 'enter')]
+
+
+def test_disconnect_drops_queued_jobs_from_executor_queue():
+    from job_queue import JobQueue
+    from typing_engine import TypingJob
+
+    typing_queue = JobQueue()
+
+    def _executor(segments, on_done):
+        # 与界面程序相同：只放入输入队列，此处没有消费线程
+        job = TypingJob(segments, source='cluster', countdown=False)
+        job.on_done = on_done
+        typing_queue.put(job)
+
+    controller = cluster.Controller('127.0.0.1', 0, lookahead_s=60).start()
+    agent = cluster.Agent('127.0.0.1', controller.port, name='gui', executor=_executor, reconnect_s=10,
+                          on_disconnect=lambda: typing_queue.remove(lambda job: job.source == 'cluster')).start()
+    try:
+        assert _wait(lambda: agent.connected)
+        controller.submit_lines(['A', 'B', 'C'])
+        assert _wait(lambda: typing_queue.qsize() == 3)
+        controller.stop()
+        assert _wait(lambda: typing_queue.qsize() == 0)
+    finally:
+        agent.stop()
@@ -0,0 +1,52 @@
+from dedup import DedupWindow, ExpiringSet
+from typing_engine import TypingJob
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _job(text, source='manual'):
+    return TypingJob([('text', text)], source=source)
+
+
+def test_duplicate_suppressed_within_window_only():
+    clock = FakeClock()
+    dedup = DedupWindow(window_ms=500, clock=clock)
+    assert dedup.admit(_job('a'))
+    assert not dedup.admit(_job('a'))
+    clock.now += 0.6
+    assert dedup.admit(_job('a'))
+    assert dedup.stats()['suppressed'] == {'manual': 1}
+
+
+def test_release_lets_retry_through():
+    dedup = DedupWindow(window_ms=500, clock=FakeClock())
+    job = _job('6901234567892')
+    assert dedup.admit(job)
+    # 队列拒绝后撤销，操作员重试不被当作重复
+    dedup.release(job)
+    assert dedup.admit(_job('6901234567892'))
+    assert dedup.stats()['passed'] == 1
+
+
+def test_schedule_source_not_deduplicated():
+    dedup = DedupWindow(window_ms=500, clock=FakeClock())
+    assert dedup.admit(_job('a', 'schedule'))
+    assert dedup.admit(_job('a', 'schedule'))
+
+
+def test_expiring_set_discard_and_capacity():
+    clock = FakeClock()
+    keys = ExpiringSet(max_ttl_ms=1000, bucket_ms=10, max_keys=3, clock=clock)
+    for key in range(3):
+        keys.add(key, 500)
+    keys.discard(1)
+    assert 1 not in keys and len(keys) == 2
+    keys.add(5, 900)
+    keys.add(6, 900)
+    assert len(keys) <= 3
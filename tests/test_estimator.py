@@ -0,0 +1,41 @@
+import threading
+
+from estimator import CostModel, SegmentTally
+from typing_engine import TimingProfile, text_segments
+
+
+def test_estimate_accepts_precomputed_tally():
+    model = CostModel()
+    profile = TimingProfile()
+    segments = text_segments('6901234567892', True)
+    tally = SegmentTally(segments).consume()
+    assert model.estimate([(tally, True)], profile) == model.estimate([(segments, True)], profile)
+
+
+def test_tally_counts_keystrokes():
+    tally = SegmentTally(text_segments('AB-c', True)).consume()
+    assert tally.chars == 4
+    assert tally.enters == 1
+    assert tally.keystrokes == 5
+
+
+def test_to_dict_while_observing_from_another_thread():
+    model = CostModel(keep=50)
+    profile = TimingProfile(char_delay_ms=0)
+    tally = SegmentTally(text_segments('6901234567892', True)).consume()
+    stop = threading.Event()
+
+    def _observe():
+        while not stop.is_set():
+            model.observe(tally, profile, 0.01)
+
+    worker = threading.Thread(target=_observe)
+    worker.start()
+    try:
+        # 未加锁时遍历样本会抛出 RuntimeError: deque mutated during iteration
+        for _ in range(2000):
+            data = model.to_dict()
+            assert len(data['samples']) <= 50
+    finally:
+        stop.set()
+        worker.join()
@@ -0,0 +1,38 @@
+import os
+
+from file_source import file_ref, file_segments, iter_file_text, parse_file_ref
+
+
+def test_file_ref_round_trip(tmp_path):
+    path = tmp_path / 'codes.txt'
+    ref = file_ref(str(path))
+    assert parse_file_ref(ref) == os.path.abspath(str(path))
+    assert parse_file_ref('6901234567892') is None
+
+
+def test_segments_split_lines_into_records(tmp_path):
+    path = tmp_path / 'codes.txt'
+    path.write_bytes('﻿A1\r\n\r\nB2\nC3'.encode('utf-8'))
+    assert list(file_segments(str(path))) == [
+        ('text', 'A1'), ('key', 'enter'), ('record', None),
+        ('key', 'enter'), ('record', None),
+        ('text', 'B2'), ('key', 'enter'), ('record', None),
+        ('text', 'C3'),
+    ]
+
+
+def test_multibyte_characters_across_chunks(tmp_path):
+    text = '订单号一二三\n' * 2000
+    path = tmp_path / 'big.txt'
+    path.write_text(text, encoding='utf-8')
+    # 块大小不是3的倍数，多字节字符必然跨块
+    chunks = list(iter_file_text(str(path), chunk_size=4097))
+    assert len(chunks) > 1 and ''.join(chunks) == text
+    lines = [value for kind, value in file_segments(str(path), chunk_size=4097) if kind == 'text']
+    assert ''.join(lines) == text.replace('\n', '')
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / 'empty.txt'
+    path.write_bytes(b'')
+    assert list(file_segments(str(path))) == []
@@ -0,0 +1,58 @@
+import pytest
+
+from history_store import HistoryArena, sample_history, traced_footprint
+
+
+def test_packed_history_retains_less_than_a_third_of_list_at_100k():
+    listed, _ = traced_footprint(100000, packed=False)
+    packed, peak = traced_footprint(100000)
+    assert packed < 0.35 * listed
+    # 载入时json解析出的list[str]与打包结果同时存在
+    assert peak >= listed
+
+
+def test_empty_and_small_history_footprint():
+    assert traced_footprint(0)[0] < 4096
+    packed, _ = traced_footprint(1000)
+    assert packed < traced_footprint(1000, packed=False)[0]
+    assert HistoryArena(sample_history(1000)).nbytes() < 50 * 1000
+
+
+def test_insert_iterates_newest_first():
+    history = HistoryArena(['c', 'b'])
+    history.push('a')
+    assert list(history) == ['a', 'c', 'b']
+    assert history[0] == 'a' and history[-1] == 'b'
+    assert len(history) == 3 and history
+
+
+def test_push_existing_moves_it_to_the_front():
+    history = HistoryArena(['a', 'b', 'c'])
+    history.push('c')
+    assert history.to_list() == ['c', 'a', 'b']
+    # 子串不视为已存在的记录
+    history.push('b1')
+    assert history.to_list() == ['b1', 'c', 'a', 'b']
+
+
+def test_truncate_evicts_oldest_and_keeps_offsets_valid():
+    history = HistoryArena([f'item{i}' for i in range(10)])
+    history.truncate(4)
+    assert history.to_list() == ['item0', 'item1', 'item2', 'item3']
+    history.push('item9')
+    history.remove('item1')
+    assert history.to_list() == ['item9', 'item0', 'item2', 'item3']
+    assert history.index('item3') == 3
+    history.truncate(0)
+    assert not history and history.to_list() == []
+
+
+def test_lookup_unicode_and_nul():
+    history = HistoryArena(['订单|A1', 'x\0y'])
+    assert '订单|A1' in history and 'xy' in history and '订单' not in history
+    with pytest.raises(ValueError):
+        history.index('missing')
+    with pytest.raises(IndexError):
+        history[2]
+    history.clear()
+    assert len(history) == 0
@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+
+from job_queue import DROP_OLDEST, MERGE, JobQueue
+from typing_engine import TypingJob
+
+
+def _job(text, source='manual'):
+    return TypingJob([('text', text)], source=source)
+
+
+def test_busy_covers_job_between_get_and_task_done():
+    jobs = JobQueue()
+    assert not jobs.busy()
+    jobs.put(_job('a'))
+    assert jobs.busy()
+    job = jobs.get()
+    # 已取出但未处理完：队列为空，但仍处于忙碌状态
+    assert jobs.empty() and jobs.busy()
+    jobs.requeue(job)
+    assert jobs.task_done() is False
+    jobs.get()
+    assert jobs.task_done() is True
+    assert not jobs.busy()
+
+
+def test_busy_is_consistent_across_threads():
+    jobs = JobQueue()
+    seen_idle = []
+    stop = threading.Event()
+
+    def _consumer():
+        while not stop.is_set():
+            try:
+                jobs.get(timeout=0.05)
+            except TimeoutError:
+                continue
+            jobs.task_done()
+
+    consumer = threading.Thread(target=_consumer)
+    consumer.start()
+    try:
+        for i in range(2000):
+            jobs.put(_job(str(i)))
+            # 提交后到task_done之前不应出现“空闲”
+            if not jobs.busy() and jobs.dequeued <= i:
+                seen_idle.append(i)
+    finally:
+        stop.set()
+        consumer.join()
+    assert not seen_idle
+
+
+@pytest.mark.parametrize('policy', [MERGE, DROP_OLDEST])
+def test_policies_report_acceptance(policy):
+    jobs = JobQueue(maxsize=1, policy=policy)
+    assert jobs.put(_job('a'))
+    assert jobs.put(_job('a')) if policy == MERGE else jobs.put(_job('b'))
+    assert jobs.qsize() == 1
+
+
+def _cluster_job(text, results):
+    job = _job(text, source='cluster')
+    job.on_done = lambda outcome, duration, keystrokes: results.append((text, outcome))
+    return job
+
+
+def test_merge_keeps_jobs_with_completion_callbacks():
+    results = []
+    jobs = JobQueue(maxsize=10, policy=MERGE)
+    assert jobs.put(_cluster_job('a', results))
+    assert jobs.put(_cluster_job('a', results))
+    assert jobs.put(_job('a'))
+    # 带回调的两个任务各自保留，普通任务不会并入带回调的任务
+    assert jobs.qsize() == 3
+    assert jobs.merged == 0
+
+
+def test_drop_oldest_never_evicts_jobs_with_callbacks():
+    results = []
+    jobs = JobQueue(maxsize=2, policy=DROP_OLDEST)
+    assert jobs.put(_cluster_job('a', results))
+    assert jobs.put(_cluster_job('b', results))
+    # 队列已满且只有带回调的任务：新任务被拒绝，由提交方回报失败
+    assert not jobs.put(_job('c'))
+    assert [job.payload_key() for job in (jobs.get(), jobs.get())] == [(('text', 'a'),), (('text', 'b'),)]
+
+
+def test_remove_by_predicate():
+    jobs = JobQueue()
+    for text, source in (('a', 'cluster'), ('b', 'manual'), ('c', 'cluster')):
+        jobs.put(_job(text, source))
+    removed = jobs.remove(lambda job: job.source == 'cluster')
+    assert len(removed) == 2
+    assert jobs.qsize() == 1 and jobs.get().source == 'manual'
@@ -0,0 +1,51 @@
+import json
+
+from metrics import MetricsRegistry
+
+
+def test_prometheus_text_output():
+    registry = MetricsRegistry(prefix='t_')
+    jobs = registry.counter('jobs_total', "任务数")
+    jobs.inc(source='manual')
+    jobs.inc(2, source='manual')
+    jobs.inc(source='file "a"\\b')
+    registry.gauge('queue_depth', "队列深度", fn=lambda: 7)
+    wait = registry.histogram('wait_seconds', "等待", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        wait.observe(value)
+    text = registry.to_prometheus()
+    assert text.endswith('\n')
+    lines = text.splitlines()
+    assert lines[:2] == ['# HELP t_jobs_total 任务数', '# TYPE t_jobs_total counter']
+    assert 't_jobs_total{source="manual"} 3' in lines
+    assert 't_jobs_total{source="file \\"a\\"\\\\b"} 1' in lines
+    assert '# TYPE t_queue_depth gauge' in lines and 't_queue_depth 7' in lines
+    # 分桶计数为累计值，最后一个桶为+Inf
+    assert lines[-5:] == [
+        't_wait_seconds_bucket{le="0.1"} 1',
+        't_wait_seconds_bucket{le="1"} 3',
+        't_wait_seconds_bucket{le="+Inf"} 4',
+        't_wait_seconds_sum 4.05',
+        't_wait_seconds_count 4',
+    ]
+
+
+def test_registry_returns_existing_metric_and_summary():
+    registry = MetricsRegistry()
+    first = registry.histogram('latency_seconds', "延迟")
+    assert registry.histogram('latency_seconds', "延迟") is first
+    with first.time(stage='x'):
+        pass
+    summary = first.summary(stage='x')
+    assert summary['count'] == 1 and summary['p95'] == 0.001
+    assert first.summary(stage='missing')['count'] == 0
+
+
+def test_export_writes_prometheus_and_json(tmp_path):
+    registry = MetricsRegistry()
+    registry.counter('records_total', "记录数").inc(5)
+    prom_path, json_path = registry.export(str(tmp_path))
+    assert 'scanner_records_total 5' in open(prom_path, encoding='utf-8').read()
+    snapshot = json.load(open(json_path, encoding='utf-8'))
+    assert snapshot['metrics']['scanner_records_total']['values'] == [{'labels': {}, 'value': 5}]
+    assert not list(tmp_path.glob('*.tmp'))
@@ -0,0 +1,28 @@
+import csv
+
+import preflight
+
+
+def _write(path, lines):
+    path.write_text(''.join(line + '\n' for line in lines), encoding='utf-8')
+
+
+def test_rejects_and_cross_block_duplicates(tmp_path):
+    source = tmp_path / 'codes.txt'
+    _write(source, ['6901234567892', '6901234567891', '69012345678', '6901234567892', ' 690 1234567892 '])
+    result = preflight.run_preflight(str(source), preflight.RULE_SETS['ean13'], workers=1, block_bytes=16)
+    assert (tmp_path / 'codes.clean.txt').read_text(encoding='utf-8') == '6901234567892\n'
+    assert result.clean == 1
+    assert result.rejected == {preflight.REASON_CHECK_DIGIT: 1, preflight.REASON_LENGTH: 1,
+                               preflight.REASON_DUPLICATE: 2}
+    with open(result.report_path, encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.reader(f))[1:]
+    assert [int(row[0]) for row in rows] == [2, 3, 4, 5]
+
+
+def test_charset_rejects_untypeable_text(tmp_path):
+    source = tmp_path / 'text.txt'
+    _write(source, ['ABC-123', '条码', 'abc'])
+    result = preflight.run_preflight(str(source), preflight.RULE_SETS['text'], workers=1)
+    assert result.clean == 2
+    assert result.rejected == {preflight.REASON_CHARSET: 1}
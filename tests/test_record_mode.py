@@ -0,0 +1,41 @@
+from record_mode import RecordFormat, read_records, record_segments, split_input_record, stream_segments
+from typing_engine import MemorySink, TimingProfile, TypingEngine
+
+
+def test_record_segments_with_delays_and_empty_fields():
+    fmt = RecordFormat(field_separator='Tab', record_terminator='enter', field_delay_ms=5, record_delay_ms=10)
+    assert record_segments(['A1', '', 'C3'], fmt) == [
+        ('text', 'A1'), ('key', 'tab'), ('sleep', 5), ('key', 'tab'), ('sleep', 5),
+        ('text', 'C3'), ('key', 'enter'), ('sleep', 10), ('record', None),
+    ]
+    assert record_segments(['x'], RecordFormat(record_terminator='')) == [('text', 'x'), ('record', None)]
+
+
+def test_split_and_type_record():
+    fields = split_input_record(' 6901234567892 | 2 |批次A')
+    assert fields == ['6901234567892', '2', '批次A']
+    sink = MemorySink()
+    records = []
+    engine = TypingEngine(sink)
+    engine.type_segments(record_segments(fields, RecordFormat()), TimingProfile(char_delay_ms=0),
+                         on_record=lambda: records.append(True))
+    assert sink.text() == '6901234567892\t2\t批次A\n'
+    assert records == [True]
+
+
+def test_read_records_by_extension_and_stream(tmp_path):
+    csv_path = tmp_path / 'items.csv'
+    csv_path.write_text('﻿A,"B,1"\n\n,,\nC,D\n', encoding='utf-8')
+    tsv_path = tmp_path / 'items.txt'
+    tsv_path.write_text('A\tB\n', encoding='utf-8')
+    assert list(read_records(str(csv_path))) == [['A', 'B,1'], ['C', 'D']]
+    assert list(read_records(str(tsv_path))) == [['A', 'B']]
+    segments = list(stream_segments(read_records(str(csv_path)), RecordFormat()))
+    assert segments.count(('record', None)) == 2
+
+
+def test_record_format_round_trip():
+    fmt = RecordFormat(field_separator='ENTER', record_terminator=None, field_delay_ms=-3)
+    assert fmt.to_dict() == {'field_separator': 'enter', 'record_terminator': '',
+                             'field_delay_ms': 0, 'record_delay_ms': 0}
+    assert RecordFormat.from_dict(fmt.to_dict()).to_dict() == fmt.to_dict()
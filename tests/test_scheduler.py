@@ -0,0 +1,104 @@
+import time
+
+from scheduler import LatenessStats, PlaybackScheduler
+from typing_engine import TypingJob
+
+
+def test_cancel_during_spin_does_not_fire():
+    fired = []
+    scheduler = PlaybackScheduler(lambda entry, jobs: fired.extend(jobs), spin_s=1.0)
+    scheduler.start()
+    try:
+        # 到期前1秒内即进入自旋（锁外），此时取消仍应生效
+        entry_id = scheduler.schedule_once(lambda: [TypingJob([('text', 'a')])], delay_s=0.3)
+        time.sleep(0.1)
+        scheduler.cancel(entry_id)
+        time.sleep(0.4)
+    finally:
+        scheduler.stop()
+    assert fired == []
+    assert scheduler.stats()['finished'][0]['fired'] == 0
+
+
+def test_resumed_job_reports_start_lateness_once():
+    now = [100.0]
+    scheduler = PlaybackScheduler(lambda entry, jobs: None, clock=lambda: now[0])
+    job = TypingJob([('text', 'a')], source='schedule')
+    job.scheduled_at = 99.0
+    scheduler.report_started(job)
+    # 被抢占后继续执行：不再记录（否则第二个样本包含了被抢占的时间）
+    now[0] = 160.0
+    scheduler.report_started(job)
+    summary = scheduler.start_lateness.summary()
+    assert summary['count'] == 1
+    assert summary['max_ms'] == 1000.0
+
+
+def _collector():
+    fired = []
+
+    def _dispatch(entry, jobs):
+        fired.extend(job.label for job in jobs)
+    return fired, _dispatch
+
+
+def _factory(label):
+    return lambda: [TypingJob([('text', label)], source='schedule', label=label)]
+
+
+def test_entries_fire_in_due_order_and_cancelled_entries_are_skipped():
+    fired, dispatch = _collector()
+    scheduler = PlaybackScheduler(dispatch)
+    scheduler.start()
+    try:
+        scheduler.schedule_once(_factory('c'), delay_s=0.15)
+        scheduler.schedule_once(_factory('a'), delay_s=0.05)
+        cancelled = scheduler.schedule_once(_factory('x'), delay_s=0.08)
+        scheduler.schedule_once(_factory('b'), delay_s=0.1)
+        scheduler.cancel(cancelled)
+        time.sleep(0.4)
+    finally:
+        scheduler.stop()
+    assert fired == ['a', 'b', 'c']
+    assert scheduler.pending() == 0
+
+
+def test_interval_count_and_burst_size():
+    fired, dispatch = _collector()
+    scheduler = PlaybackScheduler(dispatch)
+    scheduler.start()
+    try:
+        scheduler.schedule_interval(_factory('i'), 0.05, count=3)
+        scheduler.schedule_burst(_factory('b'), 4, 0.05, count=1)
+        time.sleep(0.4)
+    finally:
+        scheduler.stop()
+    assert fired.count('i') == 3
+    assert fired.count('b') == 4
+    stats = scheduler.stats()
+    assert stats['dispatch_lateness']['count'] == 4
+    assert {entry['fired'] for entry in stats['finished']} == {3, 1}
+
+
+def test_cancel_all_clears_pending_entries():
+    fired, dispatch = _collector()
+    scheduler = PlaybackScheduler(dispatch)
+    scheduler.start()
+    try:
+        for label in 'abc':
+            scheduler.schedule_once(_factory(label), delay_s=0.1)
+        scheduler.cancel_all()
+        time.sleep(0.2)
+    finally:
+        scheduler.stop()
+    assert fired == [] and scheduler.pending() == 0
+
+
+def test_lateness_summary_percentiles():
+    stats = LatenessStats(keep=100)
+    for ms in range(1, 101):
+        stats.add(ms / 1000.0)
+    summary = stats.summary()
+    assert summary['count'] == 100
+    assert summary['max_ms'] == 100.0
+    assert round(summary['p50_ms']) == 51 and round(summary['p95_ms']) == 96
@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+
+import pytest
+
+import settings_profiles
+from record_mode import RecordFormat
+from typing_engine import TimingProfile
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="xdotool只在Linux上使用")
+def test_slow_xdotool_is_capped_by_timeout(tmp_path, monkeypatch):
+    fake = tmp_path / 'xdotool'
+    fake.write_text('#!/bin/sh\nsleep 2\necho title\necho 1\n')
+    os.chmod(fake, 0o755)
+    monkeypatch.setattr(settings_profiles, '_xdotool', str(fake))
+    began = time.monotonic()
+    assert settings_profiles.foreground_external_title(timeout=0.1) is None
+    assert time.monotonic() - began < 1.0
+
+
+def _switcher():
+    switcher = settings_profiles.ProfileSwitcher()
+    switcher.set_profiles([
+        settings_profiles.SettingsProfile('ERP', window_match=['SAP', ' Oracle ']),
+        settings_profiles.SettingsProfile('表格', window_match=['excel', 'sap gui']),
+        settings_profiles.SettingsProfile('手动'),
+    ])
+    return switcher
+
+
+def test_title_matching_is_case_insensitive_and_ordered():
+    switcher = _switcher()
+    assert switcher.match_title('SAP GUI - Orders').name == 'ERP'
+    assert switcher.match_title('Book1 - Microsoft Excel').name == '表格'
+    assert switcher.match_title('oracle forms').name == 'ERP'
+    assert switcher.match_title('Notepad') is None
+    assert switcher.match_title(None) is None
+    assert switcher.has_window_rules()
+
+
+def test_auto_switch_reverts_only_auto_selected_profiles():
+    switcher = _switcher()
+    assert switcher.auto_switch('Excel') and switcher.active.name == '表格'
+    assert not switcher.auto_switch('excel 2')
+    assert switcher.auto_switch('Notepad') and switcher.active is None
+    # 手动选中的方案不因窗口不匹配而恢复默认，匹配到其他方案时才切换
+    assert switcher.switch('手动')
+    assert not switcher.auto_switch('Notepad') and switcher.active.name == '手动'
+    assert switcher.auto_switch('SAP') and switcher.active.name == 'ERP'
+    switcher.auto_match = False
+    assert not switcher.auto_switch('Excel')
+
+
+def test_profile_round_trip():
+    profile = settings_profiles.SettingsProfile(
+        'ERP', timing=TimingProfile(char_delay_ms=5, key_hold_ms=3, hold_shift=True), with_enter=False,
+        record_mode=True, record_format=RecordFormat(field_separator='enter', record_delay_ms=20),
+        window_match=['SAP'], hotkey='ctrl+alt+1')
+    restored = settings_profiles.SettingsProfile.from_dict(profile.to_dict())
+    assert restored.to_dict() == profile.to_dict()
+    assert restored.window_match == ['sap'] and restored.timing.key_level
@@ -0,0 +1,107 @@
+import json
+import random
+import threading
+import time
+
+import pytest
+
+from job_queue import BLOCK, DROP_OLDEST, JobQueue
+from template_engine import TemplateError, compile_template, looks_like_template
+from typing_engine import TypingJob
+
+
+def _serial(segments):
+    return int(segments[0][1])
+
+
+def test_feed_more_jobs_than_queue_holds_keeps_serials_contiguous():
+    template = compile_template('{seq:4:1}{enter}{repeat:25}')
+    jobs = JobQueue(maxsize=5, policy=DROP_OLDEST)
+    typed = []
+
+    def _consumer():
+        for _ in range(25):
+            typed.append(_serial(jobs.get(timeout=5).segments))
+            jobs.task_done()
+
+    consumer = threading.Thread(target=_consumer)
+    consumer.start()
+
+    def _submit(segments, index):
+        job = TypingJob(segments, source='template')
+        job.pinned = True
+        return jobs.put(job, policy=BLOCK)
+
+    assert template.feed(_submit) == 25
+    consumer.join()
+    assert typed == list(range(1, 26))
+    assert template.counter_state() == [26]
+    assert jobs.dropped_oldest == 0
+
+
+def test_feed_rejected_record_does_not_consume_serial():
+    template = compile_template('{seq:3}{repeat:10}')
+    jobs = JobQueue(maxsize=3)
+
+    def _submit(segments, index):
+        return jobs.put(TypingJob(segments, source='template'), block=False)
+
+    assert template.feed(_submit) == 3
+    assert template.counter_state() == [4]
+    # 队列腾出空位后从未被接受的序号继续
+    queued = [_serial(jobs.get().segments) for _ in range(3)]
+    assert template.feed(_submit, count=2) == 2
+    assert queued + [_serial(jobs.get().segments) for _ in range(2)] == [1, 2, 3, 4, 5]
+
+
+def test_pinned_jobs_are_not_evicted_by_drop_oldest():
+    jobs = JobQueue(maxsize=2, policy=DROP_OLDEST)
+    for text in ('1', '2'):
+        job = TypingJob([('text', text)], source='template')
+        job.pinned = True
+        assert jobs.put(job)
+    assert not jobs.put(TypingJob([('text', 'x')]))
+    assert jobs.dropped_oldest == 0 and jobs.qsize() == 2
+
+
+def test_expand_placeholders_and_keys():
+    template = compile_template('A{seq:3:8:2}-{rand:4:hex}{tab}690123456789{gs1}{{x}}{key:F5}{enter}{repeat:2}',
+                                rng=random.Random(1))
+    assert template.repeat == 2
+    first, second = template.expand()
+    assert first[0][1].startswith('A008-') and second[0][1].startswith('A010-')
+    assert all(ch in '0123456789ABCDEF' for ch in first[0][1][5:]) and len(first[0][1]) == 9
+    assert first[1:] == [('key', 'tab'), ('text', '6901234567892{x}'), ('key', 'f5'), ('key', 'enter')]
+
+
+def test_date_placeholder_uses_strftime_format():
+    (segments,) = compile_template('{date:%Y}').expand()
+    assert segments == [('text', time.strftime('%Y'))]
+
+
+def test_counters_are_saved_and_restored_across_compiles():
+    template = compile_template('{seq:4}|{seq:2:5:5}{repeat:3}')
+    list(template.expand())
+    state = json.loads(json.dumps(template.counter_state()))
+    assert state == [4, 20]
+    resumed = compile_template('{seq:4}|{seq:2:5:5}{repeat:3}')
+    resumed.restore_counters(state)
+    assert resumed.expand_one() == [('text', '0004|20')]
+
+
+def test_restore_ignores_state_of_a_changed_template():
+    template = compile_template('{seq:2}')
+    template.restore_counters([7, 9])
+    assert template.expand_one() == [('text', '01')]
+
+
+@pytest.mark.parametrize('source', ['{seq:x}', '{seq', 'a}b', '{nope}', '{rand:4:greek}', '{key:}', '{repeat:0}'])
+def test_invalid_templates_raise(source):
+    with pytest.raises(TemplateError):
+        compile_template(source)
+
+
+def test_looks_like_template():
+    assert looks_like_template('SN-{SEQ:6}')
+    assert not looks_like_template('6901234567892')
+    assert not looks_like_template('{json: 1}')
@@ -0,0 +1,61 @@
+import json
+
+from tracing import Tracer, slow_span_hook
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer()
+    with tracer.span('noop') as span:
+        span.set(a=1)
+    tracer.instant('noop')
+    assert tracer.events() == []
+
+
+def test_ring_buffer_keeps_newest_events():
+    tracer = Tracer(capacity=3, enabled=True)
+    for i in range(5):
+        with tracer.span(f's{i}', 'io', index=i):
+            pass
+    assert [event['name'] for event in tracer.events()] == ['s2', 's3', 's4']
+    # 调整容量时保留最新的事件
+    tracer.enable(capacity=2)
+    assert [event['name'] for event in tracer.events()] == ['s3', 's4']
+
+
+def test_chrome_trace_export(tmp_path):
+    tracer = Tracer(enabled=True)
+    with tracer.span('job', 'typing', source='manual') as span:
+        span.set(keystrokes=3)
+    tracer.instant('mark')
+    try:
+        with tracer.span('fail'):
+            raise KeyError('x')
+    except KeyError:
+        pass
+    path = tmp_path / 'trace.json'
+    assert tracer.dump_chrome(str(path)) == 4
+    data = json.loads(path.read_text(encoding='utf-8'))
+    assert data['displayTimeUnit'] == 'ms'
+    metadata, job, mark, fail = data['traceEvents']
+    assert metadata['ph'] == 'M' and metadata['name'] == 'thread_name'
+    assert job['ph'] == 'X' and job['dur'] >= 0 and job['args'] == {'source': 'manual', 'keystrokes': 3}
+    assert mark['ph'] == 'i' and mark['s'] == 't'
+    assert fail['args'] == {'error': 'KeyError'}
+    assert job['tid'] == metadata['tid']
+
+
+def test_hooks_are_registered_once_and_filter_slow_spans():
+    tracer = Tracer(enabled=True)
+    logged = []
+    hook = slow_span_hook(0, categories=('ui',), log=logged.append)
+    tracer.add_hook(hook)
+    tracer.add_hook(hook)
+    with tracer.span('toggle', 'ui'):
+        pass
+    with tracer.span('save', 'io'):
+        pass
+    assert len(logged) == 1 and 'ui/toggle' in logged[0]
+    tracer.remove_hook(hook)
+    with tracer.span('toggle', 'ui'):
+        pass
+    assert len(logged) == 1
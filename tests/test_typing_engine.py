@@ -0,0 +1,52 @@
+from record_mode import RecordFormat, record_segments
+from typing_engine import MemorySink, TimingProfile, TypingEngine, text_segments
+
+FAST = TimingProfile(char_delay_ms=0)
+
+
+def _engine():
+    sink = MemorySink()
+    return TypingEngine(sink), sink
+
+
+def test_type_text_with_enter():
+    engine, sink = _engine()
+    assert engine.type_text('AB-12', FAST, with_enter=True)
+    assert sink.text() == 'AB-12\n'
+    assert engine.keystrokes == 6
+
+
+def test_key_level_shift_per_char():
+    engine, sink = _engine()
+    engine.type_segments(text_segments('Ab!'), FAST.copy(modifier_gap_ms=1))
+    assert sink.text() == 'Ab!'
+    assert [event for event in sink.events if event[1] == 'shift'] == [
+        ('press', 'shift'), ('release', 'shift'), ('press', 'shift'), ('release', 'shift')]
+
+
+def test_hold_shift_presses_once_per_run():
+    engine, sink = _engine()
+    engine.type_segments(text_segments('ABCd'), FAST.copy(hold_shift=True))
+    assert sink.text() == 'ABCd'
+    assert sum(1 for event in sink.events if event == ('press', 'shift')) == 1
+    # 片段结束时Shift总是松开
+    engine.type_segments(text_segments('XY'), FAST.copy(hold_shift=True))
+    assert sink.events[-1] == ('release', 'shift')
+
+
+def test_non_us_chars_written_directly():
+    engine, sink = _engine()
+    engine.type_segments(text_segments('条码A'), FAST.copy(key_hold_ms=1))
+    assert sink.text() == '条码A'
+    assert ('write', '条') in sink.events
+
+
+def test_record_boundary_pause_and_resume():
+    engine, sink = _engine()
+    fmt = RecordFormat()
+    segments = iter(record_segments(['A1', 'B1'], fmt) + record_segments(['A2', 'B2'], fmt))
+    # 第一条记录结束时要求暂停，剩余片段留在迭代器中
+    assert engine.type_segments(segments, FAST, on_record=lambda: True) is False
+    assert sink.text() == 'A1\tB1\n'
+    assert engine.type_segments(segments, FAST) is True
+    assert sink.text() == 'A1\tB1\nA2\tB2\n'
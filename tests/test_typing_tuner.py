@@ -0,0 +1,61 @@
+from typing_engine import US_SHIFTED_SYMBOLS, TimingProfile
+from typing_tuner import TypingRateTuner
+
+
+class FakeTarget:
+    """模拟目标程序：Shift间隔不足时丢掉需要Shift的字符，字符间隔不足时丢掉所有字符"""
+
+    def __init__(self, min_gap_ms, min_char_delay_ms, min_char_delay_with_gap_ms):
+        self.min_gap_ms = min_gap_ms
+        self.min_char_delay_ms = min_char_delay_ms
+        self.min_char_delay_with_gap_ms = min_char_delay_with_gap_ms
+        self.received = ''
+
+    def reset(self):
+        self.received = ''
+
+    def read(self):
+        return self.received
+
+    def receive(self, text, profile):
+        with_gap = profile.modifier_gap_ms >= self.min_gap_ms
+        floor = self.min_char_delay_with_gap_ms if with_gap else self.min_char_delay_ms
+        for char in text:
+            if profile.char_delay_ms < floor:
+                continue
+            self.received += char
+
+
+class FakeEngine:
+    def __init__(self, target):
+        self.target = target
+
+    def type_text(self, text, profile, with_enter=False, stop_event=None):
+        self.target.receive(text + ('\n' if with_enter else ''), profile)
+
+
+def _tuner(target):
+    return TypingRateTuner(FakeEngine(target), target, trials=1, settle_ms=0)
+
+
+def test_tuner_searches_modifier_gap():
+    # 有2ms的Shift间隔时字符间隔可降到3ms，否则需要20ms
+    target = FakeTarget(min_gap_ms=2, min_char_delay_ms=20, min_char_delay_with_gap_ms=3)
+    profile = _tuner(target).tune(TimingProfile(), max_enter_delay_ms=0)
+    assert profile is not None
+    assert profile.modifier_gap_ms == 2
+    assert profile.char_delay_ms == 3
+
+
+def test_tuner_keeps_gap_zero_when_not_needed():
+    target = FakeTarget(min_gap_ms=0, min_char_delay_ms=4, min_char_delay_with_gap_ms=4)
+    profile = _tuner(target).tune(TimingProfile(), max_enter_delay_ms=0)
+    assert profile.modifier_gap_ms == 0
+    assert profile.key_hold_ms == 0
+    assert profile.char_delay_ms == 4
+
+
+def test_shift_ratio():
+    tuner = TypingRateTuner(None, None, sample_lines=['Ab!', 'cd'])
+    assert '!' in US_SHIFTED_SYMBOLS
+    assert tuner.shift_ratio() == 2 / 5
@@ -0,0 +1,23 @@
+import keyboard_simulator
+import ui_benchmark
+
+
+def _result(**metrics):
+    return {'sizes': {'10': dict({'compact_on_ms': 5.0, 'compact_off_ms': 5.0, 'toggle_ms': 2.0}, **metrics)}}
+
+
+def test_frame_budget_is_shared_with_the_app():
+    assert ui_benchmark.FRAME_BUDGET_MS == keyboard_simulator.FRAME_BUDGET_MS
+
+
+def test_toggle_over_frame_budget_is_a_regression_without_baseline():
+    assert ui_benchmark.compare(_result(), {}) == []
+    slow = _result(toggle_ms=ui_benchmark.FRAME_BUDGET_MS + 1)
+    assert ui_benchmark.over_budget(slow) == [('10', 'toggle_ms', 16.7, ui_benchmark.FRAME_BUDGET_MS + 1)]
+    assert ui_benchmark.compare(slow, {}) == ui_benchmark.over_budget(slow)
+
+
+def test_baseline_regression_needs_relative_and_absolute_increase():
+    baseline = _result(history_open_ms=10.0)
+    assert ui_benchmark.compare(_result(history_open_ms=11.5), baseline) == []
+    assert ui_benchmark.compare(_result(history_open_ms=20.0), baseline) == [('10', 'history_open_ms', 10.0, 20.0)]
@@ -0,0 +1,183 @@
+"""事件追踪：把关键环节记录为带时间戳的区间（span），保存在环形缓冲区中
+
+可导出为Chrome trace-event JSON（在 chrome://tracing 或 Perfetto 中打开），
+也可注册钩子在每个区间结束时得到回调（例如打印慢操作）。
+
+未启用时 span() 直接返回一个共享的空对象，开销只有一次属性判断和一次函数调用。
+
+用法：
+    from tracing import tracer
+    with tracer.span('history_save', 'io', count=len(history)) as span:
+        ...
+        span.set(bytes=size)
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+DEFAULT_CAPACITY = 50000
+
+
+class _NullSpan:
+    """追踪未启用时返回的空区间"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'cat', 'args', 'began')
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.began = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ended = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.tracer._record(self.name, self.cat, 'X', self.began, ended - self.began, self.args)
+        return False
+
+    def set(self, **args):
+        """补充区间参数（例如结束时才知道的结果）"""
+        self.args.update(args)
+
+
+class Tracer:
+    """区间追踪器：环形缓冲区 + 钩子"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, enabled=False):
+        self.enabled = enabled
+        self._events = deque(maxlen=max(1, int(capacity)))
+        self._hooks = []
+        self._threads = {}  # 线程ID -> 线程名
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+        self.pid = os.getpid()
+
+    # ---- 记录 ----
+
+    def span(self, name, cat='app', **args):
+        """返回区间上下文：with tracer.span('name'): ..."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, cat, args)
+
+    def instant(self, name, cat='app', **args):
+        """记录瞬时事件"""
+        if self.enabled:
+            self._record(name, cat, 'i', time.perf_counter_ns(), 0, args)
+
+    def _record(self, name, cat, phase, began_ns, duration_ns, args):
+        thread = threading.current_thread()
+        event = {
+            'name': name,
+            'cat': cat,
+            'ph': phase,
+            'ts': (began_ns - self._origin) / 1000.0,  # 微秒
+            'pid': self.pid,
+            'tid': thread.ident,
+        }
+        if phase == 'X':
+            event['dur'] = duration_ns / 1000.0
+        else:
+            event['s'] = 't'
+        if args:
+            event['args'] = args
+        with self._lock:
+            self._events.append(event)
+            self._threads[thread.ident] = thread.name
+            hooks = list(self._hooks)
+        for hook in hooks:
+            try:
+                hook(event)
+            except Exception as e:
+                print(f"追踪钩子执行失败: {e}")
+
+    # ---- 配置 ----
+
+    def enable(self, capacity=None):
+        if capacity is not None:
+            with self._lock:
+                self._events = deque(self._events, maxlen=max(1, int(capacity)))
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def add_hook(self, hook):
+        """注册钩子：hook(event)，event为Chrome trace格式的dict，在记录线程中调用"""
+        with self._lock:
+            if hook not in self._hooks:
+                self._hooks.append(hook)
+        return hook
+
+    def remove_hook(self, hook):
+        with self._lock:
+            if hook in self._hooks:
+                self._hooks.remove(hook)
+
+    # ---- 查询与导出 ----
+
+    def events(self):
+        with self._lock:
+            return list(self._events)
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+
+    def to_chrome(self):
+        """Chrome trace-event格式（JSON Object Format）"""
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid, 'args': {'name': name}}
+                    for tid, name in threads.items()]
+        return {'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}
+
+    def dump_chrome(self, path):
+        """写入Chrome trace JSON文件，返回写入的事件数"""
+        data = self.to_chrome()
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+        return len(data['traceEvents'])
+
+
+def slow_span_hook(threshold_ms, categories=None, log=print):
+    """生成一个钩子：耗时超过threshold_ms的区间（可按类别过滤）输出一行日志"""
+    threshold_us = threshold_ms * 1000.0
+
+    def _hook(event):
+        if event.get('dur', 0) < threshold_us:
+            return
+        if categories is not None and event['cat'] not in categories:
+            return
+        log(f"慢操作: {event['cat']}/{event['name']} 耗时{event['dur'] / 1000.0:.1f}ms {event.get('args', {})}")
+
+    return _hook
+
+
+# 全局追踪器，各模块共用
+tracer = Tracer()
@@ -0,0 +1,291 @@
+import time
+
+from tracing import tracer
+
+
+# 美式键盘布局：需要Shift的符号 -> 对应的按键
+US_SHIFTED_SYMBOLS = {
+    '~': '`', '!': '1', '@': '2', '#': '3', '$': '4', '%': '5', '^': '6', '&': '7',
+    '*': '8', '(': '9', ')': '0', '_': '-', '+': '=', '{': '[', '}': ']', '|': '\\',
+    ':': ';', '"': "'", '<': ',', '>': '.', '?': '/',
+}
+_UNSHIFTED_SYMBOLS = set('`-=[]\\;\',./')
+_SHIFTED_BY_KEY = {key: char for char, key in US_SHIFTED_SYMBOLS.items()}
+
+
+def key_for_char(char):
+    """字符对应的（按键名, 是否需要Shift）；不在美式布局上的字符返回None（按Unicode方式输入）"""
+    if 'a' <= char <= 'z' or '0' <= char <= '9' or char in _UNSHIFTED_SYMBOLS:
+        return char, False
+    if 'A' <= char <= 'Z':
+        return char.lower(), True
+    if char == ' ':
+        return 'space', False
+    key = US_SHIFTED_SYMBOLS.get(char)
+    if key is not None:
+        return key, True
+    return None
+
+
+def char_for_key(key, shifted):
+    """key_for_char的逆运算；不是字符键时返回None"""
+    if key == 'space':
+        return ' '
+    if len(key) != 1:
+        return None
+    if shifted:
+        return key.upper() if 'a' <= key <= 'z' else _SHIFTED_BY_KEY.get(key)
+    return key
+
+
+class TimingProfile:
+    """输入时序参数：字符间隔、回车前等待，以及按键级时序（按下保持、修饰键间隔、连续Shift）"""
+
+    def __init__(self, char_delay_ms=20, enter_delay_ms=0, name='默认',
+                 key_hold_ms=0, modifier_gap_ms=0, hold_shift=False):
+        self.name = name
+        self.char_delay_ms = max(0, int(char_delay_ms))  # 每个字符之后的等待（毫秒）
+        self.enter_delay_ms = max(0, int(enter_delay_ms))  # 按回车前的额外等待（毫秒）
+        self.key_hold_ms = max(0, int(key_hold_ms))  # 按下到松开之间的保持时间（毫秒）
+        self.modifier_gap_ms = max(0, int(modifier_gap_ms))  # 按下/松开Shift与字符键之间的间隔（毫秒）
+        self.hold_shift = bool(hold_shift)  # 连续需要Shift的字符共用一次Shift按下
+
+    @property
+    def key_level(self):
+        """是否需要逐键控制按下/松开（否则直接由keyboard.write输入）"""
+        return self.key_hold_ms > 0 or self.modifier_gap_ms > 0 or self.hold_shift
+
+    def copy(self, **changes):
+        """复制一份参数，可同时覆盖部分字段"""
+        values = self.to_dict()
+        values.update(changes)
+        return TimingProfile.from_dict(values)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'char_delay_ms': self.char_delay_ms,
+            'enter_delay_ms': self.enter_delay_ms,
+            'key_hold_ms': self.key_hold_ms,
+            'modifier_gap_ms': self.modifier_gap_ms,
+            'hold_shift': self.hold_shift,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        data = data or {}
+        return cls(
+            char_delay_ms=data.get('char_delay_ms', 20),
+            enter_delay_ms=data.get('enter_delay_ms', 0),
+            name=data.get('name', '默认'),
+            key_hold_ms=data.get('key_hold_ms', 0),
+            modifier_gap_ms=data.get('modifier_gap_ms', 0),
+            hold_shift=data.get('hold_shift', False),
+        )
+
+
+class KeyboardSink:
+    """真实键盘输出端（基于keyboard库，向当前焦点窗口发送按键）"""
+
+    def __init__(self):
+        # 延迟导入，便于在没有keyboard库的环境中使用内存输出端
+        import keyboard
+        self._keyboard = keyboard
+
+    def write(self, char):
+        self._keyboard.write(char)
+
+    def press_and_release(self, key):
+        self._keyboard.press_and_release(key)
+
+    def press(self, key):
+        self._keyboard.press(key)
+
+    def release(self, key):
+        self._keyboard.release(key)
+
+
+class MemorySink:
+    """内存输出端：不注入按键，只记录输出内容，用于测试与调试"""
+
+    def __init__(self):
+        self.events = []
+
+    def write(self, char):
+        self.events.append(('write', char))
+
+    def press_and_release(self, key):
+        self.events.append(('key', key))
+
+    def press(self, key):
+        self.events.append(('press', key))
+
+    def release(self, key):
+        self.events.append(('release', key))
+
+    def text(self):
+        """按键盘实际效果还原出的文本（回车记为换行，Tab记为制表符）"""
+        parts = []
+        shift_down = False
+        for kind, value in self.events:
+            if kind == 'write':
+                parts.append(value)
+            elif value == 'shift':
+                shift_down = kind == 'press'
+            elif kind in ('key', 'press'):
+                if value == 'enter':
+                    parts.append('\n')
+                elif value == 'tab':
+                    parts.append('\t')
+                else:
+                    parts.append(char_for_key(value, shift_down) or '')
+        return ''.join(parts)
+
+    def clear(self):
+        self.events = []
+
+
+def text_segments(text, with_enter=False):
+    """将普通文本转换为片段列表：('text', 文本) 与 ('key', 按键名)"""
+    segments = [('text', text)] if text else []
+    if with_enter:
+        segments.append(('key', 'enter'))
+    return segments
+
+
+# 各来源的默认优先级（数值越大越先执行）：手动输入可在批量任务的记录边界处插队
+SOURCE_PRIORITY = {'manual': 10, 'schedule': 5}
+
+
+class TypingJob:
+    """一次输入任务：片段列表及其来源"""
+
+    def __init__(self, segments, source='manual', countdown=True, label=None, priority=None):
+        self.segments = segments
+        self.source = source  # 任务来源，如 manual/template
+        self.countdown = countdown  # 开始前是否倒计时
+        self.label = label  # 显示/记录用的名称（如模板原文）
+        self.priority = priority if priority is not None else SOURCE_PRIORITY.get(source, 0)
+        self.enqueued_at = None  # 入队时刻（time.monotonic，由队列设置）
+        self.queue_seq = None  # 入队序号（由队列设置，抢占后按原序号放回）
+        self.schedule = None  # 所属定时计划（由调度器设置）
+        self.scheduled_at = None  # 计划执行时刻（time.monotonic）
+        self.start_reported = False  # 是否已记录开始延迟（被抢占后继续执行时不再记录）
+        self.payload_text = None  # 审计日志中记录的内容（首次执行时生成，抢占后继续时沿用）
+        self.started_at = None  # 本次执行开始输入的时刻（time.time，倒计时之后），出错时审计日志记录此时刻
+        self.pinned = False  # 排队时不参与合并、不会被丢弃（如带序号的模板任务）
+        self.on_done = None  # 执行结束（完成或出错，不含被抢占）后调用 on_done(outcome, 耗时秒, 按键数)
+
+    def payload_key(self):
+        """任务内容的可哈希键，用于合并重复任务；流式任务返回None"""
+        if isinstance(self.segments, (list, tuple)):
+            return tuple(self.segments)
+        return None
+
+
+class TypingEngine:
+    """按时序参数逐字符输入文本"""
+
+    def __init__(self, sink=None):
+        self.sink = sink if sink is not None else KeyboardSink()
+        self.keystrokes = 0  # 累计输入的按键数（字符与特殊按键）
+
+    def type_text(self, text, profile, with_enter=False, stop_event=None):
+        """逐字符输入文本，返回是否完整输入（被stop_event中断时返回False）"""
+        return self.type_segments(text_segments(text, with_enter), profile, stop_event)
+
+    def type_segments(self, segments, profile, stop_event=None, on_record=None):
+        """依次输入文本片段与特殊按键
+
+        片段类型：('text', 文本)、('key', 按键名)、('sleep', 毫秒)、
+        ('record', None) 记录结束标记（调用on_record回调）。
+        on_record返回真值时在该记录之后暂停并返回False，未输入的片段仍留在
+        segments迭代器中，可稍后继续。
+        """
+        # 计算延迟时间（只计算一次）
+        delay_seconds = profile.char_delay_ms / 1000.0
+        enter_delay_seconds = profile.enter_delay_ms / 1000.0
+        key_level = profile.key_level
+        for kind, value in segments:
+            if kind == 'text':
+                with tracer.span('keystrokes', 'typing', chars=len(value)):
+                    if key_level:
+                        if not self._type_key_level(value, profile, stop_event):
+                            return False
+                        continue
+                    for char in value:
+                        if stop_event is not None and stop_event.is_set():
+                            return False
+                        self.sink.write(char)
+                        self.keystrokes += 1
+                        time.sleep(delay_seconds)
+            elif kind == 'sleep':
+                time.sleep(value / 1000.0)
+            elif kind == 'record':
+                if on_record is not None and on_record():
+                    return False
+            else:
+                if stop_event is not None and stop_event.is_set():
+                    return False
+                if value == 'enter':
+                    with tracer.span('enter', 'typing', delay_ms=profile.enter_delay_ms):
+                        if enter_delay_seconds > 0:
+                            time.sleep(enter_delay_seconds)
+                        self._tap(value, profile)
+                    self.keystrokes += 1
+                    continue
+                self._tap(value, profile)
+                self.keystrokes += 1
+                time.sleep(delay_seconds)
+        return True
+
+    def _tap(self, key, profile):
+        """按下并松开一个键；设置了保持时间时在按下与松开之间等待"""
+        if profile.key_hold_ms:
+            self.sink.press(key)
+            time.sleep(profile.key_hold_ms / 1000.0)
+            self.sink.release(key)
+        else:
+            self.sink.press_and_release(key)
+
+    def _type_key_level(self, text, profile, stop_event):
+        """逐键控制按下/松开地输入文本
+
+        需要Shift的字符先按下Shift、间隔modifier_gap_ms后再按字符键；hold_shift时
+        连续的Shift字符之间不松开Shift。美式布局以外的字符仍用write输入。
+        片段结束（或中断、出错）时总会松开Shift，避免影响之后的按键。
+        """
+        delay_seconds = profile.char_delay_ms / 1000.0
+        gap_seconds = profile.modifier_gap_ms / 1000.0
+        shift_down = False
+        try:
+            for char in text:
+                if stop_event is not None and stop_event.is_set():
+                    return False
+                mapping = key_for_char(char)
+                shifted = mapping is not None and mapping[1]
+                if shift_down and not shifted:
+                    self.sink.release('shift')
+                    shift_down = False
+                    if gap_seconds:
+                        time.sleep(gap_seconds)
+                if mapping is None:
+                    self.sink.write(char)
+                else:
+                    if shifted and not shift_down:
+                        self.sink.press('shift')
+                        shift_down = True
+                        if gap_seconds:
+                            time.sleep(gap_seconds)
+                    self._tap(mapping[0], profile)
+                    if shift_down and not profile.hold_shift:
+                        if gap_seconds:
+                            time.sleep(gap_seconds)
+                        self.sink.release('shift')
+                        shift_down = False
+                self.keystrokes += 1
+                time.sleep(delay_seconds)
+        finally:
+            if shift_down:
+                self.sink.release('shift')
+        return True
@@ -0,0 +1,197 @@
+import difflib
+import math
+import platform
+import threading
+import time
+import tkinter as tk
+
+from typing_engine import US_SHIFTED_SYMBOLS, TimingProfile
+
+# 调优用的样本文本：覆盖大小写、数字与常见符号
+DEFAULT_SAMPLE_LINES = [
+    'AB12-cd34_EF56',
+    'gh78/IJ90.kl12',
+    'MN34+op56*QR78',
+]
+
+
+def count_dropped(expected, captured):
+    """统计采集结果与期望文本的差异字符数（丢失、多出、错位都计入）"""
+    if expected == captured:
+        return 0
+    matcher = difflib.SequenceMatcher(None, expected, captured, autojunk=False)
+    matched = sum(block.size for block in matcher.get_matching_blocks())
+    return max(len(expected), len(captured)) - matched
+
+
+def machine_id():
+    """当前机器标识，用作按机器保存调优结果的键"""
+    return platform.node() or 'default'
+
+
+class TkCaptureTarget:
+    """本地采集目标：一个置顶并获得焦点的Text控件，记录实际收到的字符
+
+    调优在后台线程中运行，所有控件操作都通过root.after切回主线程执行。
+    """
+
+    def __init__(self, root, timeout=5.0):
+        self.root = root
+        self.timeout = timeout
+        self.window = None
+        self.text = None
+
+    def _call(self, func):
+        """在Tk主线程中执行func并等待结果"""
+        done = threading.Event()
+        result = {}
+
+        def _run():
+            try:
+                result['value'] = func()
+            except Exception as e:
+                result['error'] = e
+            finally:
+                done.set()
+
+        self.root.after(0, _run)
+        if not done.wait(self.timeout):
+            raise RuntimeError('采集窗口无响应')
+        if 'error' in result:
+            raise result['error']
+        return result.get('value')
+
+    def open(self):
+        """创建采集窗口（需在主线程调用）"""
+        self.window = tk.Toplevel(self.root)
+        self.window.title('输入速率调优 - 请勿操作键盘')
+        self.window.geometry('360x160')
+        self.window.attributes('-topmost', True)
+        self.text = tk.Text(self.window, height=6, width=40)
+        self.text.pack(fill=tk.BOTH, expand=True)
+        self.window.update_idletasks()
+        self.text.focus_force()
+
+    def reset(self):
+        def _reset():
+            self.text.delete('1.0', tk.END)
+            self.window.lift()
+            self.text.focus_force()
+        self._call(_reset)
+
+    def read(self):
+        # Text控件末尾总有一个额外的换行
+        return self._call(lambda: self.text.get('1.0', 'end-1c'))
+
+    def close(self):
+        try:
+            self._call(self.window.destroy)
+        except Exception:
+            pass
+
+
+class TypingRateTuner:
+    """在本地采集目标上搜索零丢字的最低输入间隔
+
+    对每组按键保持时间与Shift间隔的候选值分别二分搜索字符间隔（部分目标程序在按下/松开
+    无间隔或Shift与字符键同时到达时丢字，加上这些等待后可接受更小的字符间隔），
+    按样本的每字符耗时取最小者；然后尝试连续大写时保持Shift，最后搜索回车前等待。
+    每个候选值需连续trials轮零丢字才算通过。
+    """
+
+    def __init__(self, engine, target, trials=3, sample_lines=None, settle_ms=300,
+                 progress=None, stop_event=None):
+        self.engine = engine
+        self.target = target
+        self.trials = max(1, int(trials))
+        self.sample_lines = sample_lines or DEFAULT_SAMPLE_LINES
+        self.settle_ms = settle_ms  # 输入结束后等待事件全部到达采集目标的时间
+        self.progress = progress  # 进度回调：progress(消息)
+        self.stop_event = stop_event
+        self.attempts = []  # 每次尝试的记录：(字符间隔, 回车等待, 按键保持, Shift间隔, 保持Shift, 丢字数)
+
+    def _report(self, message):
+        if self.progress is not None:
+            try:
+                self.progress(message)
+            except Exception:
+                pass
+
+    def _stopped(self):
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def run_trial(self, profile):
+        """输入一轮样本并返回丢字数"""
+        self.target.reset()
+        for line in self.sample_lines:
+            self.engine.type_text(line, profile, with_enter=True)
+        time.sleep(self.settle_ms / 1000.0)
+        expected = ''.join(line + '\n' for line in self.sample_lines)
+        return count_dropped(expected, self.target.read())
+
+    def passes(self, profile):
+        """连续trials轮零丢字则通过，出现丢字立即判定失败"""
+        for i in range(self.trials):
+            if self._stopped():
+                return False
+            dropped = self.run_trial(profile)
+            self.attempts.append((profile.char_delay_ms, profile.enter_delay_ms, profile.key_hold_ms,
+                                  profile.modifier_gap_ms, profile.hold_shift, dropped))
+            self._report(f"间隔{profile.char_delay_ms}ms/回车{profile.enter_delay_ms}ms/"
+                         f"保持{profile.key_hold_ms}ms/Shift间隔{profile.modifier_gap_ms}ms"
+                         f"{'/连续Shift' if profile.hold_shift else ''} "
+                         f"第{i + 1}轮 丢字{dropped}")
+            if dropped:
+                return False
+        return True
+
+    def _search(self, low, high, make_profile):
+        """在[low, high]内二分搜索最小的通过值；high本身不通过时返回None"""
+        if not self.passes(make_profile(high)):
+            return None
+        while low < high and not self._stopped():
+            mid = (low + high) // 2
+            if self.passes(make_profile(mid)):
+                high = mid
+            else:
+                low = mid + 1
+        return high
+
+    def shift_ratio(self):
+        """样本中需要Shift的字符所占比例（每个这样的字符按下、松开Shift各等待一次间隔）"""
+        chars = ''.join(self.sample_lines)
+        if not chars:
+            return 0.0
+        return sum(1 for c in chars if c.isupper() or c in US_SHIFTED_SYMBOLS) / len(chars)
+
+    def tune(self, base_profile=None, max_char_delay_ms=200, max_enter_delay_ms=200,
+             hold_candidates_ms=(0, 2, 5), gap_candidates_ms=(0, 2, 5), try_hold_shift=True):
+        """执行调优，返回最快的零丢字TimingProfile；失败或中断返回None"""
+        base = (base_profile or TimingProfile()).copy(enter_delay_ms=max_enter_delay_ms, hold_shift=False)
+        shift_ratio = self.shift_ratio()
+        best = None  # (每字符耗时, 按键保持, Shift间隔, 字符间隔)
+        for hold in hold_candidates_ms:
+            for gap in gap_candidates_ms:
+                overhead = hold + 2 * gap * shift_ratio
+                # 只在能比当前最优更快的范围内搜索
+                high = max_char_delay_ms if best is None else math.ceil(best[0] - overhead) - 1
+                if high < 0:
+                    continue
+                char_delay = self._search(
+                    0, high, lambda v, hold=hold, gap=gap: base.copy(char_delay_ms=v, key_hold_ms=hold,
+                                                                     modifier_gap_ms=gap))
+                if self._stopped():
+                    return None
+                if char_delay is not None:
+                    best = (char_delay + overhead, hold, gap, char_delay)
+        if best is None:
+            return None
+        base = base.copy(char_delay_ms=best[3], key_hold_ms=best[1], modifier_gap_ms=best[2])
+        if try_hold_shift and self.passes(base.copy(hold_shift=True)):
+            base = base.copy(hold_shift=True)
+        if self._stopped():
+            return None
+        enter_delay = self._search(0, max_enter_delay_ms, lambda v: base.copy(enter_delay_ms=v))
+        if enter_delay is None or self._stopped():
+            return None
+        return base.copy(enter_delay_ms=enter_delay, name=f"自动调优-{machine_id()}")
@@ -0,0 +1,282 @@
+"""界面性能测试：在虚拟X显示（Xvfb）下启动KeyboardSimulatorApp，测量常用界面操作的耗时
+
+对逐渐增大的合成历史记录分别测量：
+    history_open    显示历史记录区域
+    item_add        历史可见时新增一条记录（含保存与刷新）
+    compact_on/off  进入/退出极致紧凑模式
+    toggle          紧凑/完整布局切换本身（应用记录的last_toggle_ms，不含淡入淡出）
+    settings_open   打开设置对话框
+同时记录控件数量与进程常驻内存，并与基线文件比较，超过阈值时返回非零退出码；
+紧凑模式切换（含重绘）另需在一帧（FRAME_BUDGET_MS，与应用共用）之内完成，
+不论是否有基线都检查，生成基线时超出预算同样返回非零退出码。
+
+用法：
+    python ui_benchmark.py                     # 与基线比较（基线不存在时保存为基线）
+    python ui_benchmark.py --update-baseline   # 重新生成基线
+    python ui_benchmark.py --sizes 10 50 200 --repeat 7 --threshold 0.5
+    python ui_benchmark.py --low-memory -o low_memory.json   # 低内存模式下测量（不与普通模式基线比较）
+
+低内存模式默认测量空历史、1千条与10万条（LOW_MEMORY_SIZES）下整个程序的常驻内存（rss_mb），
+另记录启动后、载入历史记录前的常驻内存（startup_rss_mb）。
+
+程序在临时目录中运行，不会改动当前目录下的历史记录与设置文件；
+输入端使用MemorySink，不会向系统发送按键。
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from keyboard_simulator import FRAME_BUDGET_MS
+
+BASELINE_FILE = 'ui_benchmark_baseline.json'
+TIMED_OPERATIONS = ('history_open', 'item_add', 'compact_on', 'compact_off', 'toggle', 'settings_open')
+FRAME_BUDGET_OPERATIONS = ('compact_on_ms', 'compact_off_ms', 'toggle_ms')
+DEFAULT_SIZES = (10, 50, 200, 1000)
+LOW_MEMORY_SIZES = (0, 1000, 100000)  # 普通模式下10万条会逐条创建卡片，只在低内存模式下测量
+
+
+# ---- 虚拟显示 ----
+
+def start_virtual_display(width=1280, height=800, timeout=10.0):
+    """启动Xvfb并设置DISPLAY，返回进程；不需要（已有显示或非Linux）时返回None"""
+    if not sys.platform.startswith('linux') or os.environ.get('DISPLAY'):
+        return None
+    xvfb = shutil.which('Xvfb')
+    if xvfb is None:
+        raise RuntimeError("未找到Xvfb，请安装（如 apt install xvfb）或设置DISPLAY")
+    # 选择一个未被占用的显示编号
+    number = 99
+    while os.path.exists(f'/tmp/.X{number}-lock'):
+        number += 1
+    process = subprocess.Popen([xvfb, f':{number}', '-screen', '0', f'{width}x{height}x24', '-nolisten', 'tcp'],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    socket_path = f'/tmp/.X11-unix/X{number}'
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(socket_path):
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            raise RuntimeError("Xvfb启动失败")
+        time.sleep(0.05)
+    os.environ['DISPLAY'] = f':{number}'
+    return process
+
+
+# ---- 测量 ----
+
+def rss_mb():
+    """进程常驻内存（MB）；无法获取时返回峰值常驻内存"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        return 0.0
+
+
+def count_widgets(widget):
+    """递归统计控件数量（含widget本身）"""
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+def timed(root, action):
+    """执行action并处理完所有待绘制事件，返回耗时（毫秒）"""
+    began = time.perf_counter()
+    action()
+    root.update()
+    return (time.perf_counter() - began) * 1000.0
+
+
+def synthetic_history(size):
+    """合成历史记录：混合普通文本、条码、记录与模板"""
+    samples = ['6901234567892', 'SN-{seq:6:1}{enter}', 'A123|B456|C789', '订单号 2024-{rand:6:0123456789}']
+    return [f'{samples[i % len(samples)]} #{i}' for i in range(size)]
+
+
+def measure_size(app, size, repeat):
+    """在给定历史记录条数下测量各项操作，返回 {指标: 数值}"""
+    from history_store import HistoryArena
+
+    root = app.root
+    if bool(app.ultra_compact.get()):
+        app.exit_ultra_compact_mode()
+    if app.history_visible:
+        app.hide_history()
+    app.max_history_items = size
+    app.history = HistoryArena(synthetic_history(size))
+    root.update()
+
+    samples = {name: [] for name in TIMED_OPERATIONS}
+    for i in range(repeat):
+        samples['history_open'].append(timed(root, app.show_history))
+        samples['item_add'].append(timed(root, lambda: app.add_to_history(f'新增记录 {size}-{i}')))
+        app.hide_history()
+        root.update()
+
+        samples['compact_on'].append(timed(root, app.enter_ultra_compact_mode))
+        samples['toggle'].append(app.last_toggle_ms)
+        samples['compact_off'].append(timed(root, app.exit_ultra_compact_mode))
+        samples['toggle'].append(app.last_toggle_ms)
+
+        before = set(root.winfo_children())
+        samples['settings_open'].append(timed(root, app.open_settings))
+        for widget in set(root.winfo_children()) - before:
+            widget.destroy()
+        root.update()
+
+    # 历史可见时的控件数量与内存
+    app.show_history()
+    root.update()
+    result = {f'{name}_ms': round(statistics.median(values), 3) for name, values in samples.items()}
+    result['widgets'] = count_widgets(root)
+    result['rss_mb'] = round(rss_mb(), 1)
+    app.hide_history()
+    root.update()
+    return result
+
+
+def run_benchmark(sizes, repeat, low_memory=False):
+    """启动应用并依次测量各历史记录条数，返回结果dict"""
+    import tkinter as tk
+
+    from keyboard_simulator import KeyboardSimulatorApp
+    from typing_engine import MemorySink
+
+    root = tk.Tk()
+    try:
+        began = time.perf_counter()
+        app = KeyboardSimulatorApp(root, sink=MemorySink())
+        app.low_memory_mode.set(low_memory)
+        root.update()
+        startup_ms = (time.perf_counter() - began) * 1000.0
+        startup_rss = round(rss_mb(), 1)
+        results = {}
+        for size in sizes:
+            results[str(size)] = measure_size(app, size, repeat)
+            print(f"历史{size}条: " + ', '.join(f'{k}={v}' for k, v in results[str(size)].items()))
+        return {
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'tk': root.tk.call('info', 'patchlevel'),
+            'repeat': repeat,
+            'low_memory': low_memory,
+            'startup_ms': round(startup_ms, 3),
+            'startup_rss_mb': startup_rss,
+            'sizes': results,
+        }
+    finally:
+        root.destroy()
+
+
+# ---- 基线比较 ----
+
+def over_budget(current, frame_budget_ms=FRAME_BUDGET_MS):
+    """紧凑模式切换超过一帧的项 [(历史条数, 指标, 帧预算, 当前值)]"""
+    return [(size, name, round(frame_budget_ms, 1), metrics[name])
+            for size, metrics in current['sizes'].items()
+            for name in FRAME_BUDGET_OPERATIONS if metrics.get(name, 0) > frame_budget_ms]
+
+
+def compare(current, baseline, threshold=0.5, min_delta_ms=2.0, min_delta_mb=10.0, frame_budget_ms=FRAME_BUDGET_MS):
+    """与基线比较，返回回退项列表 [(历史条数, 指标, 基线值, 当前值)]
+
+    耗时与内存需同时超过相对阈值与绝对阈值才算回退（避免小数值的抖动），控件数量只看相对阈值；
+    紧凑模式切换超过一帧时也算回退（基线值一栏为帧预算）。
+    """
+    regressions = over_budget(current, frame_budget_ms)
+    for size, metrics in current['sizes'].items():
+        base_metrics = baseline.get('sizes', {}).get(size)
+        if base_metrics is None:
+            continue
+        for name, value in metrics.items():
+            base = base_metrics.get(name)
+            if base is None:
+                continue
+            if name.endswith('_ms'):
+                min_delta = min_delta_ms
+            elif name.endswith('_mb'):
+                min_delta = min_delta_mb
+            else:
+                min_delta = 0
+            if value > base * (1 + threshold) and value - base > min_delta:
+                regressions.append((size, name, base, value))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="界面性能测试（虚拟显示下运行）")
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        help=f"历史记录条数，默认为{list(DEFAULT_SIZES)}，低内存模式为{list(LOW_MEMORY_SIZES)}")
+    parser.add_argument('--repeat', type=int, default=5, help="每项操作的重复次数（取中位数）")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="基线文件")
+    parser.add_argument('--update-baseline', action='store_true', help="将本次结果保存为基线")
+    parser.add_argument('--threshold', type=float, default=0.5, help="相对基线允许的增幅（0.5即50%%）")
+    parser.add_argument('--low-memory', action='store_true', help="开启低内存模式后测量")
+    parser.add_argument('-o', '--output', help="另存本次结果的JSON文件")
+    args = parser.parse_args(argv)
+    if not args.sizes:
+        args.sizes = list(LOW_MEMORY_SIZES if args.low_memory else DEFAULT_SIZES)
+
+    baseline_path = os.path.abspath(args.baseline)
+    output_path = os.path.abspath(args.output) if args.output else None
+    try:
+        display = start_virtual_display()
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 2
+    workdir = tempfile.mkdtemp(prefix='ui_benchmark_')
+    cwd = os.getcwd()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    try:
+        # 应用在当前目录读写历史与设置文件，切换到临时目录运行
+        os.chdir(workdir)
+        current = run_benchmark(sorted(set(args.sizes)), max(1, args.repeat), low_memory=args.low_memory)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+        if display is not None:
+            display.terminate()
+
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+
+    if args.update_baseline or not os.path.exists(baseline_path):
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"已保存基线: {baseline_path}")
+        slow = over_budget(current)
+        for size, name, budget, value in slow:
+            print(f"超出帧预算: 历史{size}条 {name} {value}ms > {budget}ms")
+        return 1 if slow else 0
+
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if bool(baseline.get('low_memory')) != args.low_memory:
+        print("基线与本次的低内存模式设置不同，请用 --baseline 指定对应的基线文件", file=sys.stderr)
+        return 2
+    regressions = compare(current, baseline, threshold=args.threshold)
+    for size, name, base, value in regressions:
+        print(f"回退: 历史{size}条 {name} 基线{base} -> {value}")
+    if regressions:
+        print(f"共{len(regressions)}项超过阈值（+{args.threshold:.0%}）")
+        return 1
+    print("未发现性能回退")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())